@@ -1,24 +1,42 @@
 import sys
 import os
+import asyncio
+import json
+from datetime import datetime
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 
 from app.services.analytics import (
     generate_report,
-    save_report_csv,
-    merge_all_reports,
+    stored_report,
+    top_up_base,
+    save_report,
     get_latest_report_df,
-    df_to_latest_report_payload,
-    detect_signals_from_df,
+    get_latest_report_payload,
+    get_signals_payload,
+    report_http_payload,
+    signals_payload,
+    publish_latest_report,
+    LATEST_REPORT_CHECK_SECONDS,
 )
 
-from app.services.ai_predict import predict_market
-from app.services.discord_notify import send_discord_message
-from app.services.charts import generate_chart
+from app.services.history_index import history_index, parse_time
+from app.services.signals import BUILTIN_RULES, SignalRule, signals_for_profiles
+from app.services.ai_predict import predict_market, stream_prediction
+from app.services.discord_notify import outbox, send_discord_message
+from app.services.charts import chart_etag, render_chart, shutdown_chart_pool
 from app.services.scheduler import start_scheduler, shutdown_scheduler
+from app.services.stream import KlineStream
+from app.services.broadcast import broadcaster
+from app.services.singleflight import report_flights
+from app.services.universe import get_universe
+from app.services.binance_client import gateway
+from app.services.leader import leader
+from app.services import correlations, http_cache, metrics, timeframes
 
 
 app = FastAPI(title="ChainLogic API")
@@ -26,6 +44,10 @@ app = FastAPI(title="ChainLogic API")
 # 💰 Lista kryptowalut do analizy
 SYMBOLS = ["BTC", "ETH", "SOL", "BNB", "TAO", "DASH", "HEMI", "PYTH"]
 
+# 📡 Strumień świec na żywo (WebSocket Binance) – włączany zmienną środowiskową
+STREAM_ENABLED = os.getenv("STREAM_ENABLED", "0") == "1"
+kline_stream: KlineStream | None = None
+
 # CORS – frontend na Vercel + lokalnie
 origins = [
     "http://localhost:3000",
@@ -41,6 +63,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Czas każdego endpointu (histogram w /metrics) – dodany jako ostatni, więc zewnętrzny
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 @app.get("/")
@@ -48,32 +72,133 @@ def read_root():
     return {"status": "OK", "service": "chainlogic-api"}
 
 
-@app.get("/report")
-def get_report():
-    df = generate_report(SYMBOLS)
-    save_report_csv(df)
-    merge_all_reports()
+def _report_key(symbols):
+    return tuple(symbols)
+
+
+def _publish_report(symbols):
+    """Raport + zapis + historia + Discord – jeden raz na obliczenie."""
+    df = generate_report(symbols)
+    report_flights.store(("generate", _report_key(symbols)), df)
+    save_report(df)
     send_discord_message(f"📊 **Dzienny raport Binance**\n```{df.to_string(index=False)}```")
-    return df.to_dict(orient="records")
+    return df
 
 
-@app.get("/predict")
-def get_prediction():
-    df = generate_report(SYMBOLS)
+def _predict_and_notify(df):
     summary = predict_market(df)
     send_discord_message(f"🤖 **Prognoza AI:**\n{summary}")
+    return summary
+
+
+def _check_interval(interval: str) -> str:
+    try:
+        return timeframes.check_interval(interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _interval_report(symbols, interval):
+    """
+    Raport na innym interwale, bez zapisu do historii: /report zawsze daje
+    świeże dane, więc najpierw dociągamy serię bazową (jedyną pobieraną
+    z Binance), a sam raport liczymy z magazynu jak /signals?interval=.
+    """
+    top_up_base(symbols)
+    return stored_report(symbols, interval)
+
+
+@app.get("/report")
+async def get_report(interval: str = timeframes.REPORT_INTERVAL):
+    if _check_interval(interval) != timeframes.REPORT_INTERVAL:
+        key = ("interval", _report_key(SYMBOLS), interval)
+        try:
+            df = await report_flights.run(key, _interval_report, SYMBOLS, interval)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        return df.to_dict(orient="records")
+    # Równoległe wywołania w oknie świeżości dzielą jedno pobranie danych i jeden zapis
+    df = await report_flights.run(("report", _report_key(SYMBOLS)), _publish_report, SYMBOLS)
+    return df.to_dict(orient="records")
+
+
+def _stream_and_notify(df):
+    parts = []
+    for chunk in stream_prediction(df):
+        parts.append(chunk)
+        yield chunk
+    send_discord_message(f"🤖 **Prognoza AI:**\n{''.join(parts)}")
+
+
+@app.get("/predict")
+async def get_prediction(stream: bool = False):
+    # Świeży raport z /report (albo harmonogramu) zamiast ponownego pobierania
+    key = _report_key(SYMBOLS)
+    df = await report_flights.run(("generate", key), generate_report, SYMBOLS)
+    if stream:
+        # Tekst idzie do klienta w trakcie generowania (text/plain, kawałkami),
+        # bez buforowania także w reverse proxy
+        return StreamingResponse(
+            _stream_and_notify(df),
+            media_type="text/plain; charset=utf-8",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    summary = await report_flights.run(("predict", key), _predict_and_notify, df)
     return {"prediction": summary}
 
 
 @app.get("/chart")
-def get_chart(symbols: str = "BTC,ETH", column: str = "close", scale: str = "linear"):
+async def get_chart(
+    request: Request,
+    symbols: str = "BTC,ETH",
+    column: str = "close",
+    scale: str = "linear",
+):
     symbols_list = [s.strip().upper() for s in symbols.split(",")]
-    chart_path = generate_chart(symbols_list, column, scale)
+    chart_path = await render_chart(symbols_list, column, scale)
     if not chart_path:
         return {"error": "Brak danych lub nie udało się utworzyć wykresu."}
-    return FileResponse(chart_path)
+    # Nazwa pliku wynika z parametrów i wersji danych, więc ETag jest stabilny
+    etag = chart_etag(chart_path)
+    last_modified = http_cache.http_date(datetime.fromtimestamp(os.path.getmtime(chart_path)))
+    headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "public, max-age=60"}
+    if http_cache.not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(chart_path, media_type="image/png", headers=headers)
+
+
+
+@app.get("/universe/report")
+def get_universe_report(limit: int = 0):
+    """Wszystkie pary USDT: ticker 24h + metryki głębokie odświeżane porcjami."""
+    df = get_universe().report_df()
+    if limit > 0:
+        df = df.head(limit)
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict(orient="records")
+
+
+@app.get("/universe/status")
+def get_universe_status():
+    return get_universe().status()
 
 
+@app.post("/universe/refresh")
+def refresh_universe():
+    return get_universe().refresh()
+
+
+@app.get("/binance/status")
+def get_binance_status():
+    """Budżet wagi zapytań Binance: tokeny, waga wg serwera, kolejka."""
+    return gateway.status()
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Metryki w formacie Prometheusa: etapy potoku, endpointy, Binance, Discord, Groq, data/."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 
 @app.post("/schedule/run-now")
 def run_scheduled_now():
@@ -84,41 +209,198 @@ def run_scheduled_now():
 
 
 @app.get("/reports/latest")
-async def get_latest_report():
+async def get_latest_report(request: Request):
     try:
-        df = get_latest_report_df()
+        payload = get_latest_report_payload()
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-    payload = df_to_latest_report_payload(df)
-    return payload
+    # Gotowe (i skompresowane) bajty z cache albo 304, gdy klient ma tę wersję
+    return http_cache.respond(request, payload)
 
 
 @app.get("/signals")
 async def get_signals(
+    request: Request,
     change_24h_threshold: float = 8.0,
     atr_7d_threshold: float = 7.0,
+    interval: str = timeframes.REPORT_INTERVAL,
+):
+    # Interwał raportu – ostatni zapisany raport; inny – liczony lokalnie
+    # z zapisanej serii bazowej, bez zapytań do Binance
+    try:
+        if _check_interval(interval) == timeframes.REPORT_INTERVAL:
+            payload = get_signals_payload(change_24h_threshold, atr_7d_threshold)
+        else:
+            df = await report_flights.run(("stored", _report_key(SYMBOLS), interval), stored_report, SYMBOLS, interval)
+            payload = report_http_payload(signals_payload(df, change_24h_threshold, atr_7d_threshold), df)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return http_cache.respond(request, payload)
+
+
+@app.get("/history")
+async def get_history(
+    symbols: str = "",
+    columns: str = "Close",
+    start: str | None = None,
+    end: str | None = None,
+    points: int | None = None,
+    method: str = "lttb",
+):
+    """
+    Serie (report_date, wartość) z historii raportów dla symboli i kolumn.
+
+    Zakres `start`/`end` (ISO albo format report_date) i opcjonalne
+    przerzedzenie do `points` punktów metodą `lttb` albo `minmax`.
+    """
+    try:
+        result = history_index.query(
+            symbols=[s.strip().upper() for s in symbols.split(",") if s.strip()],
+            columns=[c.strip() for c in columns.split(",") if c.strip()],
+            start=parse_time(start) if start else None,
+            end=parse_time(end) if end else None,
+            points=points,
+            method=method,
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Same listy i liczby – json.dumps bez przechodzenia przez jsonable_encoder
+    return Response(content=json.dumps(result, allow_nan=False), media_type="application/json")
+
+
+@app.get("/correlations")
+async def get_correlations(
+    request: Request,
+    symbols: str = "",
+    interval: str = timeframes.REPORT_INTERVAL,
+    windows: str = correlations.DEFAULT_WINDOWS,
+    min_periods: int | None = None,
 ):
+    """
+    Macierze korelacji stóp zwrotu i beta do BTC w oknach `windows`
+    (np. 24h,7d,30d) dla śledzonych symboli – domyślnie wszystkich
+    z zapisanymi świecami, `symbols` zawęża wynik.
+    """
+    try:
+        payload = await asyncio.to_thread(
+            correlations.correlations_payload,
+            [s.strip().upper() for s in symbols.split(",") if s.strip()],
+            interval,
+            windows,
+            min_periods,
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return http_cache.respond(request, payload)
+
+
+class SignalRuleIn(BaseModel):
+    name: str
+    expr: str
+    defaults: dict[str, float] = {}
+
+
+class SignalProfileIn(BaseModel):
+    id: str
+    params: dict[str, float] = {}
+
+
+class SignalEvaluateIn(BaseModel):
+    profiles: list[SignalProfileIn]
+    rules: list[SignalRuleIn] | None = None
+
+
+@app.post("/signals/evaluate")
+async def evaluate_signals(body: SignalEvaluateIn):
+    """Wiele profili progów (i opcjonalnie własnych reguł) w jednym przebiegu."""
     try:
         df = get_latest_report_df()
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-    signals = detect_signals_from_df(
-        df,
-        change_24h_threshold=change_24h_threshold,
-        atr_7d_threshold=atr_7d_threshold,
+    try:
+        rules = (
+            [SignalRule(r.name, r.expr, r.defaults) for r in body.rules]
+            if body.rules
+            else BUILTIN_RULES
+        )
+        results = signals_for_profiles(df, [p.params for p in body.profiles], rules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "profiles": [
+            {"id": p.id, "count": len(signals), "signals": signals}
+            for p, signals in zip(body.profiles, results)
+        ]
+    }
+
+
+@app.get("/stream/events")
+async def stream_events():
+    """SSE: najpierw pełny snapshot, potem tylko nowe raporty i zmiany sygnałów."""
+    return StreamingResponse(
+        broadcaster.subscribe(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return {"count": len(signals), "signals": signals}
 
 
-# 🔄 Harmonogram (uruchamia się przy starcie serwera)
-@app.on_event("startup")
-def _on_startup():
+async def _watch_latest_report():
+    """Wyłapuje raporty zapisane przez inny proces i rozsyła je przez SSE."""
+    while True:
+        try:
+            publish_latest_report(await asyncio.to_thread(get_latest_report_df))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Błąd odświeżania raportu dla SSE: {e}")
+        await asyncio.sleep(LATEST_REPORT_CHECK_SECONDS)
+
+
+@app.get("/stream/status")
+async def get_stream_status():
+    if kline_stream is None:
+        return {"enabled": False}
+    return {"enabled": True, **kline_stream.status()}
+
+
+@app.get("/leader/status")
+def get_leader_status():
+    """Który worker trzyma harmonogram (przy `uvicorn --workers N`)."""
+    return leader.status()
+
+
+def _start_background_jobs():
+    """Harmonogram i strumień świec – tylko w workerze-liderze."""
+    global kline_stream
     start_scheduler(SYMBOLS)
+    if STREAM_ENABLED:
+        kline_stream = KlineStream(SYMBOLS)
+        kline_stream.start()
+
+
+# 🔄 Harmonogram (uruchamia się przy starcie serwera – w jednym workerze)
+@app.on_event("startup")
+async def _on_startup():
+    broadcaster.bind_loop(asyncio.get_running_loop())
+    asyncio.get_running_loop().create_task(_watch_latest_report())
+    leader.start(_start_background_jobs)
+    outbox.start()
 
 
 @app.on_event("shutdown")
 def _on_shutdown():
+    if kline_stream is not None:
+        kline_stream.stop()
     shutdown_scheduler()
+    leader.stop()
+    shutdown_chart_pool()
+    outbox.stop()
 
@@ -3,24 +3,155 @@ AI Prediction Module for Kryptosfera
 ------------------------------------
 
 This module integrates the project with the GROQ API (LLaMA model)
-to generate natural-language summaries and predictions based on 
+to generate natural-language summaries and predictions based on
 market analytics DataFrames.
 
 Functions:
 - predict_market(df): Accepts an analytics DataFrame and returns
   a natural-language interpretation using LLaMA (via GROQ API).
+- stream_prediction(df): Same prediction, yielded as text chunks
+  while the model is generating.
+- compact_report(df): Token-minimal text encoding of the report.
 
 Environment Variables Required:
 - GROQ_API_KEY – your authentication key for GROQ API.
 
+Optional:
+- GROQ_BASE_URL – alternative endpoint (e.g. a local stand-in for tests).
+- PREDICT_CACHE_TTL – seconds a prediction stays valid (default 900).
+- PREDICT_CACHE_SIZE – max cached predictions (default 64).
+
 Notes:
-- This module intentionally avoids using OpenAI client. 
-  GROQ client is faster, cheaper (or free), and well-suited 
+- This module intentionally avoids using OpenAI client.
+  GROQ client is faster, cheaper (or free), and well-suited
   for production forecasts and summaries.
+- One GROQ client is created lazily and reused, so its HTTP connection
+  pool survives between calls. The `groq` package itself is imported on
+  first use too, which keeps API startup fast.
+- Predictions are cached by a hash of the prompt (i.e. the report
+  contents), so the dashboard, Discord and manual runs asking about the
+  same snapshot share a single paid LLM call.
 """
 
+import hashlib
 import os
-from groq import Groq
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Iterator
+
+from dotenv import load_dotenv
+
+from app.services.metrics import GROQ_FAILURES, stage
+
+if TYPE_CHECKING:
+    from groq import Groq
+
+MODEL = "llama-3.1-8b-instant"
+MAX_TOKENS = 500
+TEMPERATURE = 0.4
+
+PREDICT_CACHE_TTL = float(os.getenv("PREDICT_CACHE_TTL", "900"))
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "64"))
+
+SYSTEM_PROMPT = (
+    "Jesteś profesjonalnym analitykiem rynku kryptowalut. "
+    "Analizujesz krótkoterminowe dane (24h, 3D, 7D) i zmienność (ATR). "
+    "Formułujesz krótkie, konkretne wnioski po polsku."
+)
+
+USER_PROMPT = """Dane rynkowe kryptowalut, jeden wiersz na symbol (zmiany i ATR w %):
+{report}
+
+Na podstawie danych:
+- wykryj trend,
+- oceń zmienność,
+- podaj potencjalne sygnały rynkowe,
+- zwięźle podsumuj sytuację.
+- poinformuj, o atrakcyjnych parach do handlu grid botem.
+
+Odpowiedź proszę sformułować w języku polskim, krótko i rzeczowo."""
+
+# Report column -> short header used in the compact prompt
+COMPACT_COLUMNS = {
+    "Symbol": "sym",
+    "Close": "close",
+    "24h%": "24h",
+    "3D%": "3d",
+    "7D%": "7d",
+    "ATR(3D)%": "atr3d",
+    "ATR(7D)%": "atr7d",
+}
+
+_client: "Groq | None" = None
+_client_lock = threading.Lock()
+_cache: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _get_api_key() -> str | None:
+    """Read GROQ_API_KEY, loading a local .env first (never overrides real env)."""
+    load_dotenv(override=False)
+    return os.getenv("GROQ_API_KEY")
+
+
+def _get_client(api_key: str) -> "Groq":
+    """Return the shared GROQ client (created on first use)."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.api_key != api_key:
+            from groq import Groq
+
+            _client = Groq(api_key=api_key, base_url=os.getenv("GROQ_BASE_URL") or None)
+        return _client
+
+
+def compact_report(df) -> str:
+    """
+    Encode the report as compact whitespace-separated rows.
+
+    Only the known report columns are kept; the index and the
+    `generated_at` / `report_date` columns are dropped and numbers use
+    the shortest representation (`%g`), which keeps the prompt a fraction
+    of `df.to_string()`.
+    """
+    cols = [c for c in COMPACT_COLUMNS if c in df.columns]
+    lines = [" ".join(COMPACT_COLUMNS[c] for c in cols)]
+    for row in df[cols].itertuples(index=False):
+        lines.append(" ".join(v if isinstance(v, str) else f"{v:g}" for v in row))
+    return "\n".join(lines)
+
+
+def _build_messages(df) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": USER_PROMPT.format(report=compact_report(df))},
+    ]
+
+
+def _cache_key(messages: list[dict]) -> str:
+    raw = "\x1e".join([MODEL, str(MAX_TOKENS), str(TEMPERATURE)] + [m["content"] for m in messages])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_get(key: str) -> str | None:
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > PREDICT_CACHE_TTL:
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache_put(key: str, text: str) -> None:
+    with _cache_lock:
+        _cache[key] = (time.monotonic(), text)
+        _cache.move_to_end(key)
+        while len(_cache) > PREDICT_CACHE_SIZE:
+            _cache.popitem(last=False)
 
 
 def predict_market(df):
@@ -47,68 +178,89 @@ def predict_market(df):
 
     Description
     -----------
-    The function transforms a DataFrame into a readable textual prompt
-    and sends it to the LLaMA model hosted on GROQ's inference API.
+    The function encodes the DataFrame with `compact_report` and sends it
+    to the LLaMA model hosted on GROQ's inference API. An identical report
+    within `PREDICT_CACHE_TTL` is answered from the cache.
 
     The model responds with:
     - trend detection
     - volatility analysis
     - directional insights
     - a compact, Polish-language summary
-    
+
     Examples
     --------
     >>> predict_market(df)
     "Rynek wykazuje umiarkowaną zmienność..."
 
     """
-    api_key = os.getenv("GROQ_API_KEY")
+    api_key = _get_api_key()
 
     # Validate API key presence
     if not api_key:
         return {"error": "Missing GROQ_API_KEY"}
 
-    # Initialize GROQ client
-    client = Groq(api_key=api_key)
+    messages = _build_messages(df)
+    key = _cache_key(messages)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
 
-    # Convert DataFrame to string for cleaner prompt injection
-    df_string = df.to_string()
+    # GROQ LLaMA inference call
+    try:
+        with stage("groq_request"):
+            completion = _get_client(api_key).chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+            )
+    except Exception:
+        GROQ_FAILURES.inc()
+        raise
 
-    # LLaMA prompt construction
-    prompt = f"""
-    Oto dane rynkowe kryptowalut (ostatnie wartości i zmiany):
-    {df_string}
+    text = completion.choices[0].message.content
+    _cache_put(key, text)
+    return text
 
-    Na podstawie danych:
-    - wykryj trend,
-    - oceń zmienność,
-    - podaj potencjalne sygnały rynkowe,
-    - zwięźle podsumuj sytuację.
-    - poinformuj, o atrakcyjnych parach do handlu grid botem.
 
-    Odpowiedź proszę sformułować w języku polskim, krótko i rzeczowo.
+def stream_prediction(df) -> Iterator[str]:
     """
+    Yield the prediction as text chunks while the model generates it.
 
-    # GROQ LLaMA inference call
-    completion = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Jesteś profesjonalnym analitykiem rynku kryptowalut. "
-                    "Analizujesz krótkoterminowe dane (24h, 3D, 7D) i zmienność (ATR). "
-                    "Formułujesz krótkie, konkretne wnioski po polsku."
-                ),
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            },
-        ],
-        max_tokens=500,
-        temperature=0.4,
-    )
-
-    message = completion.choices[0].message
-    return message.content
+    A cached prediction is yielded in one piece. The full text is cached
+    only once the stream completes, so an interrupted stream is not reused.
+    """
+    api_key = _get_api_key()
+    if not api_key:
+        yield "Missing GROQ_API_KEY"
+        return
+
+    messages = _build_messages(df)
+    key = _cache_key(messages)
+    cached = _cache_get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    try:
+        with stage("groq_stream"):
+            stream = _get_client(api_key).chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+                stream=True,
+            )
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+    except GeneratorExit:
+        raise
+    except Exception:
+        GROQ_FAILURES.inc()
+        raise
+    _cache_put(key, "".join(parts))
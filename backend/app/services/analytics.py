@@ -1,37 +1,77 @@
+import json
 import os
-from pathlib import Path
+import threading
+import time
 from typing import List, Dict
 import pandas as pd
 import numpy as np
-import glob
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from binance.client import Client
-from dotenv import load_dotenv
 
-# Katalogi na dane
-os.makedirs("data/reports", exist_ok=True)
-os.makedirs("data/charts", exist_ok=True)
+from app.services import http_cache, kline_store, report_engine, report_history, signals, timeframes
+from app.services.metrics import stage
+from app.services.binance_client import gateway, submit_with_context
+from app.services.broadcast import broadcaster
 
 # --- Konfiguracja Binance ---
-load_dotenv()
-client = Client(
-    api_key=os.getenv("BINANCE_API_KEY"),
-    api_secret=os.getenv("BINANCE_API_SECRET")
-)
+# Klient i budżet wagi zapytań są wspólne – patrz binance_client.gateway.
+# Import modułu nie dotyka sieci ani dysku: klient (i .env) ładuje się
+# przy pierwszym zapytaniu, katalogi data/ powstają przy pierwszym zapisie.
+
+# Ile symboli pobieramy równolegle – REST Binance to czyste I/O,
+# więc wątki wystarczą. Limit chroni przed zbyt dużą wagą zapytań naraz.
+KLINES_MAX_WORKERS = int(os.getenv("KLINES_MAX_WORKERS", "8"))
 
 # ============================================================
 # Pobieranie danych z Binance
 # ============================================================
-def get_historical_data(symbol, interval=Client.KLINE_INTERVAL_1HOUR, days=30):
-    """Pobiera dane historyczne dla symbolu z Binance."""
-    klines = client.get_historical_klines(symbol, interval, f"{days} day ago UTC")
-    df = pd.DataFrame(klines, columns=[
-        "time","open","high","low","close","volume",
-        "_","_","_","_","_","_"
-    ])
-    df["time"] = pd.to_datetime(df["time"], unit='ms')
-    df[["open","high","low","close","volume"]] = df[["open","high","low","close","volume"]].astype(float)
-    return df[["time","open","high","low","close","volume"]]
+def _fetch_klines(symbol, interval, start_ms):
+    """Pobiera świece od start_ms stronami po 1000 (jedno zapytanie na stronę)."""
+    # Pakiet binance importuje się długo – ładujemy go dopiero przy pobieraniu
+    from binance.helpers import interval_to_milliseconds
+
+    step = interval_to_milliseconds(interval)
+    out = []
+    while True:
+        batch = gateway.get_klines(symbol=symbol, interval=interval, startTime=start_ms, limit=1000)
+        out += batch
+        if len(batch) < 1000:
+            return out
+        start_ms = batch[-1][0] + step
+
+def get_historical_data(symbol, interval=timeframes.REPORT_INTERVAL, days=30):
+    """
+    Zwraca dane historyczne dla symbolu, dociągając z Binance tylko brakujące świece.
+
+    Historia leży w data/klines (patrz kline_store). Pobieramy świece od
+    ostatniej zapisanej – ona sama mogła być jeszcze otwarta, więc zostaje
+    nadpisana – a resztę czytamy z dysku. Pełne 30 dni ściągamy tylko przy
+    pierwszym uruchomieniu albo gdy lokalna historia zaczyna się za późno.
+
+    Z giełdy zawsze idzie tylko seria bazowa (`timeframes.BASE_INTERVAL`);
+    `interval` to widok liczony z niej lokalnie, bez dodatkowych zapytań.
+    """
+    timeframes.check_interval(interval)
+    since_ms = int(datetime.now().timestamp() * 1000) - days * 86_400_000
+    base_interval = timeframes.BASE_INTERVAL
+
+    stored = kline_store.load_klines(symbol, base_interval)
+    if len(stored) and stored["open_time"][0] <= since_ms:
+        fresh = _fetch_klines(symbol, base_interval, int(stored["open_time"][-1]))
+    else:
+        fresh = _fetch_klines(symbol, base_interval, since_ms)
+
+    merged = stored
+    if len(fresh):
+        # Blokada (także między procesami) dopiero na scalenie i zapis, nie na
+        # czas zapytania; czytamy plik ponownie – strumień lidera mógł dopisać świecę
+        with kline_store.symbol_lock(symbol, base_interval):
+            stored = kline_store.load_klines(symbol, base_interval)
+            merged = kline_store.merge_klines(stored, kline_store.klines_to_array(fresh))
+            kline_store.save_klines(symbol, base_interval, merged)
+
+    candles = timeframes.view(symbol, interval, merged)
+    return kline_store.klines_to_df(candles[candles["open_time"] >= since_ms])
 
 # ============================================================
 # Obliczanie ATR (Average True Range)
@@ -45,39 +85,98 @@ def atr(df, period=14):
     df.loc[:, 'ATR'] = df['TR'].rolling(window=period).mean()
     return df['ATR'].iloc[-1]
 
+# ============================================================
+# Równoległe pobieranie danych dla wielu symboli
+# ============================================================
+def _fetch_symbol(sym, days, interval):
+    print(f"🔍 Pobieram dane dla {sym}...")
+    df = get_historical_data(f"{sym}USDT", interval=interval, days=days)
+    print(f"✅ Dane OK: {len(df)} rekordów dla {sym}")
+    return df
+
+def fetch_historical_data(symbols, days=30, max_workers=None, interval=timeframes.REPORT_INTERVAL):
+    """
+    Pobiera dane historyczne dla wielu symboli jednocześnie.
+
+    Czas całego etapu to mniej więcej czas najwolniejszego symbolu,
+    a nie suma wszystkich. Zwraca parę słowników:
+    (symbol -> DataFrame, symbol -> wyjątek) – błąd jednego symbolu
+    nie przerywa pobierania pozostałych.
+    """
+    workers = max(1, min(max_workers or KLINES_MAX_WORKERS, len(symbols) or 1))
+    frames, errors = {}, {}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="klines") as pool:
+        # Kontekst (priorytet zapytań Binance) przechodzi do wątków puli
+        futures = {sym: submit_with_context(pool, _fetch_symbol, sym, days, interval) for sym in symbols}
+        for sym, future in futures.items():
+            try:
+                frames[sym] = future.result()
+            except Exception as e:
+                errors[sym] = e
+
+    return frames, errors
+
 # ============================================================
 # Generowanie raportu
 # ============================================================
-def generate_report(symbols):
-    rows = []
+def generate_report(symbols, max_workers=None, interval=timeframes.REPORT_INTERVAL):
+    """
+    Raport 24h/3D/7D/ATR na świecach `interval` (domyślnie 1h – ten trafia
+    do historii). Inne interwały liczymy z tej samej serii bazowej.
+    """
+    timeframes.check_interval(interval)
+    with stage("binance_fetch"):
+        frames, errors = fetch_historical_data(symbols, days=30, max_workers=max_workers, interval=interval)
+
+    for sym, e in errors.items():
+        print(f"❌ Błąd dla {sym}: {e}")
+
+    return _sorted_report(_report_rows(symbols, frames, interval))
+
+
+def top_up_base(symbols, days=30, max_workers=None):
+    """Dociąga z Binance brakujące świece serii bazowej – jedno zapytanie na symbol."""
+    with stage("binance_fetch"):
+        _, errors = fetch_historical_data(symbols, days, max_workers, interval=timeframes.BASE_INTERVAL)
+    for sym, e in errors.items():
+        print(f"❌ Błąd dla {sym}: {e}")
+    return errors
+
+
+def stored_report(symbols, interval=timeframes.REPORT_INTERVAL):
+    """
+    Raport na świecach `interval` wyłącznie z lokalnego magazynu – bez
+    zapytań do Binance (serię bazową dociąga harmonogram i strumień).
+    FileNotFoundError, gdy dla żadnego symbolu nie ma pełnej historii.
+    """
+    timeframes.check_interval(interval)
+    frames = {}
     for sym in symbols:
-        try:
-            print(f"🔍 Pobieram dane dla {sym}...")
-            df = get_historical_data(f"{sym}USDT", days=30)
-            print(f"✅ Dane OK: {len(df)} rekordów dla {sym}")
-
-            close = df['close'].iloc[-1]
-            pct_24h = (df['close'].iloc[-1] - df['close'].iloc[-25]) / df['close'].iloc[-25] * 100
-            pct_3d = (df['close'].iloc[-1] - df['close'].iloc[-73]) / df['close'].iloc[-73] * 100
-            pct_7d = (df['close'].iloc[-1] - df['close'].iloc[-169]) / df['close'].iloc[-169] * 100
-            atr_3d = atr(df.tail(72))
-            atr_7d = atr(df.tail(168))
-            atr_3d_pct = (atr_3d / close) * 100
-            atr_7d_pct = (atr_7d / close) * 100
-
-            rows.append({
-                "Symbol": sym,
-                "Close": float(f"{close:.2f}"),
-                "24h%": float(f"{pct_24h:.2f}"),
-                "3D%": float(f"{pct_3d:.2f}"),
-                "7D%": float(f"{pct_7d:.2f}"),
-                "ATR(3D)%": float(f"{atr_3d_pct:.2f}"),
-                "ATR(7D)%": float(f"{atr_7d_pct:.2f}")
-            })
-        except Exception as e:
-            print(f"❌ Błąd dla {sym}: {e}")
+        arr = timeframes.load_klines(f"{sym}USDT", interval)
+        if len(arr):
+            frames[sym] = kline_store.klines_to_df(arr)
+    rows = _report_rows(symbols, frames, interval)
+    if not rows:
+        raise FileNotFoundError(f"Brak zapisanych świec {interval} do policzenia raportu.")
+    return _sorted_report(rows)
+
+
+def _report_rows(symbols, frames, interval):
+    # Kolejność jak w `symbols`; liczymy wszystko naraz w silniku wektorowym
+    with stage("report_compute"):
+        rows, calc_errors = report_engine.compute_report_rows(
+            {sym: frames[sym] for sym in symbols if sym in frames},
+            timeframes.interval_ms(interval),
+        )
+    for sym, e in calc_errors.items():
+        print(f"❌ Błąd dla {sym}: {e}")
 
     print(f"📊 Zebrano {len(rows)} wierszy.")
+    return rows
+
+
+def _sorted_report(rows):
     df = pd.DataFrame(rows)
     df = df.sort_values(by="24h%", ascending=False)
     print(df)
@@ -86,98 +185,200 @@ def generate_report(symbols):
 # ============================================================
 # Zapis raportu
 # ============================================================
-def save_report_csv(df: pd.DataFrame):
-    folder_path = os.path.join("data", "reports")
-    os.makedirs(folder_path, exist_ok=True)
+# Raporty trafiają do historii kolumnowej (report_history); pojedyncze
+# pliki CSV w data/reports są już tylko opcjonalnym eksportem.
+REPORTS_CSV_EXPORT = os.getenv("REPORTS_CSV_EXPORT", "0") == "1"
+
 
+def save_report(df: pd.DataFrame) -> str:
+    """
+    Zapisuje raport do historii i podmienia najnowszy raport w pamięci.
+    Zwraca report_date (YYYY-MM-DD-HH-MM-SS).
+    """
     today = datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
     df = df.copy()
     df["report_date"] = today
 
-    filename = f"report_{today}.csv"
-    file_path = os.path.join(folder_path, filename)
-    df.to_csv(file_path, index=False)
+    report_history.append_report(df)
+    if REPORTS_CSV_EXPORT:
+        save_report_csv(df)
+
+    # Od razu podmieniamy raport w pamięci – w tej samej postaci, w jakiej
+    # przeczytają go z historii inne procesy (te same bajty i ETag w każdym workerze).
+    # Wersja przed odczytem: jeśli inny proces dopisze raport pomiędzy, zapamiętamy
+    # starszą wersję i następne sprawdzenie wczyta nowy raport – nigdy odwrotnie.
+    version = report_history.version()
+    latest = _read_latest_report()
+    with _latest_cache.lock:
+        _latest_cache.store(latest, version)
+    publish_latest_report(latest)
+
+    print(f"✅ Raport zapisany: {today}")
+    return today
 
-    print(f"✅ Raport zapisany: {file_path}")
+
+def save_report_csv(df: pd.DataFrame):
+    """Eksport jednego raportu (z kolumną report_date) do data/reports/report_<data>.csv."""
+    folder_path = os.path.join("data", "reports")
+    os.makedirs(folder_path, exist_ok=True)
+
+    file_path = os.path.join(folder_path, f"report_{df['report_date'].iloc[0]}.csv")
+    # Zapis przez plik tymczasowy – czytelnicy nigdy nie widzą połowy raportu
+    tmp_path = file_path + ".tmp"
+    with stage("csv_write"):
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, file_path)
+    return file_path
 
 # ============================================================
 # Scalanie raportów
 # ============================================================
 def merge_all_reports():
     """
-    Merge all CSV reports from data/reports into a single all_reports.csv file.
+    Importuje do historii kolumnowej raporty CSV z data/reports
+    (i starszy data/all_reports.csv). Na bieżąco historię uzupełnia
+    save_report – ten import jest potrzebny tylko na żądanie.
     """
-    reports_dir = "data/reports"
-    pattern = os.path.join(reports_dir, "report_*.csv")
-    files = glob.glob(pattern)
+    report_history.rebuild()
 
-    if not files:
-        print("⚠️ Brak plików raportów do połączenia.")
-        return
-
-    frames = []
+# ============================================================
+# Helpers pod API: latest_report + signals
+# ============================================================
 
-    for path in files:
-        try:
-            df = pd.read_csv(path)
+# Co ile sekund sprawdzamy wersję historii – na wypadek, gdyby nowy
+# raport zapisał inny proces. Między sprawdzeniami nie dotykamy dysku.
+LATEST_REPORT_CHECK_SECONDS = float(os.getenv("LATEST_REPORT_CHECK_SECONDS", "5"))
 
-            # Normalizacja nazwy kolumny z symbolem
-            if "symbol" not in df.columns and "Symbol" in df.columns:
-                df["symbol"] = df["Symbol"]
 
-            # Ustal report_date – jeśli nie ma, użyj stempla z nazwy pliku
-            if "report_date" not in df.columns:
-                base = os.path.basename(path)
-                ts = base.replace("report_", "").replace(".csv", "")
-                df["report_date"] = ts
+# Ile wariantów progów /signals trzymamy gotowych dla bieżącego raportu
+SIGNALS_PAYLOADS_MAX = 64
 
-            frames.append(df)
 
-        except Exception as e:
-            print(f"⚠️ Problem z plikiem {path}: {e}")
+class _LatestReportCache:
+    """Najnowszy raport w pamięci procesu + gotowe odpowiedzi /reports/latest i /signals."""
 
-    if not frames:
-        print("⚠️ Nie udało się wczytać żadnego raportu.")
-        return
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.df: pd.DataFrame | None = None
+        self.version: tuple | None = None
+        self.checked_at = 0.0
+        self.payload: http_cache.Payload | None = None
+        self.signals_payloads: Dict[tuple, http_cache.Payload] = {}
 
-    merged_df = pd.concat(frames, ignore_index=True)
+    def store(self, df: pd.DataFrame, version: tuple | None):
+        self.df = df
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.payload = None
+        self.signals_payloads = {}
 
-    subset_cols = [col for col in ["symbol", "report_date"] if col in merged_df.columns]
-    if subset_cols:
-        merged_df.drop_duplicates(subset=subset_cols, inplace=True)
 
-    sort_cols = [col for col in ["report_date", "symbol"] if col in merged_df.columns]
-    if sort_cols:
-        merged_df.sort_values(by=sort_cols, inplace=True)
+_latest_cache = _LatestReportCache()
 
-    out_path = "data/all_reports.csv"
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    merged_df.to_csv(out_path, index=False)
-    print(f"✅ Połączono {len(files)} raportów -> {out_path}")
 
-# ============================================================
-# Helpers pod API: latest_report + signals
-# ============================================================
+def _read_latest_report() -> pd.DataFrame:
+    df = report_history.latest_report()
+    df["generated_at"] = df["report_date"]
+    # Historia trzyma wiersze wg symbolu; raport – jak generate_report – wg 24h%
+    if "24h%" in df.columns:
+        df = df.sort_values(by="24h%", ascending=False, kind="stable", ignore_index=True)
+    return df
 
-REPORTS_DIR = Path("data/reports")
 
 def get_latest_report_df() -> pd.DataFrame:
     """
-    Zwraca DataFrame z najnowszego pliku raportu w data/reports/.
-    Zakładamy nazewnictwo report_YYYY-MM-DD-HH-MM-SS.csv
+    Zwraca DataFrame z najnowszym raportem z historii (data/history).
+
+    Wynik jest trzymany w pamięci i współdzielony między zapytaniami –
+    nie modyfikuj go w miejscu. save_report podmienia go od razu,
+    a raport zapisany przez inny proces wykrywamy po wersji historii.
     """
-    if not REPORTS_DIR.exists():
-        raise FileNotFoundError("Katalog data/reports nie istnieje")
+    cache = _latest_cache
+    with cache.lock:
+        now = time.monotonic()
+        if cache.df is not None and now - cache.checked_at < LATEST_REPORT_CHECK_SECONDS:
+            return cache.df
+
+        version = report_history.version()
+        if cache.df is None or version != cache.version:
+            cache.store(_read_latest_report(), version)
+        cache.checked_at = now
+        return cache.df
+
+
+def _dumps(payload) -> bytes:
+    return json.dumps(
+        payload,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_json_default,
+    ).encode("utf-8")
+
+
+def _report_time(df: pd.DataFrame) -> datetime | None:
+    """Czas wygenerowania raportu (Last-Modified); report_date to czas lokalny."""
+    try:
+        return datetime.strptime(str(df["generated_at"].iloc[0]), report_history.REPORT_DATE_FORMAT)
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+def report_http_payload(payload, df: pd.DataFrame) -> http_cache.Payload:
+    """Odpowiedź HTTP (bajty + gzip/br + ETag/Last-Modified) z danych wyliczonych z raportu df."""
+    return http_cache.Payload(_dumps(payload), last_modified=_report_time(df))
+
+
+def get_latest_report_payload() -> http_cache.Payload:
+    """Odpowiedź /reports/latest – serializowana i kompresowana raz na wersję raportu."""
+    df = get_latest_report_df()
+    cache = _latest_cache
+    with cache.lock:
+        if cache.df is df and cache.payload is not None:
+            return cache.payload
+    payload = report_http_payload(df_to_latest_report_payload(df), df)
+    with cache.lock:
+        if cache.df is df:
+            cache.payload = payload
+    return payload
+
 
-    report_files = sorted(REPORTS_DIR.glob("report_*.csv"))
-    if not report_files:
-        raise FileNotFoundError("Brak plików raportów w data/reports")
+def signals_payload(df: pd.DataFrame, change_24h_threshold: float = 8.0, atr_7d_threshold: float = 7.0) -> Dict:
+    signals_list = detect_signals_from_df(
+        df,
+        change_24h_threshold=change_24h_threshold,
+        atr_7d_threshold=atr_7d_threshold,
+    )
+    return {"count": len(signals_list), "signals": signals_list}
+
+
+def get_signals_payload(change_24h_threshold: float = 8.0, atr_7d_threshold: float = 7.0) -> http_cache.Payload:
+    """Odpowiedź /signals dla najnowszego raportu – jedna na (raport, progi)."""
+    df = get_latest_report_df()
+    key = (change_24h_threshold, atr_7d_threshold)
+    cache = _latest_cache
+    with cache.lock:
+        if cache.df is df and key in cache.signals_payloads:
+            return cache.signals_payloads[key]
+    payload = report_http_payload(signals_payload(df, *key), df)
+    with cache.lock:
+        if cache.df is df:
+            if len(cache.signals_payloads) >= SIGNALS_PAYLOADS_MAX:
+                cache.signals_payloads.clear()
+            cache.signals_payloads[key] = payload
+    return payload
 
-    latest = report_files[-1]
-    df = pd.read_csv(latest)
 
-    df["generated_at"] = latest.stem.replace("report_", "")
-    return df
+def publish_latest_report(df: pd.DataFrame) -> None:
+    """Rozsyła raport i jego sygnały (domyślne progi) do klientów SSE."""
+    broadcaster.publish_report(df_to_latest_report_payload(df), detect_signals_from_df(df))
+
+
+def _json_default(value):
+    # Skalary NumPy (np.int64 itd.) nie są natywnie serializowalne
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Nie da się zserializować {type(value).__name__}")
 
 def df_to_latest_report_payload(df: pd.DataFrame) -> Dict:
     """
@@ -187,64 +388,30 @@ def df_to_latest_report_payload(df: pd.DataFrame) -> Dict:
     """
     generated_at = str(df["generated_at"].iloc[0]) if "generated_at" in df.columns else None
 
-    payload = {
+    # Kolumnami zamiast iterrows; brakująca kolumna daje None jak row.get()
+    keys = ["symbol", *signals.REPORT_FIELDS]
+    columns = [
+        df[col].tolist() if col in df.columns else [None] * len(df)
+        for col in ["Symbol", *signals.REPORT_FIELDS.values()]
+    ]
+
+    return {
         "generated_at": generated_at,
-        "symbols": []
+        "symbols": [dict(zip(keys, values)) for values in zip(*columns)],
     }
 
-    for _, row in df.iterrows():
-        payload["symbols"].append(
-            {
-                "symbol": row.get("Symbol"),
-                "close": row.get("Close"),
-                "change_24h": row.get("24h%"),
-                "change_3d": row.get("3D%"),
-                "change_7d": row.get("7D%"),
-                "atr_3d": row.get("ATR(3D)%"),
-                "atr_7d": row.get("ATR(7D)%"),
-            }
-        )
-
-    return payload
-
 def detect_signals_from_df(
     df: pd.DataFrame,
     change_24h_threshold: float = 8.0,
     atr_7d_threshold: float = 7.0,
 ) -> List[Dict]:
     """
-    Bardzo prosta logika sygnałów:
+    Wbudowane reguły sygnałów (patrz signals.BUILTIN_RULES):
     - big_move_24h: |24h%| >= change_24h_threshold
     - high_atr_7d: ATR(7D)% >= atr_7d_threshold
     """
-    signals: List[Dict] = []
-
-    for _, row in df.iterrows():
-        reasons = []
-
-        change_24h = row.get("24h%")
-        atr_7d = row.get("ATR(7D)%")
-
-        if change_24h is not None and abs(change_24h) >= change_24h_threshold:
-            reasons.append("big_move_24h")
-
-        if atr_7d is not None and atr_7d >= atr_7d_threshold:
-            reasons.append("high_atr_7d")
-
-        if not reasons:
-            continue
-
-        signals.append(
-            {
-                "symbol": row.get("Symbol"),
-                "reasons": reasons,
-                "change_24h": change_24h,
-                "change_3d": row.get("3D%"),
-                "change_7d": row.get("7D%"),
-                "atr_3d": row.get("ATR(3D)%"),
-                "atr_7d": atr_7d,
-            }
-        )
-
-    return signals
-
+    profile = {
+        "change_24h_threshold": change_24h_threshold,
+        "atr_7d_threshold": atr_7d_threshold,
+    }
+    return signals.signals_for_profiles(df, [profile])[0]
@@ -0,0 +1,366 @@
+"""Wektorowy backtest reguł sygnałów na zapisanych świecach.
+
+Pytanie „czy progi 8% / 7% z /signals mają sens?” wymaga odtworzenia
+raportu dla każdej świecy z historii. Zamiast wołać `generate_report`
+tysiące razy, liczymy cechy raportu dla całej siatki (czas × symbol)
+naraz, tymi samymi wzorami co `report_engine`:
+- zmiana % o tyle świec wstecz, ile daje `report_windows` dla interwału,
+- ATR = średnia z ostatnich `period` wartości TR (gdy okno jest dłuższe
+  niż okres, daje to tę samą liczbę dla każdego okna, jak w raporcie),
+- zaokrąglenie do 2 miejsc, bo reguły widzą wartości z raportu.
+
+Reguły z `signals` (te same co w /signals) dają maskę sygnałów, a dla
+każdego sygnału liczymy zwrot po `horizons` godzinach (w świecach
+wybranego interwału). Przegląd siatki
+progów dzielimy na porcje profili i liczymy w puli procesów; cechy trafiają
+do workerów jako pliki .npy mapowane w pamięci, więc nie kopiujemy ich
+do każdego procesu.
+
+Uruchomienie z katalogu `backend/`:
+
+    python -m app.services.backtest --symbols BTC,ETH,SOL \\
+        --grid change_24h_threshold=4,6,8,10 --grid atr_7d_threshold=5,7,9
+"""
+
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.services import signals, timeframes
+from app.services.report_engine import report_windows
+
+# Kolumna raportu -> nazwa pola w regułach (signals.REPORT_FIELDS odwrotnie)
+_FIELD_BY_COLUMN = {col: field for field, col in signals.REPORT_FIELDS.items()}
+
+# Horyzonty zwrotów w godzinach – niezależnie od interwału świec
+DEFAULT_HORIZONS = (24, 72, 168)
+
+# Ile profili progów liczy jedno zadanie w puli (maski: profile × N bool)
+PROFILES_PER_TASK = 8
+
+
+# ============================================================
+# Dane: siatka czas × symbol
+# ============================================================
+def load_grid(symbols: Sequence[str], interval: str = "1h", days: Optional[int] = None):
+    """
+    Wczytuje zapisane świece i układa je na wspólnej, regularnej osi czasu.
+    Interwał inny niż bazowy jest liczony z serii bazowej (`timeframes`).
+
+    Zwraca (open_times, symbols, {high, low, close}) z tablicami (T × S);
+    brak świecy (przed notowaniem, luka w danych) to NaN.
+    """
+    step = timeframes.interval_ms(interval)
+    stored = {}
+    for sym in symbols:
+        arr = timeframes.load_klines(f"{sym}USDT", interval)
+        if len(arr):
+            stored[sym] = arr
+    if not stored:
+        raise FileNotFoundError("Brak zapisanych świec dla podanych symboli.")
+
+    start = min(int(a["open_time"][0]) for a in stored.values())
+    end = max(int(a["open_time"][-1]) for a in stored.values())
+    if days is not None:
+        start = max(start, end - days * 86_400_000)
+    open_times = np.arange(start, end + step, step, dtype=np.int64)
+
+    names = list(stored)
+    shape = (len(open_times), len(names))
+    arrays = {col: np.full(shape, np.nan) for col in ("high", "low", "close")}
+    for j, sym in enumerate(names):
+        arr = stored[sym]
+        arr = arr[arr["open_time"] >= start]
+        idx = (arr["open_time"] - start) // step
+        for col, out in arrays.items():
+            out[idx, j] = arr[col]
+    return open_times, names, arrays
+
+
+def _rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """Średnia z `period` ostatnich wierszy przez sumy skumulowane; okno z NaN -> NaN."""
+    valid = np.isfinite(values)
+    csum = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    ccount = np.cumsum(valid, axis=0)
+    out = np.full_like(values, np.nan)
+    window_sum = csum[period - 1:].copy()
+    window_sum[1:] -= csum[:-period]
+    window_count = ccount[period - 1:].copy()
+    window_count[1:] -= ccount[:-period]
+    out[period - 1:] = np.where(window_count == period, window_sum / period, np.nan)
+    return out
+
+
+def compute_features(
+    high: np.ndarray, low: np.ndarray, close: np.ndarray, interval: str = "1h"
+) -> Dict[str, np.ndarray]:
+    """
+    Kolumny raportu (w nazwach REPORT_FIELDS) dla każdej świecy i symbolu.
+
+    Wiersz t to raport wygenerowany po zamknięciu świecy t; okna w świecach
+    `interval`, jak w `compute_report_rows`. Punkty bez pełnego okna
+    historii raportu (`lookback` świec) są NaN.
+    """
+    lags, windows, period, lookback = report_windows(timeframes.interval_ms(interval))
+    features = {"close": np.round(close, 2)}
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for col, lag in lags.items():
+            change = np.full_like(close, np.nan)
+            change[lag:] = (close[lag:] - close[:-lag]) / close[:-lag] * 100
+            features[_FIELD_BY_COLUMN[col]] = np.round(change, 2)
+
+        prev_close = np.full_like(close, np.nan)
+        prev_close[1:] = close[:-1]
+        hl = high - low
+        tr = np.fmax(np.fmax(hl, np.abs(high - prev_close)), np.abs(low - prev_close))
+        tr[0] = np.nan  # raport nigdy nie sięga po TR bez poprzedniego zamknięcia
+        atr = _rolling_mean(tr, period)
+
+        for col, window in windows.items():
+            if window > period:
+                window_atr = atr
+            else:
+                # Okno == okres: pierwsza świeca ogona nie ma poprzedniego
+                # zamknięcia, więc jej TR to samo H-L (jak `batched_atr`)
+                first = np.full_like(close, np.nan)
+                first[period - 1:] = (hl - tr)[: len(close) - period + 1]
+                window_atr = atr + first / period
+            features[_FIELD_BY_COLUMN[col]] = np.round(window_atr / close * 100, 2)
+
+    # Pełna historia raportu: wszystkie świece z okna `lookback`
+    present = np.isfinite(close)
+    count = np.cumsum(present, axis=0)
+    in_window = count.copy()
+    in_window[lookback:] -= count[:-lookback]
+    complete = in_window >= lookback
+    for name, values in features.items():
+        features[name] = np.where(complete, values, np.nan)
+    return features
+
+
+def horizon_candles(horizons: Sequence[int], interval: str = "1h") -> Dict[int, int]:
+    """Horyzont w godzinach -> liczba świec `interval`; musi być ich wielokrotnością."""
+    step = timeframes.interval_ms(interval)
+    out = {}
+    for h in horizons:
+        if h <= 0 or h * 3_600_000 % step:
+            raise ValueError(f"Horyzont {h}h nie jest wielokrotnością świecy {interval}")
+        out[h] = h * 3_600_000 // step
+    return out
+
+
+def forward_returns(close: np.ndarray, horizons: Dict[int, int]) -> Dict[int, np.ndarray]:
+    """Zwrot % od zamknięcia świecy t do zamknięcia świecy o `candles` dalej ({h: candles})."""
+    out = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for h, candles in horizons.items():
+            fwd = np.full_like(close, np.nan)
+            fwd[:-candles] = (close[candles:] - close[:-candles]) / close[:-candles] * 100
+            out[h] = fwd
+    return out
+
+
+# ============================================================
+# Ocena profili progów
+# ============================================================
+def _stats(prefix: str, values: np.ndarray, direction: np.ndarray) -> Dict[str, float]:
+    ok = np.isfinite(values)
+    values, direction = values[ok], direction[ok]
+    if not len(values):
+        return {f"{prefix}_n": 0, f"{prefix}_mean": np.nan, f"{prefix}_win": np.nan, f"{prefix}_momentum": np.nan}
+    return {
+        f"{prefix}_n": int(len(values)),
+        f"{prefix}_mean": float(values.mean()),
+        f"{prefix}_win": float((values > 0).mean()),
+        # zwrot w kierunku ruchu 24h, który wywołał sygnał (kontynuacja > 0)
+        f"{prefix}_momentum": float((values * direction).mean()),
+    }
+
+
+def score_profiles(
+    features: Dict[str, np.ndarray],
+    fwd: Dict[int, np.ndarray],
+    shape: tuple,
+    profiles: Sequence[Dict[str, float]],
+    rules: Sequence[signals.SignalRule] = signals.BUILTIN_RULES,
+    entries_only: bool = True,
+) -> List[Dict]:
+    """
+    Statystyki zwrotów po sygnałach dla każdego profilu.
+
+    `features` i `fwd` to spłaszczone tablice (T·S). Przy `entries_only`
+    liczy się tylko pierwsza świeca serii sygnałów danego symbolu –
+    ten sam ruch nie jest liczony kilkadziesiąt razy.
+    """
+    masks = signals.evaluate_columns(features, profiles, rules)
+    hits = masks.any(axis=1).reshape(len(profiles), *shape)
+    if entries_only:
+        previous = hits[:, :-1].copy()
+        hits[:, 1:] &= ~previous
+
+    direction = np.sign(features["change_24h"])
+    results = []
+    for p, profile in enumerate(profiles):
+        selected = hits[p].ravel()
+        row = {**profile, "signals": int(selected.sum())}
+        for h, values in fwd.items():
+            row.update(_stats(f"fwd_{h}", values[selected], direction[selected]))
+        results.append(row)
+    return results
+
+
+# ------------------------------------------------------------
+# Pula procesów: cechy z plików .npy (mmap), bez kopiowania per zadanie
+# ------------------------------------------------------------
+_worker_data: Dict = {}
+
+
+def _init_worker(data_dir: str, names: List[str], horizons: List[int], shape: tuple) -> None:
+    _worker_data["features"] = {n: np.load(os.path.join(data_dir, f"{n}.npy"), mmap_mode="r") for n in names}
+    _worker_data["fwd"] = {h: np.load(os.path.join(data_dir, f"fwd_{h}.npy"), mmap_mode="r") for h in horizons}
+    _worker_data["shape"] = shape
+
+
+def _score_chunk(profiles, rules, entries_only):
+    return score_profiles(
+        _worker_data["features"], _worker_data["fwd"], _worker_data["shape"],
+        profiles, rules, entries_only,
+    )
+
+
+def expand_grid(grid: Dict[str, Sequence[float]]) -> List[Dict[str, float]]:
+    """{'a': [1, 2], 'b': [3]} -> [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def sweep(
+    symbols: Sequence[str],
+    grid: Dict[str, Sequence[float]],
+    interval: str = "1h",
+    days: Optional[int] = None,
+    horizons: Sequence[int] = DEFAULT_HORIZONS,
+    rules: Sequence[signals.SignalRule] = signals.BUILTIN_RULES,
+    entries_only: bool = True,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Backtest wszystkich kombinacji progów z `grid` na zapisanych świecach.
+
+    Wiersz wyniku = profil progów + liczba sygnałów + statystyki zwrotów
+    dla każdego horyzontu (`horizons` w godzinach, kolumny `fwd_<h>`).
+    Pierwszy wiersz (`profile="baseline"`) to te same
+    statystyki dla wszystkich punktów, jako punkt odniesienia.
+    """
+    candles = horizon_candles(horizons, interval)
+    open_times, names, arrays = load_grid(symbols, interval, days)
+    shape = arrays["close"].shape
+    features = compute_features(arrays["high"], arrays["low"], arrays["close"], interval)
+    features = {n: v.ravel() for n, v in features.items()}
+    fwd = {h: v.ravel() for h, v in forward_returns(arrays["close"], candles).items()}
+
+    profiles = expand_grid(grid) or [{}]
+    chunks = [profiles[i:i + PROFILES_PER_TASK] for i in range(0, len(profiles), PROFILES_PER_TASK)]
+
+    if max_workers == 1 or len(chunks) == 1:
+        rows = [r for chunk in chunks for r in score_profiles(features, fwd, shape, chunk, rules, entries_only)]
+    else:
+        data_dir = tempfile.mkdtemp(prefix="backtest_")
+        try:
+            for n, v in features.items():
+                np.save(os.path.join(data_dir, f"{n}.npy"), v)
+            for h, v in fwd.items():
+                np.save(os.path.join(data_dir, f"fwd_{h}.npy"), v)
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(data_dir, list(features), list(horizons), shape),
+            ) as pool:
+                parts = pool.map(_score_chunk, chunks, [rules] * len(chunks), [entries_only] * len(chunks))
+                rows = [r for part in parts for r in part]
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    valid = np.isfinite(features["change_24h"])
+    baseline = {"profile": "baseline", "signals": int(valid.sum())}
+    for h, values in fwd.items():
+        baseline.update(_stats(f"fwd_{h}", values[valid], np.sign(features["change_24h"][valid])))
+
+    result = pd.DataFrame([baseline] + [{"profile": "grid", **r} for r in rows])
+    params = list(grid)
+    result = result[["profile", *params, *(c for c in result.columns if c not in params and c != "profile")]]
+    result.attrs.update(
+        symbols=names,
+        candles=len(open_times),
+        start=pd.to_datetime(open_times[0], unit="ms"),
+        end=pd.to_datetime(open_times[-1], unit="ms"),
+    )
+    return result
+
+
+# ============================================================
+# CLI
+# ============================================================
+def _parse_grid(items: Sequence[str]) -> Dict[str, List[float]]:
+    grid = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if not values:
+            raise ValueError(f"Oczekiwano nazwa=w1,w2,..., a jest '{item}'")
+        grid[name.strip()] = [float(v) for v in values.split(",")]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest reguł sygnałów")
+    parser.add_argument("--symbols", default="BTC,ETH,SOL,BNB,TAO,DASH,HEMI,PYTH")
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--days", type=int, help="ogranicz do ostatnich N dni zapisanych danych")
+    parser.add_argument("--fetch-days", type=int, help="najpierw dociągnij N dni świec z Binance")
+    parser.add_argument("--grid", action="append", default=[], help="np. change_24h_threshold=4,6,8,10")
+    parser.add_argument("--horizons", default=",".join(map(str, DEFAULT_HORIZONS)), help="w godzinach")
+    parser.add_argument("--all-candles", action="store_true", help="licz każdą świecę z sygnałem, nie tylko wejścia")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--out", help="zapisz wyniki do CSV")
+    args = parser.parse_args()
+
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    if args.fetch_days:
+        from app.services.analytics import fetch_historical_data
+
+        _, errors = fetch_historical_data(symbols, days=args.fetch_days, interval=args.interval)
+        for sym, e in errors.items():
+            print(f"⚠️ {sym}: {e}")
+
+    grid = _parse_grid(args.grid) or {
+        name: [value] for rule in signals.BUILTIN_RULES for name, value in rule.defaults.items()
+    }
+    result = sweep(
+        symbols,
+        grid,
+        interval=args.interval,
+        days=args.days,
+        horizons=[int(h) for h in args.horizons.split(",")],
+        entries_only=not args.all_candles,
+        max_workers=args.workers,
+    )
+
+    print(f"📊 {len(result.attrs['symbols'])} symboli, {result.attrs['candles']} świec "
+          f"({result.attrs['start']} – {result.attrs['end']}), {len(result) - 1} profili")
+    with pd.option_context("display.width", 200, "display.max_columns", 50):
+        print(result.round(3).to_string(index=False))
+    if args.out:
+        result.to_csv(args.out, index=False)
+        print(f"✅ Wyniki zapisane: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
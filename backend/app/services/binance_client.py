@@ -5,22 +5,259 @@ obiekt `Client`. Dzięki temu reszta modułów może importować gotową
 instancję i nie martwić się o limity API wynikające z wielokrotnego
 logowania. Utrzymuję też pomocniczą funkcję `get_prices`, która zwraca
 czysty słownik – to ułatwia serializację np. do JSON-a.
+
+Wszystkie zapytania REST idą przez `gateway` (`BinanceGateway`):
+- klient powstaje przy pierwszym użyciu (bez pingu), z pulą połączeń
+  dopasowaną do liczby wątków pobierających świece,
+- budżet wagi to token bucket (`BINANCE_WEIGHT_LIMIT` na minutę, z
+  zapasem `BINANCE_WEIGHT_SAFETY`, pełny na początku każdej minuty),
+  korygowany nagłówkiem
+  `X-MBX-USED-WEIGHT-1M` z każdej odpowiedzi,
+- przy braku budżetu wołający czekają w kolejce priorytetowej –
+  harmonogram (`PRIORITY_SCHEDULER`) przed zapytaniami z API,
+- 429/418 wstrzymuje wszystkie zapytania na `Retry-After`.
+
+Sam pakiet python-binance (wraz z klientem async i dateparserem) ładuje
+się dopiero przy pierwszym zapytaniu – import tego modułu jest tani i nie
+dotyka sieci, więc API wstaje także przy niedostępnym Binance.
+
+Priorytet ustawia się kontekstem: `with request_priority(PRIORITY_SCHEDULER): ...`.
 """
 
+import contextlib
+import contextvars
+import heapq
+import itertools
 import os
-from binance.client import Client
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
 from dotenv import load_dotenv
 
-load_dotenv()
+from app.services.metrics import BINANCE_RATE_LIMITED, BINANCE_WEIGHT, Gauge
+
+if TYPE_CHECKING:
+    from binance.client import Client
+
+# Limit wagi Binance Spot na adres IP (na minutę) i część, której używamy
+BINANCE_WEIGHT_LIMIT = int(os.getenv("BINANCE_WEIGHT_LIMIT", "6000"))
+BINANCE_WEIGHT_SAFETY = float(os.getenv("BINANCE_WEIGHT_SAFETY", "0.8"))
+BINANCE_POOL_SIZE = int(os.getenv("BINANCE_POOL_SIZE", "16"))
+MAX_RETRIES = 3
+
+# Mniejsza liczba = wyższy priorytet
+PRIORITY_SCHEDULER = 0
+PRIORITY_API = 10
+
+# Wagi zapytań REST (dokumentacja Binance Spot API)
+WEIGHTS = {
+    "get_klines": 2,
+    "get_exchange_info": 20,
+    "get_ticker": 80,        # bez symbolu; z symbolem 2
+    "get_all_tickers": 4,
+    "ping": 1,
+    "get_server_time": 1,
+}
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("binance_priority", default=PRIORITY_API)
+
+
+@contextlib.contextmanager
+def request_priority(priority: int):
+    """Ustawia priorytet zapytań Binance w bieżącym kontekście (wątku / zadaniu)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def submit_with_context(pool, fn: Callable, *args):
+    """`pool.submit`, który przenosi kontekst (m.in. priorytet) do wątku puli."""
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+class WeightBudget:
+    """
+    Budżet wagi zapytań (token bucket) z kolejką priorytetową oczekujących.
+
+    Binance liczy wagę w oknach zegarowych (pełna minuta), więc wiadro
+    napełnia się do pełna na początku każdego okna, a nie płynnie –
+    płynne dolewanie pozwoliłoby przekroczyć limit w obrębie jednego okna.
+    """
+
+    def __init__(
+        self,
+        limit: int = BINANCE_WEIGHT_LIMIT,
+        safety: float = BINANCE_WEIGHT_SAFETY,
+        window_seconds: float = 60.0,
+    ):
+        self.capacity = limit * safety
+        self.window_seconds = window_seconds
+        self.tokens = self.capacity
+        self.window = self._window_index()
+        self.blocked_until = 0.0
+        self.server_used: Optional[int] = None
+        self.waited_seconds = 0.0
+        self._cond = threading.Condition()
+        self._waiters: list = []
+        self._seq = itertools.count()
+
+    def _window_index(self) -> int:
+        return int(time.time() // self.window_seconds)
+
+    def _refill(self) -> None:
+        window = self._window_index()
+        if window != self.window:
+            self.window = window
+            self.tokens = self.capacity
+            self.server_used = None
+
+    def _until_next_window(self) -> float:
+        return self.window_seconds - time.time() % self.window_seconds
+
+    def acquire(self, weight: int, priority: int) -> None:
+        """Blokuje, aż w budżecie jest `weight` i nikt ważniejszy nie czeka."""
+        entry = (priority, next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.time()
+                    self._refill()
+                    if self._waiters[0] == entry and now >= self.blocked_until and self.tokens >= weight:
+                        self.tokens -= weight
+                        break
+                    if now < self.blocked_until:
+                        timeout = self.blocked_until - now
+                    elif self.tokens < weight:
+                        timeout = self._until_next_window()
+                    else:
+                        timeout = 1.0  # czekamy na swoją kolej w kolejce
+                    self._cond.wait(timeout=min(max(timeout, 0.01), 1.0))
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+        self.waited_seconds += time.monotonic() - started
 
-client = Client(
-    api_key=os.getenv("BINANCE_API_KEY"),
-    api_secret=os.getenv("BINANCE_API_SECRET")
+    def observe(self, used_weight: int) -> None:
+        """Koryguje budżet wagą zużytą wg serwera (inne procesy na tym IP też się liczą)."""
+        with self._cond:
+            self._refill()
+            self.server_used = used_weight
+            self.tokens = min(self.tokens, self.capacity - used_weight)
+
+    def block(self, seconds: float) -> None:
+        with self._cond:
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+            self.tokens = min(self.tokens, 0.0)
+            self._cond.notify_all()
+
+    def status(self) -> Dict:
+        with self._cond:
+            self._refill()
+            return {
+                "capacity": round(self.capacity),
+                "tokens": round(self.tokens, 1),
+                "server_used_weight_1m": self.server_used,
+                "waiting": len(self._waiters),
+                "blocked_for_s": round(max(self.blocked_until - time.time(), 0.0), 1),
+                "waited_seconds_total": round(self.waited_seconds, 2),
+            }
+
+
+class BinanceGateway:
+    """Wspólny, leniwie tworzony klient Binance z budżetem wagi."""
+
+    def __init__(self, budget: Optional[WeightBudget] = None):
+        self.budget = budget or WeightBudget()
+        self.requests = 0
+        self._client: Optional["Client"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> "Client":
+        with self._lock:
+            if self._client is None:
+                import requests
+                from binance.client import Client
+
+                load_dotenv(override=False)
+                client = Client(
+                    api_key=os.getenv("BINANCE_API_KEY"),
+                    api_secret=os.getenv("BINANCE_API_SECRET"),
+                    ping=False,
+                )
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=BINANCE_POOL_SIZE, pool_maxsize=BINANCE_POOL_SIZE
+                )
+                client.session.mount("https://", adapter)
+                client.session.mount("http://", adapter)
+                client.session.hooks["response"].append(self._on_response)
+                self._client = client
+            return self._client
+
+    def _on_response(self, response, *args, **kwargs):
+        used = response.headers.get("x-mbx-used-weight-1m")
+        if used is not None:
+            try:
+                self.budget.observe(int(used))
+            except ValueError:
+                pass
+
+    def call(self, method: str, weight: Optional[int] = None, **params) -> Any:
+        """Wywołuje metodę klienta python-binance w ramach budżetu wagi."""
+        from binance.exceptions import BinanceAPIException
+
+        if weight is None:
+            weight = WEIGHTS.get(method, 1)
+            if method == "get_ticker" and "symbol" in params:
+                weight = 2
+        fn = getattr(self.client, method)
+
+        for attempt in range(MAX_RETRIES + 1):
+            self.budget.acquire(weight, _priority.get())
+            self.requests += 1
+            BINANCE_WEIGHT.inc(weight, method=method)
+            try:
+                return fn(**params)
+            except BinanceAPIException as e:
+                if e.status_code in (418, 429):
+                    BINANCE_RATE_LIMITED.inc()
+                if e.status_code not in (418, 429) or attempt == MAX_RETRIES:
+                    raise
+                retry_after = float(e.response.headers.get("Retry-After", 60)) if e.response is not None else 60.0
+                print(f"⛔ Binance limit ({e.status_code}) – wstrzymuję zapytania na {retry_after:.0f}s")
+                self.budget.block(retry_after)
+
+    # Najczęstsze wywołania
+    def get_klines(self, **params):
+        return self.call("get_klines", **params)
+
+    def get_exchange_info(self):
+        return self.call("get_exchange_info")
+
+    def get_ticker(self, **params):
+        return self.call("get_ticker", **params)
+
+    def status(self) -> Dict:
+        return {"requests": self.requests, **self.budget.status()}
+
+
+gateway = BinanceGateway()
+
+Gauge(
+    "kryptosfera_binance_used_weight_1m",
+    "Waga zużyta w bieżącej minucie wg nagłówka X-MBX-USED-WEIGHT-1M",
+    fn=lambda: gateway.budget.server_used or 0,
 )
 
+
 def get_prices(symbols):
     """Pobiera aktualne ceny wybranych kryptowalut."""
-    tickers = client.get_all_tickers()
+    tickers = gateway.call("get_all_tickers")
     data = {t['symbol']: float(t['price']) for t in tickers if t['symbol'] in symbols}
     return data
-
@@ -0,0 +1,142 @@
+"""Rozgłaszanie raportów i sygnałów do dashboardu (Server-Sent Events).
+
+Frontend odpytywał `/reports/latest` i `/signals` co minutę, nawet gdy
+nic się nie zmieniło. Tutaj trzymamy ostatni stan (raport + sygnały)
+i jedną listę subskrybentów. Każde zdarzenie serializujemy raz, a te same
+bajty trafiają do kolejek wszystkich klientów.
+
+Nowy klient dostaje najpierw zdarzenie `snapshot` z pełnym stanem,
+a potem już tylko:
+- `report` – nowy raport (pełny payload jak w /reports/latest),
+- `signals` – różnica sygnałów: added / changed / removed,
+- `live_signal` – sygnał ze strumienia świec (stream.KlineStream).
+
+`publish_*` można wołać z dowolnego wątku (endpointy sync, harmonogram);
+do pętli zdarzeń przechodzimy przez `call_soon_threadsafe`.
+"""
+
+import asyncio
+import json
+import math
+import threading
+from typing import AsyncIterator, Dict, List, Optional
+
+# Klient, który nie nadąża, zostaje rozłączony – po ponownym połączeniu
+# i tak dostanie świeży snapshot.
+SUBSCRIBER_QUEUE_SIZE = 100
+KEEPALIVE_SECONDS = 15.0
+
+
+def _finite(value):
+    """NaN/inf -> None w zagnieżdżonych dict/list (JSON.parse nie zna NaN)."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def _sse(event: str, data: Dict, event_id: Optional[int] = None) -> bytes:
+    body = json.dumps(_finite(data), ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=str)
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {body}\n\n".encode("utf-8")
+
+
+def diff_signals(old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict[str, List]:
+    """Różnica dwóch zbiorów sygnałów (klucz: symbol)."""
+    return {
+        "added": [new[s] for s in new if s not in old],
+        "changed": [new[s] for s in new if s in old and new[s] != old[s]],
+        "removed": [s for s in old if s not in new],
+    }
+
+
+class Broadcaster:
+    """Jeden punkt rozsyłania zdarzeń do wszystkich podłączonych klientów."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: set[asyncio.Queue] = set()
+        self.version = 0
+        self.report: Optional[Dict] = None
+        self.signals: Dict[str, Dict] = {}
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # ------------------------------------------------------------
+    # Publikacja (dowolny wątek)
+    # ------------------------------------------------------------
+    def publish_report(self, report: Dict, signals: List[Dict]) -> None:
+        """Nowy raport: pełny payload + różnica sygnałów względem poprzedniego."""
+        new_signals = {s["symbol"]: s for s in signals}
+        with self._lock:
+            if report == self.report and new_signals == self.signals:
+                return
+            diff = diff_signals(self.signals, new_signals)
+            self.version += 1
+            self.report = report
+            self.signals = new_signals
+            events = [_sse("report", {"version": self.version, "report": report}, self.version)]
+            if any(diff.values()):
+                events.append(_sse("signals", {"version": self.version, **diff}, self.version))
+        self._dispatch(events)
+
+    def publish_live_signal(self, symbol: str, reasons: List[str], row: Dict) -> None:
+        self._dispatch([_sse("live_signal", {"symbol": symbol, "reasons": reasons, "row": row})])
+
+    def _dispatch(self, events: List[bytes]) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._fanout, events)
+
+    def _fanout(self, events: List[bytes]) -> None:
+        for queue in list(self._subscribers):
+            try:
+                for event in events:
+                    queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    # ------------------------------------------------------------
+    # Subskrypcja (pętla zdarzeń)
+    # ------------------------------------------------------------
+    def snapshot_event(self) -> bytes:
+        with self._lock:
+            return _sse(
+                "snapshot",
+                {"version": self.version, "report": self.report, "signals": list(self.signals.values())},
+                self.version,
+            )
+
+    async def subscribe(self) -> AsyncIterator[bytes]:
+        """Strumień SSE dla jednego klienta: snapshot, potem tylko zmiany."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            yield self.snapshot_event()
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+
+broadcaster = Broadcaster()
@@ -1,114 +1,153 @@
-"""Generowanie wykresów z raportów CSV.
+"""Generowanie wykresów z historii raportów.
 
 Moduł został odseparowany od warstwy API, aby obsłużyć zarówno
 automatyczne wykresy (scheduler) jak i ręczne zapytania użytkownika.
-Najpierw szukamy zbiorczego `all_reports.csv`, a gdy go brakuje, sięgamy
-po najnowszy raport jednostkowy – to eliminuje zaskoczenia w świeżych
-instancjach. Dane zawsze trafiają do katalogu `data/charts`, żeby panel
-Streamlit i wysyłka na Discorda korzystały z tej samej lokalizacji.
+Dane czytamy z kolumnowej historii (`report_history`) – typowane kolumny
+i prawdziwe znaczniki czasu, bez parsowania CSV. Wykresy zawsze trafiają
+do katalogu `data/charts`, żeby panel Streamlit i wysyłka na Discorda
+korzystały z tej samej lokalizacji.
+
+Wykresy są adresowane treścią: nazwa pliku to skrót z (symbole, kolumna,
+skala, wersja danych), więc identyczne zapytanie dostaje gotowy plik
+zamiast ponownego renderowania. Katalog ma limit rozmiaru – najdawniej
+używane wykresy są usuwane (LRU po mtime, odświeżanym przy trafieniu).
+Renderowanie dla API idzie w puli procesów, poza pętlą zdarzeń.
+Matplotlib ładujemy dopiero przy pierwszym renderowaniu – import modułu
+(a więc start API) go nie potrzebuje.
 """
 
+import asyncio
+import glob
+import hashlib
+import json
+import multiprocessing
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime
-os.makedirs("data/reports", exist_ok=True)
-os.makedirs("data/charts", exist_ok=True)
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.services import report_history
+from app.services.metrics import STAGE_SECONDS
 
 # =========================
 # Ustawienia ścieżek
 # =========================
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "data")
-REPORTS_DIR = os.path.join(DATA_DIR, "reports")
+# Ścieżki względne jak w analytics.py – ten sam katalog data/ co raporty
+DATA_DIR = "data"
 CHARTS_DIR = os.path.join(DATA_DIR, "charts")
-ALL_REPORTS_FILE = os.path.join(DATA_DIR, "all_reports.csv")
+
+# Limit rozmiaru katalogu z wykresami i liczba procesów renderujących
+CHART_CACHE_MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+
+_pool: ProcessPoolExecutor | None = None
+_in_flight: dict[str, asyncio.Future] = {}
+
+def _pyplot():
+    """Leniwy import pyplot z backendem Agg (bez okien, także w procesach puli)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
 
 # =========================
-# Pomocnicze: znajdź najnowszy raport dzienny
+# Cache wykresów
 # =========================
-def get_latest_daily_report():
-    if not os.path.exists(REPORTS_DIR):
-        return None
-    files = [f for f in os.listdir(REPORTS_DIR) if f.startswith("report_") and f.endswith(".csv")]
-    if not files:
+def chart_cache_path(symbols=None, column="close", scale="linear"):
+    """
+    Ścieżka wykresu w cache dla danego zapytania albo None, gdy brak danych.
+    Wersja danych to (generacja, liczba wierszy) historii raportów.
+    """
+    version = report_history.version()
+    if not version or not version[1]:
         return None
-    files.sort(reverse=True)
-    latest = os.path.join(REPORTS_DIR, files[0])
-    return latest
+    key_src = json.dumps([
+        [s.strip().upper() for s in symbols] if symbols else None,
+        column, scale, *version,
+    ])
+    key = hashlib.sha1(key_src.encode()).hexdigest()[:20]
+    return os.path.join(CHARTS_DIR, f"chart_{key}.png")
+
+def chart_etag(chart_path):
+    """ETag = skrót z nazwy pliku (ten sam dla tych samych danych i parametrów)."""
+    return '"' + os.path.basename(chart_path)[len("chart_"):-len(".png")] + '"'
+
+def _evict_charts():
+    files = []
+    for path in glob.glob(os.path.join(CHARTS_DIR, "chart_*.png")):
+        try:
+            st = os.stat(path)
+            files.append((st.st_mtime, st.st_size, path))
+        except FileNotFoundError:
+            pass
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= CHART_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
 
 # =========================
 # Główna funkcja wykresu
 # =========================
 def generate_chart(symbols=None, column="close", scale="linear"):
     """
-    Tworzy wykres dla wybranych kryptowalut.
-    Jeśli brak all_reports.csv, używa najnowszego raportu dziennego.
+    Tworzy wykres dla wybranych kryptowalut (albo zwraca gotowy z cache).
     Dostępne skale: 'linear' (domyślna), 'log'
     """
     os.makedirs(CHARTS_DIR, exist_ok=True)
-    df = None
 
-    # 1️⃣ próbujemy all_reports.csv
-    if os.path.exists(ALL_REPORTS_FILE):
-        try:
-            df = pd.read_csv(ALL_REPORTS_FILE)
-        except Exception as e:
-            print(f"⚠️ Błąd wczytywania all_reports.csv: {e}")
-
-    # 2️⃣ jeśli nie ma all_reports, weź najnowszy raport
-    if df is None or df.empty:
-        latest_file = get_latest_daily_report()
-        if latest_file:
-            print(f"ℹ️ Używam najnowszego raportu: {latest_file}")
-            df = pd.read_csv(latest_file)
-        else:
-            print("❌ Brak danych raportów do wykresu.")
-            return None
-
-    # 3️⃣ sprawdź kolumny
-    if column not in df.columns:
-        column = column.capitalize()
-        print(f"⚠️ Kolumna '{column}' nie istnieje w danych.")
-        print(f"📄 Dostępne kolumny: {list(df.columns)}")
+    chart_path = chart_cache_path(symbols, column, scale)
+    if chart_path is None:
+        print("❌ Brak danych raportów do wykresu.")
+        return None
+    if os.path.exists(chart_path):
+        os.utime(chart_path)  # świeży wpis w LRU
+        return chart_path
+
+    # 1️⃣ historia raportów (memmap – czytamy tylko potrzebne kolumny)
+    snap = report_history.snapshot()
+    if snap is None or not snap.rows:
+        print("❌ Brak danych raportów do wykresu.")
         return None
 
-    # ✅ Naprawa daty — obsługuje format z godziną
-    if "report_date" in df.columns:
-        try:
-            df["report_date"] = pd.to_datetime(df["report_date"], format="%Y-%m-%d-%H-%M-%S", errors="coerce")
-        except Exception:
-            df["report_date"] = pd.to_datetime(df["report_date"], errors="coerce")
-    else:
-        df["report_date"] = datetime.now()
-
-    df = df.dropna(subset=["report_date"])
-
-    # ✅ Konwersja kolumny do liczbowej (usuwa znaki % itp.)
-    df[column] = (
-        df[column]
-        .astype(str)
-        .str.replace("%", "", regex=False)
-        .astype(float)
-    )
+    # 2️⃣ sprawdź kolumny ("close" -> "Close")
+    by_lower = {name.lower(): name for name in snap.names}
+    if column.lower() not in by_lower or column.lower() in ("symbol", "report_date"):
+        print(f"⚠️ Kolumna '{column}' nie istnieje w danych.")
+        print(f"📄 Dostępne kolumny: {snap.names}")
+        return None
+    column = by_lower[column.lower()]
 
-    # 4️⃣ filtr symboli
+    # 3️⃣ filtr symboli – na kodach słownika, bez dekodowania całej kolumny
+    categories = list(snap.categories["Symbol"])
     if symbols:
         symbols = [s.strip().upper() for s in symbols]
-        df = df[df["symbol"].isin(symbols)]
     else:
-        symbols = df["symbol"].unique().tolist()
+        symbols = categories
+    codes = snap.arrays["Symbol"]
+    dates = snap.arrays["report_date"]
+    values = snap.arrays[column]
+    series = {}
+    for symbol in symbols:
+        if symbol in categories:
+            rows = np.flatnonzero(codes == categories.index(symbol))
+            if len(rows):
+                series[symbol] = (dates[rows], values[rows])
 
-    if df.empty:
+    if not series:
         print("⚠️ Brak danych dla wybranych symboli.")
         return None
 
-    # 5️⃣ generowanie wykresu
+    # 4️⃣ generowanie wykresu
+    plt = _pyplot()
     plt.figure(figsize=(10, 5))
-    for symbol in symbols:
-        token_df = df[df["symbol"] == symbol]
-        if not token_df.empty:
-            plt.plot(token_df["report_date"], token_df[column], label=symbol, marker='o')
+    for symbol, (x, y) in series.items():
+        plt.plot(x, y, label=symbol, marker='o')
 
     plt.title(f"{column} dla {', '.join(symbols)}")
     plt.xlabel("Data")
@@ -120,11 +159,60 @@ def generate_chart(symbols=None, column="close", scale="linear"):
     if scale == "log":
         plt.yscale("log")
 
-    filename = f"chart_{'_'.join(symbols)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    chart_path = os.path.join(CHARTS_DIR, filename)
+    # Zapis przez plik tymczasowy – równoległy czytelnik nie dostanie połowy PNG
+    tmp_path = f"{chart_path}.{os.getpid()}.tmp"
     plt.tight_layout()
-    plt.savefig(chart_path)
+    plt.savefig(tmp_path, format="png")
     plt.close()
+    os.replace(tmp_path, chart_path)
+    _evict_charts()
 
     print(f"✅ Wykres zapisany: {chart_path}")
     return chart_path
+
+# =========================
+# Wersja dla API: cache w pętli, renderowanie w puli procesów
+# =========================
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn: proces serwera ma wątki (harmonogram, strumień), fork mógłby
+        # skopiować zablokowane locki
+        _pool = ProcessPoolExecutor(
+            max_workers=CHART_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+async def render_chart(symbols=None, column="close", scale="linear"):
+    """
+    Jak generate_chart, ale nie blokuje pętli zdarzeń.
+    Trafienie w cache to jeden stat; przy braku – renderowanie w puli
+    procesów, a równoległe identyczne zapytania czekają na ten sam wynik.
+    """
+    chart_path = chart_cache_path(symbols, column, scale)
+    if chart_path is None:
+        return None
+    if os.path.exists(chart_path):
+        os.utime(chart_path)
+        return chart_path
+
+    future = _in_flight.get(chart_path)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        future = loop.run_in_executor(_get_pool(), generate_chart, symbols, column, scale)
+        _in_flight[chart_path] = future
+
+        def _done(_):
+            _in_flight.pop(chart_path, None)
+            # Metryki z procesu puli by przepadły – mierzymy tutaj
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="chart_render")
+
+        future.add_done_callback(_done)
+    return await asyncio.shield(future)
+
+def shutdown_chart_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,202 @@
+"""Kolumnowy magazyn tabel: jeden plik binarny na kolumnę + `schema.json`.
+
+Każda kolumna to surowa tablica NumPy zapisana na dysku (`<plik>.bin`),
+a `schema.json` opisuje typy, liczbę wierszy i metadane. Odczyt to
+`np.memmap` – bez parsowania i bez kopiowania; system operacyjny
+doczytuje tylko strony, których faktycznie dotykamy.
+
+Typy kolumn:
+- liczby – `<f8` / `<i8`,
+- czas – `<M8[ns]` (prawdziwe znaczniki czasu, nie tekst),
+- tekst – słownik: kody `<i4` w pliku, lista wartości w schemacie
+  (symbol zajmuje 4 bajty zamiast napisu w każdym wierszu).
+
+Dopisanie jest tanie i bezpieczne przy awarii: bajty idą na koniec plików
+kolumn, a dopiero podmiana `schema.json` (os.replace) zatwierdza nowe
+wiersze. Czytelnik widzi tylko `rows` ze schematu, więc niedokończone
+dopisanie jest niewidoczne, a następne zapisy je obcinają.
+
+Pełne przepisanie (`write`) tworzy nową generację plików i podmienia
+schemat; stare pliki są usuwane, ale otwarte już memmapy nadal działają.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_FILE = "schema.json"
+CATEGORY = "category"
+# Odczyt w trakcie przepisania tabeli przez inny proces ponawiamy
+READ_ATTEMPTS = 3
+
+
+def _spec_for(name: str, series: pd.Series) -> Dict:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return {"name": name, "dtype": "<M8[ns]"}
+    if pd.api.types.is_bool_dtype(series):
+        return {"name": name, "dtype": "|b1"}
+    if pd.api.types.is_integer_dtype(series):
+        return {"name": name, "dtype": "<i8"}
+    if pd.api.types.is_numeric_dtype(series):
+        return {"name": name, "dtype": "<f8"}
+    return {"name": name, "dtype": CATEGORY, "categories": []}
+
+
+def _encode(spec: Dict, series: pd.Series) -> np.ndarray:
+    """Wartości kolumny w typie ze schematu; dla tekstu dopisuje nowe kategorie do `spec`."""
+    if spec["dtype"] != CATEGORY:
+        if spec["dtype"] == "<M8[ns]":
+            return series.to_numpy(dtype="datetime64[ns]")
+        return series.to_numpy(dtype=np.dtype(spec["dtype"]))
+
+    codes_by_value = {value: code for code, value in enumerate(spec["categories"])}
+    values = series.astype(str).to_numpy()
+    for value in pd.unique(values):
+        if value not in codes_by_value:
+            codes_by_value[value] = len(spec["categories"])
+            spec["categories"].append(value)
+    return np.array([codes_by_value[v] for v in values], dtype="<i4")
+
+
+def _storage_dtype(spec: Dict) -> np.dtype:
+    return np.dtype("<i4" if spec["dtype"] == CATEGORY else spec["dtype"])
+
+
+class Snapshot:
+    """Zatwierdzony stan tabeli: kolumny jako memmapy (tekst – jako kody)."""
+
+    def __init__(self, schema: Dict, arrays: Dict[str, np.ndarray]):
+        self.schema = schema
+        self.rows: int = schema["rows"]
+        self.generation: int = schema["generation"]
+        self.meta: Dict = schema.get("meta", {})
+        self.names = [spec["name"] for spec in schema["columns"]]
+        self.arrays = arrays
+        self.categories = {
+            spec["name"]: np.asarray(spec["categories"], dtype=object)
+            for spec in schema["columns"]
+            if spec["dtype"] == CATEGORY
+        }
+
+    def column(self, name: str, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Wartości kolumny; tekst zdekodowany z kodów."""
+        values = self.arrays[name][start:stop]
+        if name in self.categories:
+            return self.categories[name][values]
+        return values
+
+    def to_frame(self, start: int = 0, stop: Optional[int] = None, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        names = list(columns) if columns is not None else self.names
+        return pd.DataFrame({name: self.column(name, start, stop) for name in names})
+
+
+class ColumnTable:
+    """Tabela w katalogu `directory`: zapis całości, dopisywanie wierszy, odczyt przez memmap."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    @property
+    def schema_path(self) -> Path:
+        return self.directory / SCHEMA_FILE
+
+    def schema(self) -> Optional[Dict]:
+        try:
+            with open(self.schema_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def version(self) -> Optional[Tuple[int, int]]:
+        """(generacja, liczba wierszy) – zmienia się przy każdym zapisie; None, gdy tabeli nie ma."""
+        schema = self.schema()
+        return None if schema is None else (schema["generation"], schema["rows"])
+
+    def _write_schema(self, schema: Dict) -> None:
+        tmp = self.schema_path.with_suffix(".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(schema, f, ensure_ascii=False)
+        os.replace(tmp, self.schema_path)
+
+    # ------------------------------------------------------------
+    # Odczyt
+    # ------------------------------------------------------------
+    def read(self) -> Optional[Snapshot]:
+        for attempt in range(READ_ATTEMPTS):
+            schema = self.schema()
+            if schema is None:
+                return None
+            try:
+                return self._open(schema)
+            except FileNotFoundError:
+                # Inny proces właśnie podmienił generację plików – czytamy nowy schemat
+                if attempt == READ_ATTEMPTS - 1:
+                    raise
+
+    def _open(self, schema: Dict) -> Snapshot:
+        rows = schema["rows"]
+        arrays = {}
+        for spec in schema["columns"]:
+            dtype = _storage_dtype(spec)
+            if rows:
+                arrays[spec["name"]] = np.memmap(self.directory / spec["file"], dtype=dtype, mode="r", shape=(rows,))
+            else:
+                arrays[spec["name"]] = np.empty(0, dtype=dtype)
+        return Snapshot(schema, arrays)
+
+    # ------------------------------------------------------------
+    # Zapis
+    # ------------------------------------------------------------
+    def write(self, df: pd.DataFrame, meta: Optional[Dict] = None) -> None:
+        """Zapisuje całą tabelę od nowa (nowa generacja plików)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        old = self.schema()
+        generation = old["generation"] + 1 if old else 1
+
+        columns = []
+        for index, name in enumerate(df.columns):
+            spec = _spec_for(name, df[name])
+            spec["file"] = f"g{generation}_c{index}.bin"
+            _encode(spec, df[name]).tofile(self.directory / spec["file"])
+            columns.append(spec)
+
+        self._write_schema({"generation": generation, "rows": len(df), "columns": columns, "meta": meta or {}})
+
+        if old:
+            for spec in old["columns"]:
+                try:
+                    os.remove(self.directory / spec["file"])
+                except OSError:
+                    pass
+
+    def append(self, df: pd.DataFrame, meta: Optional[Dict] = None) -> None:
+        """
+        Dopisuje wiersze z tymi samymi kolumnami co tabela.
+        Inny zestaw kolumn to ValueError – wtedy trzeba przepisać całość (`write`).
+        """
+        schema = self.schema()
+        if schema is None:
+            self.write(df, meta)
+            return
+        names = [spec["name"] for spec in schema["columns"]]
+        if set(df.columns) != set(names):
+            raise ValueError(f"Kolumny {list(df.columns)} nie pasują do tabeli {names}")
+
+        rows = schema["rows"]
+        for spec in schema["columns"]:
+            path = self.directory / spec["file"]
+            values = _encode(spec, df[spec["name"]])
+            with open(path, "r+b" if path.exists() else "wb") as f:
+                # Obcinamy ewentualne resztki niezatwierdzonego dopisania
+                f.truncate(rows * values.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(values.tobytes())
+
+        schema["rows"] = rows + len(df)
+        if meta is not None:
+            schema["meta"] = meta
+        self._write_schema(schema)
@@ -0,0 +1,353 @@
+"""Korelacje stóp zwrotu i beta do BTC dla całego śledzonego uniwersum.
+
+Do doboru par pod grid-boty potrzebujemy wiedzieć, które symbole chodzą
+razem. Liczenie tego parami w pandas (`s_i.corr(s_j)` dla każdej pary)
+to S² wywołań w Pythonie – przy kilkuset symbolach sekundy na odpowiedź.
+Tutaj wszystko idzie na wyrównanej siatce (czas × symbol):
+
+- zamknięcia z `kline_store` (widok interwału z `timeframes`) układamy
+  na wspólnej osi czasu, brak świecy to NaN – jak w `backtest.load_grid`,
+- stopy zwrotu to różnice logarytmów sąsiednich zamknięć,
+- dla każdego okna trzymamy sumy po parach kolumn, liczone tylko tam,
+  gdzie obie serie mają wartość (pairwise-complete, jak `DataFrame.corr`):
+  n = MᵀM, Σx = XᵀM, Σx² = (X²)ᵀM, Σxy = XᵀX, gdzie X to zwroty z zerami
+  w miejscu NaN, a M – maska obecności. To cztery mnożenia macierzy
+  w BLAS-ie zamiast S² pętli,
+- korelacja i beta do BTC wynikają z tych sum wprost.
+
+Nowa świeca nie wymaga liczenia okna od nowa: wiersze, które wypadły
+z okna (i poprzednia, jeszcze otwarta świeca), odejmujemy, nowe dodajemy
+– koszt rośnie z liczbą zmienionych wierszy, nie z długością okna. Co
+`FULL_RECOMPUTE_EVERY` aktualizacji sumy liczymy od zera, żeby błędy
+zaokrągleń się nie kumulowały.
+
+Wersja danych to mtime plików świec; gotowa odpowiedź (JSON + gzip,
+patrz `http_cache`) jest trzymana do zmiany którejś pary.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services import http_cache, kline_store, timeframes
+from app.services.metrics import stage
+
+QUOTE_ASSET = "USDT"
+BENCHMARK = "BTC"
+DEFAULT_WINDOWS = os.getenv("CORRELATION_WINDOWS", "7d,30d")
+# Co ile sekund sprawdzamy mtime plików świec (między sprawdzeniami – cache)
+CORRELATIONS_CHECK_SECONDS = float(os.getenv("CORRELATIONS_CHECK_SECONDS", "5"))
+FULL_RECOMPUTE_EVERY = 200
+ENGINES_CACHE_SIZE = 8
+DECIMALS = 4
+
+_WINDOW_RE = re.compile(r"^(\d+)([hd])$")
+
+
+def parse_windows(text: str, interval: str) -> Dict[str, int]:
+    """'24h,7d,30d' -> {etykieta: liczba zwrotów w oknie} dla danego interwału."""
+    step = timeframes.interval_ms(interval)
+    windows = {}
+    for label in (w.strip().lower() for w in text.split(",") if w.strip()):
+        match = _WINDOW_RE.match(label)
+        if not match:
+            raise ValueError(f"Nieprawidłowe okno '{label}' (np. 24h, 7d, 30d)")
+        hours = int(match.group(1)) * (24 if match.group(2) == "d" else 1)
+        candles = hours * 3_600_000 // step
+        if candles < 2:
+            raise ValueError(f"Okno '{label}' to mniej niż 2 świece {interval}")
+        windows[label] = candles
+    if not windows:
+        raise ValueError("Podaj co najmniej jedno okno (np. windows=7d,30d)")
+    return windows
+
+
+def tracked_symbols() -> List[str]:
+    """Symbole z zapisaną serią bazową (raport + uniwersum), bez sufiksu USDT."""
+    return [
+        pair[: -len(QUOTE_ASSET)]
+        for pair in kline_store.stored_pairs(timeframes.BASE_INTERVAL)
+        if pair.endswith(QUOTE_ASSET) and len(pair) > len(QUOTE_ASSET)
+    ]
+
+
+# ============================================================
+# Sumy po parach kolumn (pairwise-complete)
+# ============================================================
+class Moments:
+    """n, Σx, Σx², Σxy dla każdej pary symboli – tylko wiersze, gdzie obie mają zwrot."""
+
+    def __init__(self, size: int):
+        self.n = np.zeros((size, size))
+        self.sx = np.zeros((size, size))
+        self.sxx = np.zeros((size, size))
+        self.sxy = np.zeros((size, size))
+
+    def add(self, rows: np.ndarray, sign: float = 1.0) -> None:
+        """Dodaje (sign=1) albo odejmuje (sign=-1) wiersze zwrotów (k × S)."""
+        if not len(rows):
+            return
+        present = np.isfinite(rows)
+        mask = present.astype(float)
+        x = np.where(present, rows, 0.0)
+        # sx[i, j] = Σ x_i po wierszach, gdzie j też ma wartość (x_i = 0 poza obecnością i)
+        self.n += sign * (mask.T @ mask)
+        self.sx += sign * (x.T @ mask)
+        self.sxx += sign * ((x * x).T @ mask)
+        self.sxy += sign * (x.T @ x)
+
+    def correlation(self, min_periods: int) -> np.ndarray:
+        n, sx = self.n, self.sx
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * self.sxy - sx * sx.T
+            var = n * self.sxx - sx * sx
+            corr = cov / np.sqrt(var * var.T)
+        corr[n < min_periods] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def beta(self, bench: int, min_periods: int) -> np.ndarray:
+        """cov(r_i, r_b) / var(r_b) na wspólnych wierszach każdej pary (i, benchmark)."""
+        n = self.n[:, bench]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * self.sxy[:, bench] - self.sx[:, bench] * self.sx[bench, :]
+            var = n * self.sxx[bench, :] - self.sx[bench, :] ** 2
+            beta = cov / var
+        beta[(n < min_periods) | ~(var > 0)] = np.nan
+        return beta
+
+
+# ============================================================
+# Stan dla jednego interwału i zestawu okien
+# ============================================================
+def _closes_column(arr: np.ndarray, end: int, length: int, step: int) -> np.ndarray:
+    """Zamknięcia pary na siatce `length` świec kończącej się na `end` (NaN = brak świecy)."""
+    column = np.full(length, np.nan)
+    start = end - (length - 1) * step
+    arr = arr[(arr["open_time"] >= start) & (arr["open_time"] <= end)]
+    column[(arr["open_time"] - start) // step] = arr["close"]
+    return column
+
+
+def _log_returns(closes: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        logs = np.log(closes)
+    return logs[1:] - logs[:-1]
+
+
+class CorrelationEngine:
+    """Siatka zamknięć, zwroty i sumy okien – aktualizowane przyrostowo."""
+
+    def __init__(self, interval: str, windows: Dict[str, int]):
+        self.interval = interval
+        self.step = timeframes.interval_ms(interval)
+        self.windows = windows
+        self.length = max(windows.values()) + 1
+        self.lock = threading.Lock()
+        self.symbols: List[str] = []
+        self.versions: Dict[str, Optional[int]] = {}
+        self.last_open: Dict[str, int] = {}
+        self.end: Optional[int] = None
+        self.closes = np.empty((0, 0))
+        self.returns = np.empty((0, 0))
+        self.moments: Dict[str, Moments] = {}
+        self.updates = 0
+        self.checked_at = 0.0
+        self.changed_at: Optional[datetime] = None
+        self.payloads: Dict[tuple, http_cache.Payload] = {}
+
+    def _load(self, sym: str) -> np.ndarray:
+        return timeframes.load_klines(f"{sym}{QUOTE_ASSET}", self.interval)
+
+    def _window_moments(self, label: str) -> Moments:
+        moments = Moments(len(self.symbols))
+        moments.add(self.returns[-self.windows[label]:])
+        return moments
+
+    @stage("correlations_full")
+    def _rebuild(self, symbols: List[str], versions: Dict[str, Optional[int]]) -> None:
+        arrays = {sym: self._load(sym) for sym in symbols}
+        self.last_open = {sym: int(arr["open_time"][-1]) for sym, arr in arrays.items() if len(arr)}
+        self.symbols, self.versions = symbols, versions
+        self.end = max(self.last_open.values()) if self.last_open else None
+        self.closes = np.full((self.length, len(symbols)), np.nan)
+        if self.end is not None:
+            for j, sym in enumerate(symbols):
+                self.closes[:, j] = _closes_column(arrays[sym], self.end, self.length, self.step)
+        self.returns = _log_returns(self.closes)
+        self.moments = {label: self._window_moments(label) for label in self.windows}
+        self.updates = 0
+
+    @stage("correlations_update")
+    def _update(self, changed: List[str], versions: Dict[str, Optional[int]]) -> bool:
+        """
+        Dokłada nowe świece zmienionych par. Zwraca False, gdy trzeba
+        przeliczyć wszystko (cofnięty koniec siatki, przesunięcie > okno).
+        """
+        arrays = {sym: self._load(sym) for sym in changed}
+        last_open = dict(self.last_open)
+        last_open.update({sym: int(arr["open_time"][-1]) for sym, arr in arrays.items() if len(arr)})
+        end = max(last_open.values()) if last_open else None
+        if self.end is None or end is None or end < self.end:
+            return False
+        shift = (end - self.end) // self.step
+        if shift >= self.length - 1:
+            return False
+
+        # Stara siatka przesunięta o `shift` świec; nowe wiersze na razie puste
+        keep = self.length - shift
+        closes = np.full_like(self.closes, np.nan)
+        closes[:keep] = self.closes[shift:]
+        # Pierwszy wiersz zamknięć, który się zmienił (domyślnie: pierwszy nowy)
+        dirty = keep
+        index = {sym: j for j, sym in enumerate(self.symbols)}
+        for sym, arr in arrays.items():
+            j = index[sym]
+            column = _closes_column(arr, end, self.length, self.step)
+            old = closes[:keep, j]
+            differs = ~((old == column[:keep]) | (np.isnan(old) & np.isnan(column[:keep])))
+            if differs.any():
+                dirty = min(dirty, int(np.argmax(differs)))
+            closes[:, j] = column
+
+        returns = _log_returns(closes)
+        # Zwrot r zależy od zamknięć r i r+1 – zmiana zamknięcia `dirty` zmienia zwroty od dirty-1
+        first_dirty = max(dirty - 1, 0)
+        rows = len(returns)
+        for label, window in self.windows.items():
+            lo = rows - window
+            # W nowych indeksach stare okno to [lo - shift, rows - shift)
+            stale_from = max(first_dirty, lo)
+            changed_rows = shift + (rows - shift - stale_from) + (rows - stale_from)
+            if changed_rows >= window:
+                self.moments[label] = None
+                continue
+            moments = self.moments[label]
+            # Wiersze, które wypadły z okna, i stare wersje zmienionych (w starych indeksach: +shift)
+            moments.add(self.returns[lo:lo + shift], sign=-1.0)
+            moments.add(self.returns[stale_from + shift:], sign=-1.0)
+            moments.add(returns[stale_from:])
+
+        self.closes, self.returns, self.end, self.last_open = closes, returns, end, last_open
+        self.versions = versions
+        for label, moments in self.moments.items():
+            if moments is None:
+                self.moments[label] = self._window_moments(label)
+        self.updates += 1
+        return True
+
+    def refresh(self) -> None:
+        """Sprawdza wersje plików świec i aktualizuje stan (co CORRELATIONS_CHECK_SECONDS)."""
+        now = time.monotonic()
+        if self.end is not None and now - self.checked_at < CORRELATIONS_CHECK_SECONDS:
+            return
+        symbols = tracked_symbols()
+        versions = {sym: kline_store.mtime_ns(f"{sym}{QUOTE_ASSET}", timeframes.BASE_INTERVAL) for sym in symbols}
+        self.checked_at = now
+        if symbols == self.symbols and versions == self.versions:
+            return
+
+        changed = [sym for sym in symbols if versions[sym] != self.versions.get(sym)]
+        incremental = (
+            symbols == self.symbols
+            and self.updates < FULL_RECOMPUTE_EVERY
+            and self._update(changed, versions)
+        )
+        if not incremental:
+            self._rebuild(symbols, versions)
+        self.changed_at = datetime.now(timezone.utc)
+        self.payloads = {}
+
+    # ------------------------------------------------------------
+    # Wynik
+    # ------------------------------------------------------------
+    def result(self, symbols: Optional[Sequence[str]] = None, min_periods: Optional[int] = None) -> Dict:
+        if self.end is None:
+            raise FileNotFoundError("Brak zapisanych świec – najpierw wygeneruj raport albo odśwież uniwersum.")
+        if symbols:
+            index = {sym: j for j, sym in enumerate(self.symbols)}
+            missing = [s for s in symbols if s not in index]
+            if missing:
+                raise ValueError(f"Brak świec dla: {', '.join(missing)}")
+            selected = np.array([index[s] for s in symbols], dtype=np.int64)
+        else:
+            selected = np.arange(len(self.symbols))
+        names = [self.symbols[j] for j in selected]
+        bench = self.symbols.index(BENCHMARK) if BENCHMARK in self.symbols else None
+
+        windows = {}
+        for label, window in self.windows.items():
+            periods = min_periods if min_periods is not None else max(3, window // 2)
+            moments = self.moments[label]
+            corr = moments.correlation(periods)[np.ix_(selected, selected)]
+            beta = moments.beta(bench, periods)[selected] if bench is not None else None
+            windows[label] = {
+                "returns": window,
+                "min_periods": periods,
+                "correlation": _rounded(corr),
+                "beta": _rounded(beta) if beta is not None else None,
+            }
+
+        as_of = datetime.fromtimestamp(self.end / 1000, tz=timezone.utc).replace(tzinfo=None)
+        return {
+            "interval": self.interval,
+            "as_of": as_of.isoformat(),
+            "benchmark": BENCHMARK if bench is not None else None,
+            "symbols": names,
+            "windows": windows,
+        }
+
+
+def _rounded(values: np.ndarray) -> list:
+    """Zaokrąglone wartości jako listy; NaN -> None (JSON bez NaN)."""
+    values = np.round(values, DECIMALS)
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+# ============================================================
+# API modułu
+# ============================================================
+_engines: "OrderedDict[Tuple[str, Tuple], CorrelationEngine]" = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+def get_engine(interval: str, windows: Dict[str, int]) -> CorrelationEngine:
+    key = (interval, tuple(windows.items()))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = CorrelationEngine(interval, windows)
+        _engines.move_to_end(key)
+        while len(_engines) > ENGINES_CACHE_SIZE:
+            _engines.popitem(last=False)
+        return engine
+
+
+def correlations_payload(
+    symbols: Optional[Sequence[str]] = None,
+    interval: str = timeframes.REPORT_INTERVAL,
+    windows: str = DEFAULT_WINDOWS,
+    min_periods: Optional[int] = None,
+) -> http_cache.Payload:
+    """Odpowiedź /correlations – liczona raz na wersję danych i zestaw parametrów."""
+    timeframes.check_interval(interval)
+    if min_periods is not None and min_periods < 2:
+        raise ValueError("min_periods musi być ≥ 2")
+    engine = get_engine(interval, parse_windows(windows, interval))
+    key = (tuple(symbols or ()), min_periods)
+    with engine.lock:
+        engine.refresh()
+        payload = engine.payloads.get(key)
+        if payload is None:
+            body = json.dumps(engine.result(symbols, min_periods), allow_nan=False, separators=(",", ":"))
+            payload = http_cache.Payload(body.encode("utf-8"), last_modified=engine.changed_at)
+            if len(engine.payloads) >= ENGINES_CACHE_SIZE * 8:
+                engine.payloads.clear()
+            engine.payloads[key] = payload
+        return payload
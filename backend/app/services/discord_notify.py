@@ -4,12 +4,48 @@ Oddzieliłem logikę wyciągania sekretu (`_get_webhook`) od funkcji
 wysyłających, żeby można je było mockować podczas testów i łatwo
 przekierować w przyszłości na inny kanał. Staram się też nie logować
 wrażliwych danych – funkcje informują jedynie o statusach i kodach HTTP.
+
+`send_discord_message` / `send_discord_file` nie wysyłają już same –
+odkładają wiadomość do kolejki na dysku (`data/discord_outbox`) i od razu
+wracają. Wątek w tle:
+- łączy sąsiednie wiadomości (do 2000 znaków) i pliki (do 10) w jedno
+  wywołanie webhooka,
+- używa jednej sesji HTTP (pula połączeń),
+- przy 429 czeka `retry_after`, przy błędach sieci/5xx ponawia z backoffem,
+- usuwa wpis z dysku dopiero po udanej wysyłce, więc po restarcie
+  niedostarczone wiadomości idą dalej.
+
+Przy kilku workerach uvicorna kolejka na dysku jest wspólna; paczkę
+wybiera i wysyła ten proces, który trzyma blokadę `.send.lock`, więc
+żadna wiadomość nie idzie dwa razy.
 """
 
+import json
 import os
-import requests
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 from dotenv import load_dotenv
 
+from app.services.filelock import FileLock
+from app.services.metrics import DISCORD_FAILURES, stage
+
+if TYPE_CHECKING:
+    import requests
+
+OUTBOX_DIR = Path("data/discord_outbox")
+
+# Limity Discorda dla jednej wiadomości webhooka
+MAX_CONTENT_LENGTH = 2000
+MAX_FILES = 10
+
+RETRY_MIN_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
 
 
 
@@ -21,37 +57,291 @@ def _get_webhook() -> str | None:
     return url
 
 
+FENCE = "```"
+
+
+def _split_content(content: str) -> list[str]:
+    """
+    Dzieli za długi tekst na części ≤ 2000 znaków (po liniach, jeśli się da).
+
+    Blok kodu (```) otwarty w miejscu podziału zamykamy na końcu części
+    i otwieramy na początku następnej – każda część ma domknięte bloki,
+    więc można je też bezpiecznie sklejać w jedną wiadomość przy wysyłce.
+    """
+    parts, current = [], ""
+    in_fence = False  # czy `current` kończy się wewnątrz bloku kodu
+    reserve = len(FENCE) + 1  # "\n```" na domknięcie bloku
+
+    def flush(text: str, fenced: bool) -> None:
+        parts.append(f"{text}\n{FENCE}" if fenced else text)
+
+    for line in content.split("\n"):
+        # Linia dłuższa niż limit – twarde cięcie na osobne części
+        while len(line) > MAX_CONTENT_LENGTH - 2 * reserve:
+            # Samego otwarcia bloku nie wysyłamy – kolejna część i tak je otworzy
+            if in_fence and (current == FENCE or current.endswith(f"\n{FENCE}")):
+                current = current[:-len(FENCE)].rstrip("\n")
+                if current:
+                    parts.append(current)
+            elif current:
+                flush(current, in_fence)
+            current = ""
+            chunk, line = line[:MAX_CONTENT_LENGTH - 2 * reserve], line[MAX_CONTENT_LENGTH - 2 * reserve:]
+            opened = in_fence
+            in_fence ^= chunk.count(FENCE) % 2 == 1
+            flush(f"{FENCE}\n{chunk}" if opened else chunk, in_fence)
+
+        after = in_fence ^ (line.count(FENCE) % 2 == 1)
+        reopened = f"{FENCE}\n{line}" if in_fence else line
+        candidate = f"{current}\n{line}" if current else reopened
+        if current and len(candidate) + (reserve if after else 0) > MAX_CONTENT_LENGTH:
+            flush(current, in_fence)
+            candidate = reopened
+        current = candidate
+        in_fence = after
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _retry_after(resp: "requests.Response") -> float:
+    """Czas oczekiwania z odpowiedzi 429 (treść JSON albo nagłówek Retry-After)."""
+    try:
+        return float(resp.json()["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(resp.headers.get("Retry-After", RETRY_MIN_DELAY))
+    except ValueError:
+        return RETRY_MIN_DELAY
+
+
+# ============================================================
+# Kolejka na dysku + wątek wysyłający
+# ============================================================
+class DiscordOutbox:
+    """Trwała kolejka wiadomości webhooka obsługiwana przez jeden wątek."""
+
+    def __init__(self, directory: Path = OUTBOX_DIR):
+        self.directory = Path(directory)
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._sending = False
+        self._session: "requests.Session | None" = None
+        # Wspólna kolejka dla wszystkich procesów – wysyła jeden naraz
+        self._send_lock = FileLock(self.directory / ".send.lock")
+
+    # ------------------------------------------------------------
+    # Dodawanie wpisów (dowolny wątek)
+    # ------------------------------------------------------------
+    def put(self, content: str | None = None, file_path: str | None = None, filename: str | None = None) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._cond:
+            if file_path:
+                # Kopia pliku – wykres z cache może zniknąć, zanim go wyślemy
+                item_id = self._new_id()
+                spooled = self.directory / f"{item_id}.bin"
+                shutil.copyfile(file_path, spooled)
+                self._write_item(item_id, {
+                    "content": content,
+                    "file": str(spooled),
+                    "filename": filename or os.path.basename(file_path),
+                })
+            else:
+                for part in _split_content(content or ""):
+                    self._write_item(self._new_id(), {"content": part})
+            self._ensure_worker()
+            self._cond.notify()
+
+    @staticmethod
+    def _new_id() -> str:
+        # Nazwa rośnie z czasem, więc sortowanie plików = kolejność wysyłki
+        return f"{time.time_ns():020d}_{uuid.uuid4().hex[:8]}"
+
+    def _write_item(self, item_id: str, item: dict) -> None:
+        path = self.directory / f"{item_id}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(item, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def pending(self) -> list[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("*.json"))
+
+    # ------------------------------------------------------------
+    # Wątek wysyłający
+    # ------------------------------------------------------------
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="discord-outbox", daemon=True)
+            self._thread.start()
+
+    def start(self) -> None:
+        """Startuje wątek, jeśli na dysku zostały wpisy z poprzedniego uruchomienia."""
+        with self._cond:
+            if self.pending():
+                print(f"📨 Discord: {len(self.pending())} niewysłanych wiadomości z poprzedniego uruchomienia.")
+                self._ensure_worker()
+
+    def _run(self) -> None:
+        delay = RETRY_MIN_DELAY
+        while True:
+            with self._cond:
+                while not self._stopping and not self.pending():
+                    self._cond.wait()
+                if self._stopping and not self.pending():
+                    return
+                self._sending = True
+            try:
+                # Paczkę wybieramy dopiero pod blokadą – wpisy mógł już wysłać inny proces
+                with self._send_lock:
+                    batch = self._next_batch()
+                    wait = self._send_batch(batch) if batch else None
+            finally:
+                with self._cond:
+                    self._sending = False
+                    self._cond.notify_all()
+            if wait is None:
+                delay = RETRY_MIN_DELAY
+                continue
+            pause = wait if wait > 0 else delay
+            if wait <= 0:
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+            # Nowe wpisy nie skracają przerwy – czekamy pełne retry_after / backoff
+            deadline = time.monotonic() + pause
+            with self._cond:
+                while not self._stopping and deadline > time.monotonic():
+                    self._cond.wait(timeout=deadline - time.monotonic())
+                if self._stopping:
+                    return
+
+    def _next_batch(self) -> list[tuple[Path, dict]]:
+        """Najdłuższy początek kolejki, który zmieści się w jednym wywołaniu webhooka."""
+        batch, length, files = [], 0, 0
+        for path in self.pending():
+            try:
+                item = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                path.unlink(missing_ok=True)
+                continue
+            text = item.get("content") or ""
+            added = len(text) + (1 if length and text else 0)
+            if batch and (length + added > MAX_CONTENT_LENGTH or (item.get("file") and files >= MAX_FILES)):
+                break
+            batch.append((path, item))
+            length += added
+            files += 1 if item.get("file") else 0
+        return batch
+
+    def _send_batch(self, batch: list[tuple[Path, dict]]) -> float | None:
+        """
+        Wysyła paczkę. Zwraca None, gdy wpisy można usunąć,
+        czas oczekiwania dla 429 albo 0 dla błędu do ponowienia z backoffem.
+        """
+        url = _get_webhook()
+        if not url:
+            print("⚠️ Brak zmiennej środowiskowej DISCORD_WEBHOOK – wiadomości czekają w kolejce.")
+            return 0
+
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+
+        content = "\n".join(item["content"] for _, item in batch if item.get("content"))
+        attachments = [item for _, item in batch if item.get("file")]
+        handles = []
+        try:
+            with stage("discord_send"):
+                if attachments:
+                    files = {}
+                    for i, item in enumerate(attachments):
+                        handle = open(item["file"], "rb")
+                        handles.append(handle)
+                        files[f"files[{i}]"] = (item["filename"], handle)
+                    payload = {"content": content} if content else {}
+                    resp = self._session.post(url, data={"payload_json": json.dumps(payload)}, files=files, timeout=20)
+                else:
+                    resp = self._session.post(url, json={"content": content}, timeout=10)
+        except FileNotFoundError as e:
+            print(f"⚠️ Plik do wysyłki zniknął: {e}")
+            resp = None
+        except Exception as e:
+            print(f"⚠️ Błąd połączenia z Discordem: {e}")
+            DISCORD_FAILURES.inc(reason="connection")
+            return 0
+        finally:
+            for handle in handles:
+                handle.close()
+
+        if resp is not None and resp.status_code == 429:
+            retry_after = _retry_after(resp)
+            print(f"⏳ Discord rate limit – ponawiam za {retry_after:.1f}s")
+            DISCORD_FAILURES.inc(reason="rate_limited")
+            return max(retry_after, 0.05)
+        if resp is not None and resp.status_code >= 500:
+            print(f"❌ Błąd Discord ({resp.status_code}) – ponowię wysyłkę.")
+            DISCORD_FAILURES.inc(reason="server_error")
+            return 0
+        if resp is not None and resp.status_code not in (200, 204):
+            # Inne 4xx się nie naprawią – nie blokujemy kolejki
+            print(f"❌ Błąd Discord ({resp.status_code}): {resp.text[:200]}")
+            DISCORD_FAILURES.inc(reason="rejected")
+
+        for path, item in batch:
+            if item.get("file"):
+                Path(item["file"]).unlink(missing_ok=True)
+            path.unlink(missing_ok=True)
+        return None
+
+    # ------------------------------------------------------------
+    # Zamykanie
+    # ------------------------------------------------------------
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Czeka, aż kolejka się opróżni. Zwraca True, gdy wszystko wysłano."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.pending() or self._sending:
+                if self._thread is None or not self._thread.is_alive():
+                    return False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(timeout=min(remaining, 0.1))
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Próbuje dosłać kolejkę, potem zatrzymuje wątek. Reszta zostaje na dysku."""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+
+outbox = DiscordOutbox()
+
+
 
 
 def send_discord_message(content: str) -> None:
-    url = _get_webhook()
-    if not url:
+    if not _get_webhook():
         print("⚠️ Brak zmiennej środowiskowej DISCORD_WEBHOOK – pomijam wysyłkę.")
         return
-    try:
-        resp = requests.post(url, json={"content": content}, timeout=10)
-        if resp.status_code not in (200, 204):
-            print(f"❌ Błąd Discord ({resp.status_code}): {resp.text[:200]}")
-    except Exception as e:
-        print(f"⚠️ Błąd połączenia z Discordem: {e}")
+    outbox.put(content=content)
 
 
 
 
 def send_discord_file(file_path: str, content: str | None = None, filename: str | None = None) -> None:
-    url = _get_webhook()
-    if not url:
+    if not _get_webhook():
         print("⚠️ Brak zmiennej środowiskowej DISCORD_WEBHOOK – pomijam wysyłkę pliku.")
         return
     if not os.path.exists(file_path):
         print(f"⚠️ Plik nie istnieje: {file_path}")
         return
-    try:
-        with open(file_path, "rb") as f:
-            files = {"file": (filename or os.path.basename(file_path), f)}
-            data = {"content": content} if content else {}
-            resp = requests.post(url, data=data, files=files, timeout=20)
-        if resp.status_code not in (200, 204):
-            print(f"❌ Błąd Discord ({resp.status_code}): {resp.text[:200]}")
-    except Exception as e:
-        print(f"⚠️ Błąd wysyłki pliku do Discorda: {e}")
\ No newline at end of file
+    outbox.put(content=content, file_path=file_path, filename=filename)
@@ -0,0 +1,89 @@
+"""Blokady między procesami na plikach (`flock`) – dla kilku workerów uvicorna.
+
+Z `--workers N` każdy worker to osobny proces z własną pamięcią, więc
+`threading.Lock` chroni już tylko wątki jednego z nich. `FileLock`
+łączy oba poziomy: najpierw blokada wątków w procesie, potem `flock`
+na pliku, którą widzą wszystkie procesy na tym samym wolumenie `data/`.
+
+Jądro zdejmuje `flock` razem z zamknięciem deskryptora – także wtedy,
+gdy proces zginie – więc porzucona blokada nie zostaje na dysku. Na
+tym opiera się wybór lidera harmonogramu (patrz `leader`).
+
+Bez `fcntl` (Windows) zostaje sama blokada wątków – tam i tak
+uruchamiamy jeden proces.
+"""
+
+import os
+import threading
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class FileLock:
+    """Wyłączna blokada na pliku `path` – wątki i procesy; nie jest reentrant."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._thread_lock = threading.Lock()
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._thread_lock.acquire(blocking):
+            return False
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                self._thread_lock.release()
+                return False
+            except BaseException:
+                os.close(fd)
+                self._thread_lock.release()
+                raise
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        # Zamknięcie deskryptora zdejmuje flock
+        os.close(fd)
+        self._thread_lock.release()
+
+    @property
+    def locked(self) -> bool:
+        """Czy blokadę trzyma ten proces."""
+        return self._fd is not None
+
+    def write_note(self, text: str) -> None:
+        """Zapisuje w pliku blokady krótką informację o właścicielu (np. PID)."""
+        if self._fd is None:
+            raise RuntimeError("Blokada nie jest założona")
+        os.ftruncate(self._fd, 0)
+        os.pwrite(self._fd, text.encode("utf-8"), 0)
+
+    def read_note(self) -> str:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
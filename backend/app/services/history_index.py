@@ -0,0 +1,245 @@
+"""Indeks historii raportów po symbolu i czasie (pod `/history`).
+
+Historia (`report_history`, tabela kolumnowa) jest posortowana po
+(report_date, symbol), więc wiersze jednego symbolu są rozrzucone po
+całej tabeli. Indeks trzyma dla każdego symbolu posortowane czasy (int64,
+ns) i numery wierszy w tabeli. Zapytanie o zakres to dwa `searchsorted`
+i pobranie wartości tych wierszy z memmapa kolumny, więc jego koszt zależy
+od długości zakresu, a nie od całej historii.
+
+Historia rośnie tylko przez dopisanie wierszy, dlatego indeks pamięta,
+ile wierszy już zna, i przy kolejnym zapytaniu dokłada wyłącznie nowe.
+Działa to także między procesami: raport dopisany przez inny worker
+zobaczymy przy najbliższym zapytaniu. Nowa generacja tabeli (przepisanie
+całości) oznacza zbudowanie indeksu od nowa.
+
+Długie serie można przerzedzić do zadanej liczby punktów:
+- `lttb` (Largest-Triangle-Three-Buckets) – zachowuje kształt wykresu,
+- `minmax` – minimum i maksimum w każdym kubełku, żadne ekstremum nie ginie.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services import report_history
+from app.services.columnar import Snapshot
+from app.services.report_history import REPORT_DATE_FORMAT
+
+# Kolumny, które nie są seriami liczbowymi
+_META_COLUMNS = {"Symbol", "report_date"}
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", "10000"))
+
+
+def parse_time(value: str) -> pd.Timestamp:
+    """Granica zakresu: ISO (`2025-01-31`, `2025-01-31T06:00`) albo format report_date."""
+    try:
+        return pd.to_datetime(value, format=REPORT_DATE_FORMAT)
+    except ValueError:
+        pass
+    try:
+        ts = pd.Timestamp(value)
+    except ValueError:
+        raise ValueError(f"Nieprawidłowa data '{value}' (oczekiwane ISO 8601 albo {REPORT_DATE_FORMAT})")
+    # report_date to czas lokalny bez strefy – porównujemy "na ścianie zegara"
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+
+# ============================================================
+# Przerzedzanie
+# ============================================================
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Indeksy punktów wybranych algorytmem LTTB (pierwszy i ostatni zawsze zostają)."""
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (points - 2)
+    idx = np.empty(points, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Pole trójkąta (a, kandydat, średnia następnego kubełka) – bez stałego 1/2
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+
+def minmax(y: np.ndarray, points: int) -> np.ndarray:
+    """Indeksy minimum i maksimum z `points // 2` równych kubełków, w kolejności czasu."""
+    n = len(y)
+    buckets = points // 2
+    if points >= n or buckets < 1:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    idx = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        segment = y[lo:hi]
+        idx.append(lo + int(segment.argmin()))
+        idx.append(lo + int(segment.argmax()))
+    return np.unique(idx)
+
+
+# ============================================================
+# Indeks
+# ============================================================
+class _Series:
+    """Czasy i numery wierszy jednego symbolu w buforach rosnących x2 (dopisanie ~O(1))."""
+
+    def __init__(self):
+        self.n = 0
+        self.times = np.empty(0, dtype=np.int64)
+        self.rows = np.empty(0, dtype=np.int64)
+
+    def extend(self, times: np.ndarray, rows: np.ndarray) -> None:
+        need = self.n + len(times)
+        if need > len(self.times):
+            capacity = max(need, 2 * len(self.times), 64)
+            self.times = np.resize(self.times, capacity)
+            self.rows = np.resize(self.rows, capacity)
+
+        unordered = self.n and len(times) and times[0] < self.times[self.n - 1]
+        self.times[self.n:need] = times
+        self.rows[self.n:need] = rows
+        self.n = need
+
+        if unordered:
+            # Nowe tablice zamiast sortowania w miejscu – wcześniejsze wycinki zostają spójne
+            order = np.argsort(self.times[:need], kind="stable")
+            self.times = np.resize(self.times[:need][order], len(self.times))
+            self.rows = np.resize(self.rows[:need][order], len(self.rows))
+
+    def window(self, start: Optional[int], end: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        times = self.times[:self.n]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = self.n if end is None else int(np.searchsorted(times, end, side="right"))
+        return times[lo:hi], self.rows[lo:hi]
+
+
+class HistoryIndex:
+    """Historia raportów rozbita na serie per symbol, douczytywana przyrostowo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.snapshot: Optional[Snapshot] = None
+        self.columns: List[str] = []
+        self.series: Dict[str, _Series] = {}
+        self.generation = 0
+        self.indexed = 0
+
+    # ------------------------------------------------------------
+    # Wczytywanie
+    # ------------------------------------------------------------
+    def _ingest(self, snap: Snapshot, start: int) -> None:
+        codes = np.asarray(snap.arrays["Symbol"][start:])
+        times = np.asarray(snap.arrays["report_date"][start:]).view("i8")
+        rows = np.arange(start, snap.rows, dtype=np.int64)
+
+        order = np.lexsort((times, codes))
+        codes, times, rows = codes[order], times[order], rows[order]
+        bounds = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(codes)]):
+            if lo == hi:
+                continue
+            sym = str(snap.categories["Symbol"][codes[lo]])
+            series = self.series.get(sym)
+            if series is None:
+                series = self.series[sym] = _Series()
+            series.extend(times[lo:hi], rows[lo:hi])
+
+    def refresh(self) -> None:
+        """Dokłada dopisane wiersze (albo buduje indeks od nowa po przepisaniu tabeli)."""
+        with self._lock:
+            version = report_history.version()
+            if version is not None and version == (self.generation, self.indexed):
+                return
+            snap = report_history.snapshot()
+            if snap is None:
+                self._reset()
+                return
+            if snap.generation != self.generation or snap.rows < self.indexed:
+                self._reset()
+                self.generation = snap.generation
+            self.columns = [name for name in snap.names if name not in _META_COLUMNS]
+            if snap.rows > self.indexed:
+                self._ingest(snap, self.indexed)
+            self.snapshot = snap
+            self.indexed = snap.rows
+
+    # ------------------------------------------------------------
+    # Zapytania
+    # ------------------------------------------------------------
+    def query(
+        self,
+        symbols: Optional[Sequence[str]] = None,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        points: Optional[int] = None,
+        method: str = "lttb",
+    ) -> Dict:
+        """
+        Serie (report_date, wartość) dla symboli i kolumn w zakresie [start, end].
+
+        Kolumny dopasowujemy bez względu na wielkość liter ("close" -> "Close").
+        Przy `points` dłuższe serie są przerzedzane metodą `method`.
+        Nieznana kolumna albo metoda to ValueError, brak historii – FileNotFoundError.
+        """
+        if method not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"Nieznana metoda przerzedzania '{method}' (dostępne: {', '.join(DOWNSAMPLE_METHODS)})")
+        if points is not None and not 3 <= points <= MAX_POINTS:
+            raise ValueError(f"points musi być z zakresu 3–{MAX_POINTS}")
+
+        self.refresh()
+        with self._lock:
+            snap = self.snapshot
+            if snap is None or not snap.rows:
+                raise FileNotFoundError("Brak historii raportów (data/history).")
+            by_lower = {col.lower(): col for col in self.columns}
+            selected = []
+            for name in columns or self.columns:
+                col = by_lower.get(name.lower())
+                if col is None:
+                    raise ValueError(f"Kolumna '{name}' nie istnieje (dostępne: {', '.join(self.columns)})")
+                selected.append(col)
+            series = {
+                sym: self.series[sym]
+                for sym in (symbols if symbols else sorted(self.series))
+                if sym in self.series
+            }
+            lo = None if start is None else start.value
+            hi = None if end is None else end.value
+            windows = {sym: s.window(lo, hi) for sym, s in series.items()}
+
+        out = {}
+        for sym, (times, rows) in windows.items():
+            out[sym] = {}
+            for col in selected:
+                y = np.asarray(snap.arrays[col][rows], dtype=float)
+                valid = ~np.isnan(y)
+                t, y = times[valid], y[valid]
+                total = len(y)
+                if points is not None and total > points:
+                    idx = lttb(t / 1e9, y, points) if method == "lttb" else minmax(y, points)
+                    t, y = t[idx], y[idx]
+                stamps = np.datetime_as_string(t.view("datetime64[ns]"), unit="s").tolist()
+                out[sym][col] = {"total": total, "points": [[d, v] for d, v in zip(stamps, y.tolist())]}
+        return {"columns": selected, "series": out}
+
+
+history_index = HistoryIndex()
@@ -0,0 +1,113 @@
+"""Cache HTTP: ETag/Last-Modified, warunkowe GET-y (304) i gotowe, skompresowane odpowiedzi.
+
+`Payload` to odpowiedź zbudowana raz na wersję danych: bajty JSON-a,
+od razu skompresowane gzipem (i brotli, jeśli pakiet `brotli` jest
+zainstalowany), słaby ETag ze skrótu treści i Last-Modified z czasu
+raportu. `respond` wybiera wariant po `Accept-Encoding` albo odpowiada
+304, gdy klient ma już aktualną wersję – wtedy nie wysyłamy ani bajtu
+treści.
+
+`Cache-Control: no-cache` nie zabrania trzymania odpowiedzi – każe
+tylko pytać serwer przed użyciem. Przeglądarka i serwer Next.js dostają
+więc świeże dane zaraz po nowym raporcie, a między raportami płacą
+jedynie za 304.
+"""
+
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+GZIP_LEVEL = 6
+# Mniejszych odpowiedzi nie opłaca się kompresować
+MIN_COMPRESS_BYTES = 512
+CACHE_CONTROL = "no-cache"
+
+try:
+    import brotli  # opcjonalnie: pip install brotli
+except ImportError:
+    brotli = None
+
+
+def http_date(moment: datetime) -> str:
+    """Data w formacie nagłówków HTTP (GMT); czas bez strefy traktujemy jako lokalny."""
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    """Czy klient przyjmie dane kodowanie (pomija wpisy z q=0)."""
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        if name.strip() != coding:
+            continue
+        params = params.replace(" ", "")
+        if not params.startswith("q="):
+            return True
+        try:
+            return float(params[2:]) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Porównanie słabe (RFC 9110): W/"x" i "x" to ten sam tag
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+def not_modified(headers: Mapping[str, str], etag: str, last_modified: Optional[str] = None) -> bool:
+    """Czy klient ma aktualną wersję – If-None-Match ma pierwszeństwo przed If-Modified-Since."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class Payload:
+    """Gotowa odpowiedź: treść, jej wersje skompresowane i walidatory."""
+
+    __slots__ = ("body", "gzip", "br", "etag", "last_modified", "media_type")
+
+    def __init__(self, body: bytes, last_modified: Optional[datetime] = None, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        # Słaby ETag: ta sama treść w każdym kodowaniu (gzip/br/identity)
+        self.etag = 'W/"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.last_modified = http_date(last_modified) if last_modified else None
+        compress = len(body) >= MIN_COMPRESS_BYTES
+        self.gzip = gzip.compress(body, GZIP_LEVEL, mtime=0) if compress else None
+        self.br = brotli.compress(body) if compress and brotli is not None else None
+
+    def headers(self, cache_control: str = CACHE_CONTROL) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        return headers
+
+
+def respond(request: Request, payload: Payload, cache_control: str = CACHE_CONTROL) -> Response:
+    """304 dla aktualnego klienta, inaczej treść w najlepszym przyjmowanym kodowaniu."""
+    headers = payload.headers(cache_control)
+    if not_modified(request.headers, payload.etag, payload.last_modified):
+        return Response(status_code=304, headers=headers)
+
+    accept_encoding = request.headers.get("accept-encoding", "")
+    body = payload.body
+    if payload.br is not None and _accepts(accept_encoding, "br"):
+        body, headers["Content-Encoding"] = payload.br, "br"
+    elif payload.gzip is not None and _accepts(accept_encoding, "gzip"):
+        body, headers["Content-Encoding"] = payload.gzip, "gzip"
+    return Response(content=body, media_type=payload.media_type, headers=headers)
@@ -0,0 +1,215 @@
+"""Przyrostowy stan wskaźników raportu (ATR, zmiany 24h/3D/7D).
+
+`report_engine` liczy raport z ogona historii za każdym razem od nowa.
+Tutaj każdy symbol ma własny stan w buforach pierścieniowych: ostatnie
+zamknięcia (do zmian procentowych) i ostatnie wartości TR (do ATR).
+Nowa świeca to stała liczba operacji, niezależnie od długości historii,
+więc sygnały można sprawdzać przy każdej świecy, a nie dwa razy dziennie.
+
+Ostatnia świeca może być jeszcze otwarta – kolejna aktualizacja z tym
+samym czasem otwarcia nadpisuje ją zamiast dokładać nową.
+
+Okna (w świecach) bierzemy z `report_engine.report_windows` dla
+interwału strumienia – 24h% na 4h to 6 świec wstecz, jak w raporcie.
+Wyniki odpowiadają `batched_atr`: dla okien dłuższych niż okres ATR to
+średnia z ostatnich `period` wartości TR, a gdy okno równa się okresowi
+(ATR(3D) na 1d), TR pierwszej świecy okna to samo H-L. TR pierwszej
+świecy w historii to zawsze H-L. Stan zapisujemy osobno dla każdego
+interwału (`data/state/indicators_<interwał>.json`), żeby przetrwał restart.
+"""
+
+import json
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from app.services import timeframes
+from app.services.report_engine import make_row, report_windows
+
+STATE_DIR = Path("data/state")
+
+
+def state_path(interval: str) -> Path:
+    return STATE_DIR / f"indicators_{interval}.json"
+
+
+class RingBuffer:
+    """Bufor o stałej pojemności z dostępem O(1) do elementów od końca."""
+
+    def __init__(self, capacity: int, items: Iterable[float] = ()):
+        self.capacity = capacity
+        self._data: List[float] = [0.0] * capacity
+        self._end = 0
+        self.size = 0
+        for item in items:
+            self.append(item)
+
+    def append(self, value: float) -> None:
+        self._data[self._end] = value
+        self._end = (self._end + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def pop(self) -> float:
+        self._end = (self._end - 1) % self.capacity
+        self.size -= 1
+        return self._data[self._end]
+
+    def __getitem__(self, index: int) -> float:
+        """Tylko indeksy ujemne: -1 to ostatni element."""
+        if not -self.size <= index < 0:
+            raise IndexError(index)
+        return self._data[(self._end + index) % self.capacity]
+
+    def tail(self, n: int) -> List[float]:
+        return [self[i] for i in range(-min(n, self.size), 0)]
+
+    def to_list(self) -> List[float]:
+        return self.tail(self.size)
+
+
+class IndicatorState:
+    """Stan wskaźników jednego symbolu w świecach jednego interwału."""
+
+    def __init__(self, interval: str = timeframes.REPORT_INTERVAL):
+        self.interval = interval
+        self.lags, self.windows, self.period, self.lookback = report_windows(timeframes.interval_ms(interval))
+        # +1 miejsca, żeby nadpisanie otwartej świecy nie gubiło najstarszej
+        self.closes = RingBuffer(self.lookback + 1)
+        self.trs = RingBuffer(self.period + 1)
+        self.ranges = RingBuffer(self.period + 1)  # H-L, dla okna równego okresowi
+        self.last_open_time: Optional[int] = None
+        self.count = 0
+
+    def update(self, open_time: int, high: float, low: float, close: float) -> None:
+        """Dokłada świecę albo nadpisuje ostatnią (ten sam czas otwarcia)."""
+        if self.last_open_time is not None:
+            if open_time < self.last_open_time:
+                return
+            if open_time == self.last_open_time:
+                self.closes.pop()
+                self.trs.pop()
+                self.ranges.pop()
+                self.count -= 1
+
+        if self.closes.size:
+            prev_close = self.closes[-1]
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        else:
+            tr = high - low
+
+        self.closes.append(close)
+        self.trs.append(tr)
+        self.ranges.append(high - low)
+        self.last_open_time = open_time
+        self.count += 1
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= self.lookback
+
+    def atr(self, window: Optional[int] = None) -> float:
+        """ATR z ogona `window` świec (domyślnie: dłuższego niż okres)."""
+        if self.trs.size < self.period:
+            return math.nan
+        trs = self.trs.tail(self.period)
+        if window is not None and window <= self.period:
+            # Pierwsza świeca ogona nie ma w nim poprzedniego zamknięcia
+            trs[0] = self.ranges[-self.period]
+        return sum(trs) / self.period
+
+    def pct_change(self, lag: int) -> float:
+        ref = self.closes[-1 - lag]
+        return (self.closes[-1] - ref) / ref * 100
+
+    def values(self) -> Dict[str, float]:
+        close = self.closes[-1]
+        values = {col: self.pct_change(lag) for col, lag in self.lags.items()}
+        for col, window in self.windows.items():
+            values[col] = self.atr(window) / close * 100
+        return values
+
+    def to_dict(self) -> Dict:
+        return {
+            "last_open_time": self.last_open_time,
+            "count": self.count,
+            "closes": self.closes.to_list(),
+            "trs": self.trs.to_list(),
+            "ranges": self.ranges.to_list(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, interval: str = timeframes.REPORT_INTERVAL) -> "IndicatorState":
+        state = cls(interval)
+        state.closes = RingBuffer(state.lookback + 1, data["closes"])
+        state.trs = RingBuffer(state.period + 1, data["trs"])
+        state.ranges = RingBuffer(state.period + 1, data["ranges"])
+        state.last_open_time = data["last_open_time"]
+        state.count = data["count"]
+        return state
+
+
+class IndicatorBank:
+    """Stany wskaźników dla wielu symboli (jeden interwał), bezpieczne dla wątków."""
+
+    def __init__(self, interval: str = timeframes.REPORT_INTERVAL, states: Optional[Dict[str, IndicatorState]] = None):
+        self.interval = interval
+        self.states: Dict[str, IndicatorState] = states or {}
+        self._lock = threading.Lock()
+
+    def _state(self, symbol: str) -> IndicatorState:
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = IndicatorState(self.interval)
+        return state
+
+    def update(self, symbol: str, open_time: int, high: float, low: float, close: float) -> None:
+        with self._lock:
+            state = self._state(symbol)
+            state.update(open_time, high, low, close)
+
+    def sync_frame(self, symbol: str, df: pd.DataFrame) -> None:
+        """Dokłada z DataFrame'u świec tylko to, czego stan jeszcze nie widział."""
+        open_times = df["time"].to_numpy("datetime64[ms]").astype("int64")
+        highs, lows, closes = (df[col].to_numpy(dtype=float) for col in ("high", "low", "close"))
+        with self._lock:
+            state = self._state(symbol)
+            last = state.last_open_time
+            start = 0 if last is None else int(open_times.searchsorted(last))
+            for i in range(start, len(open_times)):
+                state.update(int(open_times[i]), highs[i], lows[i], closes[i])
+
+    def row(self, symbol: str) -> Optional[Dict]:
+        """Wiersz raportu dla symbolu albo None, jeśli historia jest za krótka."""
+        with self._lock:
+            state = self.states.get(symbol)
+            if state is None or not state.ready:
+                return None
+            return make_row(symbol, state.closes[-1], state.values())
+
+    def rows(self, symbols: Iterable[str]) -> List[Dict]:
+        return [row for row in (self.row(sym) for sym in symbols) if row is not None]
+
+    def save(self, path: Optional[Path] = None) -> None:
+        path = path or state_path(self.interval)
+        with self._lock:
+            payload = {sym: state.to_dict() for sym, state in self.states.items()}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(payload))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, interval: str = timeframes.REPORT_INTERVAL, path: Optional[Path] = None) -> "IndicatorBank":
+        path = path or state_path(interval)
+        if not path.exists():
+            return cls(interval)
+        try:
+            payload = json.loads(path.read_text())
+            return cls(interval, {sym: IndicatorState.from_dict(data, interval) for sym, data in payload.items()})
+        except Exception as e:
+            print(f"⚠️ Nie udało się wczytać stanu wskaźników ({path}): {e} – zaczynam od zera.")
+            return cls(interval)
@@ -0,0 +1,184 @@
+"""Lokalny magazyn świec OHLCV na wolumenie `data/`.
+
+Każda para (symbol, interwał) ma własny plik `.npy` z tablicą
+strukturalną – czas otwarcia w ms plus OHLCV jako float64. Format jest
+binarny, bez parsowania tekstu, a odczyt kilkuset świec to pojedynczy
+`np.load`. Zapis idzie przez plik tymczasowy i `os.replace`, żeby
+przerwany proces nie zostawił uszkodzonej historii; pojedyncze nowe
+świece ze strumienia dopisujemy na koniec pliku (`append_klines`).
+
+Moduł nie rozmawia z giełdą – tylko przechowuje i scala dane. Pobieraniem
+brakujących świec zajmuje się `analytics.get_historical_data`.
+"""
+
+import io
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.services.filelock import FileLock
+
+KLINES_DIR = Path("data/klines")
+
+KLINE_DTYPE = np.dtype([
+    ("open_time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+_locks: dict[tuple[str, str], FileLock] = {}
+_locks_guard = threading.Lock()
+
+
+def symbol_lock(symbol: str, interval: str) -> FileLock:
+    """
+    Blokada na parę (symbol, interwał) – chroni odczyt-scalenie-zapis.
+
+    Działa między wątkami i procesami (`flock` na pliku obok świec): przy
+    kilku workerach strumień lidera dopisuje świece w miejscu, a dociąganie
+    z REST w innym workerze podmienia plik – bez wspólnej blokady jedno
+    gubiłoby zapis drugiego.
+    """
+    with _locks_guard:
+        lock = _locks.get((symbol, interval))
+        if lock is None:
+            lock = _locks[(symbol, interval)] = FileLock(KLINES_DIR / f"{symbol}_{interval}.lock")
+        return lock
+
+
+def _path(symbol: str, interval: str) -> Path:
+    return KLINES_DIR / f"{symbol}_{interval}.npy"
+
+
+def stored_pairs(interval: str) -> list[str]:
+    """Pary, dla których na dysku leży historia danego interwału (posortowane)."""
+    suffix = f"_{interval}.npy"
+    return sorted(p.name[: -len(suffix)] for p in KLINES_DIR.glob(f"*{suffix}"))
+
+
+def mtime_ns(symbol: str, interval: str) -> int | None:
+    """Czas ostatniego zapisu pliku świec – tania wersja danych pary."""
+    try:
+        return _path(symbol, interval).stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def klines_to_array(klines: list) -> np.ndarray:
+    """Zamienia surową odpowiedź Binance (listę list) na tablicę KLINE_DTYPE."""
+    arr = np.empty(len(klines), dtype=KLINE_DTYPE)
+    if not klines:
+        return arr
+    arr["open_time"] = [k[0] for k in klines]
+    for i, field in enumerate(("open", "high", "low", "close", "volume"), start=1):
+        arr[field] = [float(k[i]) for k in klines]
+    return arr
+
+
+def load_klines(symbol: str, interval: str) -> np.ndarray:
+    """Czyta zapisaną historię; pusta tablica, jeśli jeszcze jej nie ma."""
+    path = _path(symbol, interval)
+    if not path.exists():
+        return np.empty(0, dtype=KLINE_DTYPE)
+    try:
+        return np.load(path, allow_pickle=False)
+    except Exception as e:
+        print(f"⚠️ Uszkodzony plik świec {path}: {e} – pobiorę historię od nowa.")
+        return np.empty(0, dtype=KLINE_DTYPE)
+
+
+def save_klines(symbol: str, interval: str, arr: np.ndarray) -> None:
+    KLINES_DIR.mkdir(parents=True, exist_ok=True)
+    path = _path(symbol, interval)
+    # PID w nazwie – kilka workerów może zapisywać tę samą parę naraz
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp, arr, allow_pickle=False)
+    os.replace(tmp, path)
+
+
+def _append_in_place(path: Path, fresh: np.ndarray) -> bool:
+    """Dopisuje `fresh` do istniejącego pliku; False, jeśli się nie da."""
+    with open(path, "r+b") as f:
+        if np.lib.format.read_magic(f) != (1, 0):
+            return False
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        offset = f.tell()
+        if dtype != KLINE_DTYPE or fortran or len(shape) != 1 or not shape[0]:
+            return False
+        count = shape[0]
+        f.seek(offset + (count - 1) * KLINE_DTYPE.itemsize)
+        last = np.frombuffer(f.read(KLINE_DTYPE.itemsize), dtype=KLINE_DTYPE)
+        if not len(last) or fresh["open_time"][0] < last["open_time"][0]:
+            return False
+        start = count - 1 if fresh["open_time"][0] == last["open_time"][0] else count
+
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            "descr": np.lib.format.dtype_to_descr(KLINE_DTYPE),
+            "fortran_order": False,
+            "shape": (start + len(fresh),),
+        })
+        if header.tell() != offset:
+            return False
+        f.seek(offset + start * KLINE_DTYPE.itemsize)
+        f.write(fresh.astype(KLINE_DTYPE).tobytes())
+        f.truncate()
+        f.flush()
+        f.seek(0)
+        f.write(header.getvalue())
+        return True
+
+
+def append_klines(symbol: str, interval: str, fresh: np.ndarray) -> None:
+    """
+    Dopisuje nowe świece na koniec pliku bez przepisywania całej historii.
+
+    Dane idą za ostatni rekord, a dopiero potem nadpisujemy nagłówek
+    `.npy` z nowym kształtem (ma stałą, wyrównaną długość). Przerwany
+    zapis zostawia więc najwyżej nadmiarowe bajty za tablicą, których
+    `np.load` nie czyta. Świeca o czasie ostatniej zapisanej (wcześniej
+    otwarta) nadpisuje ją w miejscu. Starsze świece, brak pliku albo
+    nagłówek, który by urósł – zwykłe scalenie i pełny zapis.
+    Wywołujący trzyma `symbol_lock`; `fresh` posortowane po czasie.
+    """
+    if not len(fresh):
+        return
+    try:
+        if _append_in_place(_path(symbol, interval), fresh):
+            return
+    except (OSError, ValueError):
+        pass
+    save_klines(symbol, interval, merge_klines(load_klines(symbol, interval), fresh))
+
+
+def merge_klines(stored: np.ndarray, fresh: np.ndarray) -> np.ndarray:
+    """
+    Scala historię ze świeżo pobranymi świecami.
+    Przy powtórzonym czasie otwarcia wygrywa świeża wersja – tak
+    nadpisujemy ostatnią, wcześniej jeszcze otwartą świecę.
+    """
+    if not len(fresh):
+        return stored
+    if not len(stored):
+        return fresh
+    both = np.concatenate([fresh, stored])
+    _, idx = np.unique(both["open_time"], return_index=True)
+    return both[idx]
+
+
+def klines_to_df(arr: np.ndarray) -> pd.DataFrame:
+    """Zwraca DataFrame w formacie, którego oczekuje reszta analityki."""
+    return pd.DataFrame({
+        "time": pd.to_datetime(arr["open_time"], unit="ms"),
+        "open": arr["open"],
+        "high": arr["high"],
+        "low": arr["low"],
+        "close": arr["close"],
+        "volume": arr["volume"],
+    })
@@ -0,0 +1,103 @@
+"""Wybór lidera wśród workerów uvicorna – harmonogram działa tylko w jednym.
+
+Z `--workers N` każdy worker przechodzi przez startup aplikacji. Bez
+koordynacji mielibyśmy N kopii APScheduler: N raportów o 6:00, N wiadomości
+na Discordzie i N razy większe obciążenie Binance. Zadania w tle
+(harmonogram, strumień świec) dostaje więc tylko lider – proces, który
+trzyma `flock` na `SCHEDULER_LOCK_PATH`.
+
+Plik blokady leży domyślnie w katalogu tymczasowym systemu, a nie
+w `data/` – start aplikacji nie tworzy niczego w katalogu roboczym.
+Workery jednego kontenera widzą ten sam katalog; kilka kontenerów na
+wspólnym wolumenie koordynuje się, gdy wskażemy plik na tym wolumenie
+(np. `SCHEDULER_LOCK_PATH=data/scheduler.lock`).
+
+Pozostałe workery obsługują zapytania i co `LEADER_RETRY_SECONDS`
+próbują przejąć blokadę. Jądro zdejmuje ją, gdy lider zginie (także
+przez SIGKILL), więc najpóźniej po tym czasie rolę przejmuje kolejny
+worker. Dane między workerami płyną przez dysk: historia raportów
+(memmap, patrz `report_history`) i stan uniwersum.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, Optional
+
+from app.services.filelock import FileLock
+from app.services.metrics import Gauge
+
+SCHEDULER_LOCK_PATH = os.getenv(
+    "SCHEDULER_LOCK_PATH", os.path.join(tempfile.gettempdir(), "kryptosfera-scheduler.lock")
+)
+LEADER_RETRY_SECONDS = float(os.getenv("LEADER_RETRY_SECONDS", "5"))
+
+
+class LeaderElection:
+    """Lider = właściciel blokady pliku; reszta czeka w tle na przejęcie."""
+
+    def __init__(self, path: str = SCHEDULER_LOCK_PATH, retry_seconds: float = LEADER_RETRY_SECONDS):
+        self.lock = FileLock(path)
+        self.retry_seconds = retry_seconds
+        self.elected_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.lock.locked
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        if not self.lock.acquire(blocking=False):
+            return False
+        self.elected_at = time.time()
+        self.lock.write_note(json.dumps({"pid": os.getpid(), "since": self.elected_at}))
+        print(f"👑 Worker {os.getpid()} jest liderem – uruchamiam zadania w tle.")
+        return True
+
+    def start(self, on_elected: Callable[[], None]) -> None:
+        """Próbuje od razu; jeśli lider już jest, czeka w tle na jego blokadę."""
+        if self.try_acquire():
+            on_elected()
+            return
+        print(f"👥 Worker {os.getpid()} obsługuje tylko zapytania (lider: {self.leader_pid()}).")
+        self._task = asyncio.get_running_loop().create_task(self._wait_for_leadership(on_elected))
+
+    async def _wait_for_leadership(self, on_elected: Callable[[], None]) -> None:
+        while not self.try_acquire():
+            await asyncio.sleep(self.retry_seconds)
+        on_elected()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.is_leader:
+            self.lock.release()
+            self.elected_at = None
+
+    def leader_pid(self) -> Optional[int]:
+        try:
+            return json.loads(self.lock.read_note())["pid"]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def status(self) -> Dict:
+        return {
+            "pid": os.getpid(),
+            "leader": self.is_leader,
+            "leader_pid": os.getpid() if self.is_leader else self.leader_pid(),
+            "leader_since": self.elected_at,
+        }
+
+
+leader = LeaderElection()
+
+Gauge(
+    "kryptosfera_scheduler_leader",
+    "1, jeśli ten worker jest liderem (harmonogram, strumień świec)",
+    fn=lambda: float(leader.is_leader),
+)
@@ -0,0 +1,291 @@
+"""Metryki procesu w tekstowym formacie Prometheusa (`/metrics`).
+
+Bez zewnętrznej biblioteki: kilka struktur w pamięci, każda z własnym
+lockiem, a tekst składamy dopiero przy odczycie. Pomiar to lock +
+bisect (około mikrosekundy), więc mierzymy każde zapytanie i każdy etap.
+
+- `stage("binance_fetch")` – czas etapu potoku (histogram
+  `kryptosfera_stage_seconds{stage}`); działa też jako dekorator,
+- `MetricsMiddleware` – czas każdego endpointu po szablonie ścieżki
+  (`/chart`, a nie `/chart?symbols=...`), więc etykiet jest tyle, ile tras,
+- liczniki wagi Binance i błędów Discorda/Groq,
+- liczba raportów w historii i rozmiar katalogu `data/` – liczone przy
+  odczycie, z krótkim cache, żeby scrape nie chodził po dysku co chwilę.
+
+Metryki są per proces; przy kilku workerach każdy wystawia swoje.
+"""
+
+import bisect
+import contextlib
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DATA_DIR = "data"
+# Jak długo trzymamy policzony rozmiar data/ i liczbę raportów
+DATA_STATS_TTL = float(os.getenv("METRICS_DATA_STATS_TTL", "30"))
+
+# Od 5 ms (cache, sygnały) do 2 minut (pełny raport z harmonogramu)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: oczekiwane etykiety {self.labelnames}, są {tuple(labels)}")
+        return tuple([str(labels[n]) for n in self.labelnames])
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+
+class Counter(_Metric):
+    """Licznik rosnący (nazwa powinna kończyć się na `_total`)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        if not self.labelnames:
+            self._values[()] = 0.0  # zero widoczne od startu, zanim coś się wydarzy
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Wartość chwilowa: ustawiana `set` albo liczona przy odczycie przez `fn`."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> List[str]:
+        if self.fn is not None:
+            try:
+                return [f"{self.name} {_number(self.fn())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """Histogram o stałych kubełkach: liczniki kubełków + suma + liczba pomiarów."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+# ============================================================
+# Metryki aplikacji
+# ============================================================
+STAGE_SECONDS = Histogram(
+    "kryptosfera_stage_seconds",
+    "Czas etapów potoku (Binance, obliczenia, historia, wykres, Groq, Discord)",
+    ["stage"],
+)
+HTTP_SECONDS = Histogram(
+    "kryptosfera_http_request_duration_seconds",
+    "Czas obsługi zapytań HTTP po szablonie ścieżki",
+    ["method", "route", "status"],
+)
+BINANCE_WEIGHT = Counter(
+    "kryptosfera_binance_weight_total",
+    "Waga wysłanych zapytań REST Binance (wg tabeli wag)",
+    ["method"],
+)
+BINANCE_RATE_LIMITED = Counter(
+    "kryptosfera_binance_rate_limited_total",
+    "Odpowiedzi 418/429 z Binance",
+)
+DISCORD_FAILURES = Counter(
+    "kryptosfera_discord_failures_total",
+    "Nieudane wysyłki na Discorda",
+    ["reason"],
+)
+GROQ_FAILURES = Counter(
+    "kryptosfera_groq_failures_total",
+    "Nieudane zapytania do Groq",
+)
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Mierzy czas bloku (albo funkcji, jako dekorator) jako etap `name`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+# ============================================================
+# Katalog danych (liczone leniwie przy odczycie)
+# ============================================================
+_data_stats: Tuple[float, int, int] = (-math.inf, 0, 0)
+_data_stats_lock = threading.Lock()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    total += _dir_size(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total += entry.stat(follow_symlinks=False).st_size
+    except FileNotFoundError:
+        pass
+    return total
+
+
+def data_stats() -> Tuple[int, int]:
+    """(liczba raportów w historii, rozmiar data/ w bajtach), odświeżane co DATA_STATS_TTL."""
+    # report_history importuje metryki – tu tylko leniwie, przy odczycie
+    from app.services import report_history
+
+    global _data_stats
+    with _data_stats_lock:
+        checked_at, reports, size = _data_stats
+        if time.monotonic() - checked_at >= DATA_STATS_TTL:
+            schema = report_history.table.schema()
+            reports = schema["meta"].get("reports", 0) if schema else 0
+            size = _dir_size(DATA_DIR)
+            _data_stats = (time.monotonic(), reports, size)
+        return reports, size
+
+
+Gauge("kryptosfera_reports", "Liczba raportów w historii (data/history)", fn=lambda: data_stats()[0])
+Gauge("kryptosfera_data_dir_bytes", "Rozmiar katalogu data/ w bajtach", fn=lambda: data_stats()[1])
+
+
+def render() -> str:
+    """Wszystkie metryki w formacie tekstowym Prometheusa."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ============================================================
+# Middleware ASGI: czas każdego endpointu
+# ============================================================
+class MetricsMiddleware:
+    """
+    Czysty middleware ASGI (bez BaseHTTPMiddleware – mniejszy narzut i nie
+    buforuje odpowiedzi strumieniowych). Trasę bierzemy z `scope["route"]`,
+    który FastAPI ustawia po dopasowaniu.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            HTTP_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route, status=status)
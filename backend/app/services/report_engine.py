@@ -0,0 +1,131 @@
+"""Wektorowy silnik raportu dla wielu symboli naraz.
+
+Zamiast liczyć każdy symbol osobno na DataFrame'ach (`iloc`, `atr()`
+z kopią i czterema kolumnami tymczasowymi), układamy ogony wszystkich
+serii w tablice 2-D (czas × symbol) i liczymy zmiany procentowe oraz ATR
+jednym przebiegiem NumPy.
+
+Serie są wyrównane do ostatniej świecy, tak jak pozycyjne `iloc[-25]`
+w pierwotnym kodzie – wiersz `-1` to zawsze najnowsza świeca symbolu,
+a krótsze historie są dopełnione od góry NaN-ami. Dzięki temu wiersze
+raportu są takie same jak z pętli po symbolach.
+
+Okna są zdefiniowane w godzinach, więc ten sam raport da się policzyć
+na świecach innego interwału (`compute_report_rows(frames, step_ms)`):
+24h% na 4h to 6 świec wstecz, ATR(7D) – ogon 42 świec.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Okna raportu w godzinach: kolumna -> horyzont
+CHANGE_WINDOWS_H = {"24h%": 24, "3D%": 72, "7D%": 168}
+ATR_WINDOWS_H = {"ATR(3D)%": 72, "ATR(7D)%": 168}
+ATR_PERIOD = 14
+
+_HOUR_MS = 3_600_000
+
+
+def report_windows(step_ms: int = _HOUR_MS) -> Tuple[Dict[str, int], Dict[str, int], int, int]:
+    """
+    Okna raportu w świecach interwału `step_ms`.
+
+    Zwraca (change_lags, atr_windows, atr_period, lookback). Okres ATR
+    nie może być dłuższy niż najkrótsze okno – na 1d ATR(3D) to średnia
+    z 3 TR zamiast 14.
+    """
+    lags = {col: hours * _HOUR_MS // step_ms for col, hours in CHANGE_WINDOWS_H.items()}
+    windows = {col: hours * _HOUR_MS // step_ms for col, hours in ATR_WINDOWS_H.items()}
+    period = min(ATR_PERIOD, *windows.values())
+    lookback = max(max(lags.values()) + 1, max(windows.values()))
+    return lags, windows, period, lookback
+
+
+# Okna dla świec 1h (zmiany: iloc[-1 - lag]; ATR: df.tail(window))
+CHANGE_LAGS, ATR_WINDOWS, _, REPORT_LOOKBACK = report_windows()
+
+
+def align_tails(frames: Dict[str, pd.DataFrame], length: int = REPORT_LOOKBACK):
+    """
+    Układa ostatnie `length` świec każdego symbolu w tablice (length × S).
+
+    Zwraca (symbols, arrays, counts), gdzie arrays to słownik
+    high/low/close, a counts – ile prawdziwych świec ma każdy symbol.
+    """
+    symbols = list(frames)
+    shape = (length, len(symbols))
+    arrays = {col: np.full(shape, np.nan) for col in ("high", "low", "close")}
+    counts = np.zeros(len(symbols), dtype=np.int64)
+
+    for j, sym in enumerate(symbols):
+        df = frames[sym]
+        n = min(len(df), length)
+        counts[j] = len(df)
+        if n == 0:
+            continue
+        for col, arr in arrays.items():
+            arr[length - n:, j] = df[col].to_numpy(dtype=float)[-n:]
+
+    return symbols, arrays, counts
+
+
+def batched_pct_change(close: np.ndarray, lag: int) -> np.ndarray:
+    """Zmiana % ostatniej świecy względem świecy `lag` pozycji wcześniej."""
+    ref = close[-1 - lag]
+    return (close[-1] - ref) / ref * 100
+
+
+def batched_atr(high, low, close, window: int, period: int = ATR_PERIOD) -> np.ndarray:
+    """
+    ATR jak `analytics.atr(df.tail(window), period)`, dla wszystkich kolumn naraz.
+
+    Pierwsza świeca ogona nie ma poprzedniego zamknięcia (shift w obrębie
+    tail), więc jej TR to samo H-L. Brak pełnych `period` wartości TR daje
+    NaN – tak samo jak `rolling(window=period).mean()`.
+    """
+    length = close.shape[0]
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    if window < length:
+        prev_close[length - window] = np.nan
+
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return tr[-period:].mean(axis=0)
+
+
+def make_row(symbol: str, close: float, values: Dict[str, float]) -> Dict:
+    """Składa wiersz raportu z zaokrągleniem do 2 miejsc, jak w generate_report."""
+    row = {"Symbol": symbol, "Close": float(f"{close:.2f}")}
+    for col, value in values.items():
+        row[col] = float(f"{value:.2f}")
+    return row
+
+
+def compute_report_rows(frames: Dict[str, pd.DataFrame], step_ms: int = _HOUR_MS) -> Tuple[List[Dict], Dict[str, str]]:
+    """
+    Liczy wiersze raportu dla wszystkich symboli jednym przebiegiem.
+
+    `step_ms` to długość świecy w `frames` (domyślnie 1h). Zwraca
+    (rows, errors). Symbol z historią krótszą niż najdłuższe okno
+    trafia do errors, tak jak wcześniej kończył się wyjątkiem z `iloc`.
+    """
+    lags, windows, period, lookback = report_windows(step_ms)
+    symbols, arrays, counts = align_tails(frames, lookback)
+    high, low, close = arrays["high"], arrays["low"], arrays["close"]
+
+    last_close = close[-1]
+    values = {col: batched_pct_change(close, lag) for col, lag in lags.items()}
+    for col, window in windows.items():
+        values[col] = batched_atr(high, low, close, window, period) / last_close * 100
+
+    rows, errors = [], {}
+    for j, sym in enumerate(symbols):
+        if counts[j] < lookback:
+            errors[sym] = f"za mało świec ({counts[j]}), potrzeba {lookback}"
+            continue
+        rows.append(make_row(sym, last_close[j], {col: arr[j] for col, arr in values.items()}))
+
+    return rows, errors
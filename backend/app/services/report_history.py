@@ -0,0 +1,216 @@
+"""Historia raportów w magazynie kolumnowym (`data/history/`).
+
+Każdy raport jest dopisywany do jednej tabeli kolumnowej (patrz
+`columnar`): symbol jako słownik, `report_date` jako prawdziwy znacznik
+czasu, wartości jako float64. Odczyt całej historii to memmap kilku
+plików – bez parsowania tekstu – a dopisanie raportu kosztuje tyle,
+ile sam raport.
+
+Tabela jest jedynym źródłem prawdy: najnowszy raport to ostatnie wiersze
+historii (`latest_report`), a `/history` i wykresy czytają te same
+kolumny. CSV zostaje wyłącznie jako eksport – pojedyncze raporty
+(`REPORTS_CSV_EXPORT=1` w analytics) i cała historia (`export_csv`).
+
+Starsze dane w CSV (`data/reports/report_*.csv`, `data/all_reports.csv`)
+są importowane przy pierwszym odczycie pustego magazynu albo na żądanie
+przez `rebuild`. Eksport z linii poleceń (z katalogu `backend/`):
+
+    python -m app.services.report_history --export data/all_reports.csv
+"""
+
+import argparse
+import glob
+import os
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from app.services.columnar import ColumnTable, Snapshot
+from app.services.filelock import FileLock
+from app.services.metrics import stage
+
+HISTORY_DIR = "data/history"
+REPORTS_DIR = "data/reports"
+LEGACY_HISTORY_FILE = "data/all_reports.csv"
+# Zapis chroniony między procesami (kilka workerów uvicorna) – poza HISTORY_DIR
+HISTORY_LOCK_FILE = "data/history.lock"
+REPORT_DATE_FORMAT = "%Y-%m-%d-%H-%M-%S"
+# Kolumny pomocnicze raportu, których nie trzymamy w historii
+_DROPPED_COLUMNS = ["symbol", "generated_at"]
+
+table = ColumnTable(HISTORY_DIR)
+_lock = FileLock(HISTORY_LOCK_FILE)
+_migration_checked = False
+
+
+def _normalize(df: pd.DataFrame, path: Optional[str] = None) -> pd.DataFrame:
+    """Symbol, report_date (datetime64) i kolumny liczbowe – w tej kolejności."""
+    df = df.copy()
+    # Normalizacja nazwy kolumny z symbolem
+    if "Symbol" not in df.columns and "symbol" in df.columns:
+        df["Symbol"] = df["symbol"]
+
+    # Ustal report_date – jeśli nie ma, użyj stempla z nazwy pliku
+    if "report_date" not in df.columns:
+        base = os.path.basename(path or "")
+        df["report_date"] = base.replace("report_", "").replace(".csv", "")
+    if not pd.api.types.is_datetime64_any_dtype(df["report_date"]):
+        df["report_date"] = pd.to_datetime(df["report_date"].astype(str), format=REPORT_DATE_FORMAT, errors="coerce")
+    df = df.dropna(subset=["report_date"])
+
+    df = df.drop(columns=[c for c in _DROPPED_COLUMNS if c in df.columns])
+    df["Symbol"] = df["Symbol"].astype(str)
+    values = [c for c in df.columns if c not in ("Symbol", "report_date")]
+    for col in values:
+        column = df[col]
+        if not pd.api.types.is_numeric_dtype(column):
+            # Starsze raporty mogły mieć wartości w stylu "5.2%"
+            column = column.astype(str).str.replace("%", "", regex=False)
+        df[col] = pd.to_numeric(column, errors="coerce").astype(float)
+    return df[["Symbol", "report_date", *values]]
+
+
+def _meta(df: pd.DataFrame, reports: int) -> dict:
+    return {"reports": reports, "last_report_date": df["report_date"].iloc[-1].strftime(REPORT_DATE_FORMAT)}
+
+
+def _write_merged(frames: list) -> None:
+    merged = pd.concat(frames, ignore_index=True)
+    merged = merged.drop_duplicates(subset=["Symbol", "report_date"], keep="last")
+    merged = merged.sort_values(by=["report_date", "Symbol"], kind="stable", ignore_index=True)
+    if merged.empty:
+        return
+    table.write(merged, _meta(merged, int(merged["report_date"].nunique())))
+
+
+# ============================================================
+# Zapis
+# ============================================================
+def _legacy_frames() -> list:
+    paths = sorted(glob.glob(os.path.join(REPORTS_DIR, "report_*.csv")))
+    if os.path.exists(LEGACY_HISTORY_FILE):
+        paths.insert(0, LEGACY_HISTORY_FILE)
+    frames = []
+    for path in paths:
+        try:
+            frames.append(_normalize(pd.read_csv(path), path))
+        except Exception as e:
+            print(f"⚠️ Problem z plikiem {path}: {e}")
+    return frames
+
+
+def _rebuild_locked() -> None:
+    frames = _legacy_frames()
+    if not frames:
+        print("⚠️ Brak plików CSV do zaimportowania.")
+        return
+    current = table.read()
+    if current is not None and current.rows:
+        frames.insert(0, current.to_frame())
+    _write_merged(frames)
+    print(f"✅ Zaimportowano {len(frames)} plików CSV -> {HISTORY_DIR}")
+
+
+def _needs_migration() -> bool:
+    """Pusty magazyn, a na dysku zostały raporty CSV."""
+    return table.schema() is None and bool(
+        glob.glob(os.path.join(REPORTS_DIR, "report_*.csv")) or os.path.exists(LEGACY_HISTORY_FILE)
+    )
+
+
+def _migrate_locked() -> None:
+    """Jednorazowo w procesie: pusty magazyn, a na dysku zostały raporty CSV – import."""
+    global _migration_checked
+    if _migration_checked:
+        return
+    if _needs_migration():
+        _rebuild_locked()
+    _migration_checked = True
+
+
+@stage("history_rebuild")
+def rebuild() -> None:
+    """Dokłada do historii raporty z plików CSV (data/reports, all_reports.csv)."""
+    with _lock:
+        _rebuild_locked()
+
+
+@stage("history_append")
+def append_report(df: pd.DataFrame) -> None:
+    """
+    Dopisuje do historii wiersze jednego raportu (z kolumną report_date).
+
+    Koszt zależy tylko od rozmiaru nowego raportu. Raport nie nowszy od
+    ostatniego albo z innym zestawem kolumn wymaga przepisania całości –
+    duplikaty (symbol, report_date) wygrywa wtedy nowsza wersja.
+    """
+    df = _normalize(df).sort_values(by="Symbol", kind="stable")
+    if df.empty:
+        return
+    with _lock:
+        _migrate_locked()
+        current = table.read()
+        meta = current.meta if current is not None else {}
+        last = meta.get("last_report_date")
+        newer = last is None or df["report_date"].min().strftime(REPORT_DATE_FORMAT) > last
+        if current is not None and newer and list(df.columns) == current.names:
+            table.append(df, _meta(df, meta.get("reports", 0) + int(df["report_date"].nunique())))
+        else:
+            frames = [current.to_frame()] if current is not None and current.rows else []
+            _write_merged(frames + [df])
+    print(f"✅ Dopisano {len(df)} wierszy -> {HISTORY_DIR}")
+
+
+# ============================================================
+# Odczyt
+# ============================================================
+def snapshot() -> Optional[Snapshot]:
+    """Zatwierdzony stan historii (memmap) albo None, gdy historii jeszcze nie ma."""
+    # Blokada (i jej plik) tylko przy imporcie CSV – sam odczyt nie tworzy nic na dysku
+    if not _migration_checked and _needs_migration():
+        with _lock:
+            _migrate_locked()
+    return table.read()
+
+
+def version() -> Optional[Tuple[int, int]]:
+    """Wersja danych historii (generacja, wiersze) – do kluczy cache."""
+    return table.version()
+
+
+def latest_report() -> pd.DataFrame:
+    """Ostatni raport: wiersze z najnowszym report_date, report_date jako tekst."""
+    snap = snapshot()
+    if snap is None or not snap.rows:
+        raise FileNotFoundError("Brak raportów w historii (data/history)")
+    dates = snap.arrays["report_date"]
+    start = int(dates.searchsorted(dates[-1], side="left"))
+    df = snap.to_frame(start, columns=[c for c in snap.names if c != "report_date"] + ["report_date"])
+    df["report_date"] = df["report_date"].dt.strftime(REPORT_DATE_FORMAT)
+    return df
+
+
+def export_csv(path: str = LEGACY_HISTORY_FILE) -> Optional[str]:
+    """Eksport całej historii do CSV (report_date w formacie raportów)."""
+    snap = snapshot()
+    if snap is None:
+        return None
+    df = snap.to_frame()
+    df["report_date"] = df["report_date"].dt.strftime(REPORT_DATE_FORMAT)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    print(f"✅ Wyeksportowano {len(df)} wierszy -> {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Historia raportów: import CSV i eksport.")
+    parser.add_argument("--export", metavar="PLIK", help="zapisz całą historię do CSV")
+    parser.add_argument("--import-csv", action="store_true", help="dołóż raporty z data/reports i all_reports.csv")
+    args = parser.parse_args()
+    if args.import_csv:
+        rebuild()
+    if args.export:
+        export_csv(args.export)
@@ -10,9 +10,13 @@ from zoneinfo import ZoneInfo
 from datetime import datetime
 import os
 
-from services.analytics import generate_report, save_report_csv, merge_all_reports
-from services.charts import generate_chart
-from services.discord_notify import send_discord_message, send_discord_file
+from app.services.analytics import generate_report, save_report
+from app.services.charts import generate_chart
+from app.services.discord_notify import send_discord_message, send_discord_file
+from app.services.binance_client import PRIORITY_SCHEDULER, request_priority
+from app.services.singleflight import report_flights
+from app.services.universe import UNIVERSE_REFRESH_MINUTES, get_universe
+from app.services.metrics import stage
 
 scheduler: AsyncIOScheduler | None = None
 
@@ -29,19 +33,24 @@ def _generate_top3_chart(df):
     try:
         top3 = df.sort_values(by="24h%", ascending=False).head(3)
         symbols = top3["Symbol"].tolist()
-        chart_path = generate_chart(symbols, column="24h%")
+        with stage("chart_render"):
+            chart_path = generate_chart(symbols, column="24h%")
         return chart_path
     except Exception as e:
         print(f"⚠️ Nie udało się utworzyć wykresu: {e}")
         return None
 
 
+@stage("scheduled_report")
 def _job_daily_report(symbols: list[str], label: str):
     """Główna funkcja wykonywana o 6:00 i 16:00."""
     try:
-        df = generate_report(symbols)
-        save_report_csv(df)
-        merge_all_reports()
+        # Raport z harmonogramu ma pierwszeństwo w budżecie wagi Binance
+        with request_priority(PRIORITY_SCHEDULER):
+            df = generate_report(symbols)
+        # /predict tuż po harmonogramie skorzysta z tego raportu
+        report_flights.store(("generate", tuple(symbols)), df)
+        save_report(df)
 
         chart_path = _generate_top3_chart(df)
 
@@ -64,6 +73,15 @@ def _job_daily_report(symbols: list[str], label: str):
         print(f"❌ Błąd podczas generowania raportu ({label}): {e}")
 
 
+@stage("universe_refresh")
+def _job_universe_refresh():
+    try:
+        with request_priority(PRIORITY_SCHEDULER):
+            get_universe().refresh()
+    except Exception as e:
+        print(f"❌ Błąd odświeżania uniwersum: {e}")
+
+
 def start_scheduler(symbols: list[str]):
     """Uruchamia dwa harmonogramy dziennie (06:00 i 16:00)."""
     global scheduler
@@ -87,6 +105,16 @@ def start_scheduler(symbols: list[str]):
         args=[symbols, "Popołudniowy"],
     )
 
+    # Uniwersum par USDT: ticker + kolejna porcja metryk głębokich
+    if UNIVERSE_REFRESH_MINUTES > 0:
+        scheduler.add_job(
+            _job_universe_refresh,
+            "interval",
+            minutes=UNIVERSE_REFRESH_MINUTES,
+            max_instances=1,
+            coalesce=True,
+        )
+
     scheduler.start()
     print("🕘 Harmonogram uruchomiony: raporty o 06:00 i 16:00 Europe/Warsaw")
     return scheduler
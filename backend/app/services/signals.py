@@ -0,0 +1,243 @@
+"""Deklaratywny silnik reguł sygnałów.
+
+Reguła to nazwa i wyrażenie nad kolumnami raportu, np.
+`abs(change_24h) >= change_24h_threshold`. Wyrażenie parsujemy raz
+(`ast`, tylko bezpieczny podzbiór: porównania, and/or/not, + - * /,
+`abs`) i kompilujemy do funkcji na tablicach NumPy.
+
+Nazwy kolumn raportu są tablicami (1 × S), a każda inna nazwa to
+parametr reguły – tablica (P × 1) z wartościami z P profili progów.
+Broadcasting daje maskę (P × S) w jednym przebiegu, więc koszt /signals
+rośnie z liczbą reguł, a nie z liczbą symboli razy liczbą profili.
+"""
+
+import ast
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Nazwa w wyrażeniach / w API -> kolumna w raporcie CSV
+REPORT_FIELDS = {
+    "close": "Close",
+    "change_24h": "24h%",
+    "change_3d": "3D%",
+    "change_7d": "7D%",
+    "atr_3d": "ATR(3D)%",
+    "atr_7d": "ATR(7D)%",
+}
+
+_COMPARE_OPS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+_BIN_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+}
+_FUNCTIONS = {"abs": np.abs}
+
+
+class SignalRule:
+    """Reguła sygnału: nazwa (trafia do `reasons`), wyrażenie i domyślne progi."""
+
+    def __init__(self, name: str, expr: str, defaults: Optional[Dict[str, float]] = None):
+        self.name = name
+        self.expr = expr
+        self.defaults = dict(defaults or {})
+        self.fn, self.params = compile_expr(expr)
+
+    def __repr__(self):
+        return f"SignalRule({self.name!r}, {self.expr!r})"
+
+    def __reduce__(self):
+        # Skompilowana funkcja to domknięcia – do innego procesu wysyłamy definicję
+        return SignalRule, (self.name, self.expr, self.defaults)
+
+
+# ============================================================
+# Kompilacja wyrażeń
+# ============================================================
+@lru_cache(maxsize=256)
+def compile_expr(expr: str):
+    """
+    Kompiluje wyrażenie do funkcji (columns, params) -> tablica.
+    Zwraca (fn, nazwy parametrów). Niedozwolona składnia -> ValueError.
+    """
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Błędna składnia reguły '{expr}': {e.msg}") from None
+
+    params = set()
+    fn = _compile_node(tree.body, params, expr)
+    return fn, frozenset(params)
+
+
+def _compile_node(node, params: set, expr: str) -> Callable:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        value = float(node.value)
+        return lambda cols, prm: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in REPORT_FIELDS:
+            return lambda cols, prm: cols[name]
+        params.add(name)
+        return lambda cols, prm: prm[name]
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(v, params, expr) for v in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+        def bool_op(cols, prm):
+            result = parts[0](cols, prm)
+            for part in parts[1:]:
+                result = combine(result, part(cols, prm))
+            return result
+        return bool_op
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand, params, expr)
+        if isinstance(node.op, ast.Not):
+            return lambda cols, prm: np.logical_not(operand(cols, prm))
+        if isinstance(node.op, ast.USub):
+            return lambda cols, prm: np.negative(operand(cols, prm))
+        if isinstance(node.op, ast.UAdd):
+            return operand
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        op = _BIN_OPS[type(node.op)]
+        left = _compile_node(node.left, params, expr)
+        right = _compile_node(node.right, params, expr)
+        return lambda cols, prm: op(left(cols, prm), right(cols, prm))
+
+    if isinstance(node, ast.Compare) and all(type(o) in _COMPARE_OPS for o in node.ops):
+        operands = [_compile_node(n, params, expr) for n in [node.left, *node.comparators]]
+        ops = [_COMPARE_OPS[type(o)] for o in node.ops]
+
+        def compare(cols, prm):
+            values = [operand(cols, prm) for operand in operands]
+            result = ops[0](values[0], values[1])
+            for i in range(1, len(ops)):
+                result = np.logical_and(result, ops[i](values[i], values[i + 1]))
+            return result
+        return compare
+
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in _FUNCTIONS
+        and len(node.args) == 1
+        and not node.keywords
+    ):
+        func = _FUNCTIONS[node.func.id]
+        arg = _compile_node(node.args[0], params, expr)
+        return lambda cols, prm: func(arg(cols, prm))
+
+    raise ValueError(f"Niedozwolony element '{ast.unparse(node)}' w regule '{expr}'")
+
+
+# ============================================================
+# Reguły wbudowane (dotychczasowe progi /signals)
+# ============================================================
+BUILTIN_RULES = [
+    SignalRule("big_move_24h", "abs(change_24h) >= change_24h_threshold", {"change_24h_threshold": 8.0}),
+    SignalRule("high_atr_7d", "atr_7d >= atr_7d_threshold", {"atr_7d_threshold": 7.0}),
+]
+
+
+# ============================================================
+# Ewaluacja
+# ============================================================
+def report_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Kolumny raportu jako tablice float; brakująca kolumna to same NaN."""
+    n = len(df)
+    return {
+        field: (
+            pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+            if col in df.columns
+            else np.full(n, np.nan)
+        )
+        for field, col in REPORT_FIELDS.items()
+    }
+
+
+def evaluate_rules(
+    df: pd.DataFrame,
+    profiles: Sequence[Dict[str, float]],
+    rules: Sequence[SignalRule] = BUILTIN_RULES,
+) -> np.ndarray:
+    """
+    Liczy maski wszystkich reguł dla wszystkich profili naraz.
+    Zwraca tablicę bool (profile × reguły × symbole).
+    """
+    return evaluate_columns(report_columns(df), profiles, rules)
+
+
+def evaluate_columns(
+    columns: Dict[str, np.ndarray],
+    profiles: Sequence[Dict[str, float]],
+    rules: Sequence[SignalRule] = BUILTIN_RULES,
+) -> np.ndarray:
+    """
+    Jak `evaluate_rules`, ale na gotowych kolumnach (nazwa z REPORT_FIELDS ->
+    tablica 1-D). Backtest podaje tu spłaszczone serie (czas × symbol).
+    Zwraca tablicę bool (profile × reguły × N).
+    """
+    n = len(next(iter(columns.values())))
+    columns = {name: np.asarray(values)[np.newaxis, :] for name, values in columns.items()}
+    masks = np.zeros((len(profiles), len(rules), n), dtype=bool)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for r, rule in enumerate(rules):
+            params = {}
+            for name in rule.params:
+                values = [p.get(name, rule.defaults.get(name)) for p in profiles]
+                if any(v is None for v in values):
+                    raise ValueError(f"Reguła '{rule.name}' wymaga parametru '{name}'")
+                params[name] = np.asarray(values, dtype=float)[:, np.newaxis]
+            masks[:, r, :] = np.broadcast_to(rule.fn(columns, params), (len(profiles), n))
+
+    return masks
+
+
+def signals_for_profiles(
+    df: pd.DataFrame,
+    profiles: Sequence[Dict[str, float]],
+    rules: Sequence[SignalRule] = BUILTIN_RULES,
+) -> List[List[Dict]]:
+    """Lista sygnałów (w formacie /signals) dla każdego profilu progów."""
+    masks = evaluate_rules(df, profiles, rules)
+    hits = masks.any(axis=1)
+
+    symbols = df["Symbol"].tolist() if "Symbol" in df.columns else [None] * len(df)
+    fields = {
+        field: df[col].tolist() if col in df.columns else [None] * len(df)
+        for field, col in REPORT_FIELDS.items()
+    }
+
+    results = []
+    for p in range(len(profiles)):
+        signals = []
+        for j in np.flatnonzero(hits[p]):
+            signals.append(
+                {
+                    "symbol": symbols[j],
+                    "reasons": [rule.name for r, rule in enumerate(rules) if masks[p, r, j]],
+                    "change_24h": fields["change_24h"][j],
+                    "change_3d": fields["change_3d"][j],
+                    "change_7d": fields["change_7d"][j],
+                    "atr_3d": fields["atr_3d"][j],
+                    "atr_7d": fields["atr_7d"][j],
+                }
+            )
+        results.append(signals)
+    return results
@@ -0,0 +1,74 @@
+"""Współdzielenie obliczeń między równoległymi zapytaniami (single-flight).
+
+`/report` i `/predict` za każdym razem liczyły raport od zera – dziesięć
+równoległych wywołań oznaczało dziesięć pełnych pobrań z Binance i dziesięć
+zapisów CSV. `SingleFlight` trzyma dla każdego klucza (np. zestawu symboli):
+- obliczenie w toku – kolejni wołający czekają na ten sam wynik,
+- ostatni wynik z czasem powstania – w oknie świeżości oddajemy go od razu.
+
+Obliczenia idą w ograniczonej puli wątków, więc pętla zdarzeń FastAPI
+nie blokuje się na pobieraniu danych, a liczba równoległych raportów ma limit.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+REPORT_FRESH_SECONDS = float(os.getenv("REPORT_FRESH_SECONDS", "30"))
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix="report")
+
+
+class SingleFlight:
+    """Jedno obliczenie na klucz naraz + krótko żyjący cache wyników."""
+
+    def __init__(self, fresh_seconds: float = REPORT_FRESH_SECONDS):
+        self.fresh_seconds = fresh_seconds
+        self._lock = threading.Lock()
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    def get_fresh(self, key: Hashable, max_age: Optional[float] = None) -> Optional[Any]:
+        """Ostatni wynik dla klucza, jeśli jest młodszy niż okno świeżości."""
+        max_age = self.fresh_seconds if max_age is None else max_age
+        with self._lock:
+            entry = self._results.get(key)
+        if entry is None or time.monotonic() - entry[0] > max_age:
+            return None
+        return entry[1]
+
+    def store(self, key: Hashable, value: Any) -> None:
+        """Zapamiętuje wynik policzony poza `run` (np. przez harmonogram)."""
+        with self._lock:
+            self._results[key] = (time.monotonic(), value)
+
+    async def run(self, key: Hashable, fn: Callable, *args) -> Any:
+        """
+        Zwraca świeży wynik, dołącza do obliczenia w toku albo uruchamia
+        nowe w puli wątków. Wyjątek trafia do wszystkich czekających.
+        """
+        fresh = self.get_fresh(key)
+        if fresh is not None:
+            return fresh
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+            self._in_flight[key] = future
+
+            def _done(f: asyncio.Future) -> None:
+                self._in_flight.pop(key, None)
+                if not f.cancelled() and f.exception() is None:
+                    self.store(key, f.result())
+
+            future.add_done_callback(_done)
+        # shield: rozłączony klient nie anuluje obliczenia pozostałym
+        return await asyncio.shield(future)
+
+
+# Wspólna instancja dla raportów (API + harmonogram)
+report_flights = SingleFlight()
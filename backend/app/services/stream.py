@@ -0,0 +1,274 @@
+"""Ciągłe pobieranie świec z WebSocketu Binance.
+
+Raporty z harmonogramu (06:00 i 16:00) potrafią spóźnić się z alertem
+o kilkanaście godzin. Ten moduł subskrybuje strumień `<symbol>@kline_<interwał>`
+dla wszystkich śledzonych symboli i przy każdej zamkniętej świecy:
+- dopisuje ją na koniec pliku w lokalnym magazynie świec (`kline_store`),
+- aktualizuje stan wskaźników w O(1) (`indicators.IndicatorBank`),
+- sprawdza wbudowane reguły sygnałów i zgłasza nowe sygnały.
+
+Po każdym (ponownym) połączeniu uzupełniamy lukę przez REST –
+`analytics.fetch_historical_data` dociąga tylko brakujące świece
+w interwale strumienia.
+
+Tryb odtwarzania (`replay`) czyta zapisane wcześniej wiadomości z pliku
+JSONL (`record_path` przy normalnej pracy), więc całość da się sprawdzić
+offline, także na lokalnym serwerze zamiast giełdy (`BINANCE_WS_URL`).
+
+Uruchomienie samodzielne z katalogu `backend/`:
+
+    python -m app.services.stream --symbols BTC,ETH
+    python -m app.services.stream --replay nagranie.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+import websockets
+
+from app.services import kline_store, signals, timeframes
+from app.services.indicators import IndicatorBank
+
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443")
+
+# Co ile zamkniętych świec zapisujemy stan wskaźników na dysk
+STATE_SAVE_EVERY = 50
+
+RECONNECT_MIN_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+
+def parse_kline_message(raw) -> Optional[tuple]:
+    """
+    Wyciąga świecę z wiadomości strumienia (pojedynczego lub złożonego).
+    Zwraca (para, interwał, tablica KLINE_DTYPE z jedną świecą, czy_zamknięta)
+    albo None dla wiadomości innych niż kline.
+    """
+    msg = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+    data = msg.get("data", msg)
+    if data.get("e") != "kline":
+        return None
+    k = data["k"]
+    candle = kline_store.klines_to_array([[k["t"], k["o"], k["h"], k["l"], k["c"], k["v"]]])
+    return data["s"], k["i"], candle, bool(k["x"])
+
+
+def _default_on_signal(symbol: str, reasons: List[str], row: Dict) -> None:
+    from app.services.broadcast import broadcaster
+    from app.services.discord_notify import send_discord_message
+
+    broadcaster.publish_live_signal(symbol, reasons, row)
+    send_discord_message(
+        f"🚨 **Sygnał {symbol}**: {', '.join(reasons)}\n"
+        f"24h: {row['24h%']}% | ATR(7D): {row['ATR(7D)%']}% | cena: {row['Close']}"
+    )
+
+
+class KlineStream:
+    """Długo działająca usługa: WebSocket -> magazyn świec -> wskaźniki -> sygnały."""
+
+    def __init__(
+        self,
+        symbols: List[str],
+        interval: str = "1h",
+        on_signal: Callable[[str, List[str], Dict], None] = _default_on_signal,
+        record_path: Optional[str] = None,
+        backfill: bool = True,
+    ):
+        self.symbols = [s.upper() for s in symbols]
+        self.interval = interval
+        self.on_signal = on_signal
+        self.record_path = record_path
+        self.backfill = backfill
+
+        self.bank = IndicatorBank.load(interval)
+        self.active: Dict[str, set] = {}
+        self.closed_candles = 0
+        self.connected = False
+        self.last_message_at: Optional[float] = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------
+    # Przetwarzanie świec
+    # ------------------------------------------------------------
+    @staticmethod
+    def _base_symbol(pair: str) -> str:
+        return pair[:-4] if pair.endswith("USDT") else pair
+
+    def handle_message(self, raw) -> None:
+        """Przetwarza jedną wiadomość strumienia (także z odtwarzania)."""
+        self.apply(parse_kline_message(raw))
+
+    def apply(self, parsed: Optional[tuple]) -> None:
+        if parsed is None:
+            return
+        pair, interval, candle, closed = parsed
+        if interval != self.interval:
+            return
+
+        self.last_message_at = time.time()
+        sym = self._base_symbol(pair)
+        c = candle[0]
+        self.bank.update(sym, int(c["open_time"]), float(c["high"]), float(c["low"]), float(c["close"]))
+
+        if closed:
+            self._on_closed_candle(pair, sym, candle)
+
+    def _on_closed_candle(self, pair: str, sym: str, candle) -> None:
+        # Na dysku trzymamy tylko serię bazową; inną (np. 1h przy bazie 15m) dociągnie REST
+        if self.interval == timeframes.BASE_INTERVAL:
+            with kline_store.symbol_lock(pair, self.interval):
+                kline_store.append_klines(pair, self.interval, candle)
+
+        self.closed_candles += 1
+        if self.closed_candles % STATE_SAVE_EVERY == 0:
+            self.bank.save()
+
+        row = self.bank.row(sym)
+        if row is None:
+            return
+        fired = signals.signals_for_profiles(pd.DataFrame([row]), [{}])[0]
+        reasons = set(fired[0]["reasons"]) if fired else set()
+        new = sorted(reasons - self.active.get(sym, set()))
+        self.active[sym] = reasons
+        if new:
+            try:
+                self.on_signal(sym, new, row)
+            except Exception as e:
+                print(f"⚠️ Błąd obsługi sygnału {sym}: {e}")
+
+    def rows(self) -> List[Dict]:
+        """Aktualne wiersze raportu liczone ze stanu wskaźników."""
+        return self.bank.rows(self.symbols)
+
+    # ------------------------------------------------------------
+    # Uzupełnianie luk przez REST
+    # ------------------------------------------------------------
+    def backfill_gaps(self) -> None:
+        from app.services.analytics import fetch_historical_data
+        from app.services.binance_client import PRIORITY_SCHEDULER, request_priority
+
+        with request_priority(PRIORITY_SCHEDULER):
+            frames, errors = fetch_historical_data(self.symbols, interval=self.interval)
+        for sym, df in frames.items():
+            self.bank.sync_frame(sym, df)
+        for sym, e in errors.items():
+            print(f"⚠️ Nie udało się uzupełnić luki dla {sym}: {e}")
+        self.bank.save()
+
+    # ------------------------------------------------------------
+    # Praca na żywo
+    # ------------------------------------------------------------
+    def stream_url(self) -> str:
+        streams = "/".join(f"{s.lower()}usdt@kline_{self.interval}" for s in self.symbols)
+        return f"{BINANCE_WS_URL}/stream?streams={streams}"
+
+    async def run(self) -> None:
+        """Łączy się, przetwarza wiadomości i wznawia połączenie z backoffem."""
+        delay = RECONNECT_MIN_DELAY
+        record = open(self.record_path, "a") if self.record_path else None
+        try:
+            while not self._stopping:
+                try:
+                    if self.backfill:
+                        await asyncio.to_thread(self.backfill_gaps)
+                    async with websockets.connect(self.stream_url(), ping_interval=20) as ws:
+                        self.connected = True
+                        delay = RECONNECT_MIN_DELAY
+                        print(f"📡 Strumień świec połączony ({len(self.symbols)} symboli).")
+                        async for raw in ws:
+                            if record:
+                                record.write(raw if isinstance(raw, str) else raw.decode())
+                                record.write("\n")
+                            parsed = parse_kline_message(raw)
+                            if parsed is not None and parsed[3]:
+                                # Zamknięta świeca oznacza zapis na dysk – poza pętlą zdarzeń
+                                await asyncio.to_thread(self.apply, parsed)
+                            else:
+                                self.apply(parsed)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"⚠️ Strumień świec przerwany: {e} – ponowne połączenie za {delay:.0f}s")
+                finally:
+                    self.connected = False
+
+                if self._stopping:
+                    break
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        finally:
+            if record:
+                record.close()
+            self.bank.save()
+
+    def start(self) -> asyncio.Task:
+        """Uruchamia `run` jako zadanie w bieżącej pętli zdarzeń."""
+        self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+
+    # ------------------------------------------------------------
+    # Odtwarzanie z pliku
+    # ------------------------------------------------------------
+    def replay(self, path: str) -> int:
+        """Przepuszcza nagrane wiadomości przez tę samą ścieżkę co na żywo."""
+        count = 0
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    self.handle_message(line)
+                    count += 1
+        self.bank.save()
+        return count
+
+    def status(self) -> Dict:
+        return {
+            "connected": self.connected,
+            "symbols": len(self.symbols),
+            "closed_candles": self.closed_candles,
+            "last_message_at": self.last_message_at,
+            "active_signals": {s: sorted(r) for s, r in self.active.items() if r},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Strumień świec Binance")
+    parser.add_argument("--symbols", default="BTC,ETH,SOL,BNB,TAO,DASH,HEMI,PYTH")
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--replay", help="plik JSONL z nagranymi wiadomościami")
+    parser.add_argument("--record", help="dopisuj surowe wiadomości do pliku JSONL")
+    args = parser.parse_args()
+
+    stream = KlineStream(
+        args.symbols.split(","),
+        interval=args.interval,
+        record_path=args.record,
+        backfill=not args.replay,
+    )
+    if args.replay:
+        count = stream.replay(args.replay)
+        print(f"✅ Odtworzono {count} wiadomości.")
+        for row in stream.rows():
+            print(row)
+        return
+
+    try:
+        asyncio.run(stream.run())
+    except KeyboardInterrupt:
+        stream.stop()
+
+
+if __name__ == "__main__":
+    main()
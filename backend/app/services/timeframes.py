@@ -0,0 +1,140 @@
+"""Wiele interwałów z jednej serii bazowej.
+
+Z giełdy pobieramy i trzymamy w `kline_store` tylko jedną, najdrobniejszą
+serię na symbol (`BASE_INTERVAL`, domyślnie 1h). Grubsze interwały
+(2h, 4h, 1d, ...) powstają z niej przez agregację OHLCV:
+open pierwszej świecy, max high, min low, close ostatniej, suma wolumenu.
+Kubełki są wyrównane do epoki UTC jak świece Binance, więc np. 4×15m
+daje dokładnie natywną świecę 1h. Niepełny pierwszy kubełek (seria
+zaczyna się w środku) jest odrzucany; ostatni może być niepełny – to
+bieżąca, otwarta świeca, jak w danych z giełdy.
+
+Wynik jest trzymany w pamięci per (para, interwał). Seria bazowa rośnie
+tylko na końcu, więc po dociągnięciu świec przeliczamy jedynie ostatni
+kubełek i nowe – reszta zostaje z cache.
+
+Obsługujemy interwały, które dzielą dobę (okna raportu 24h/3D/7D muszą
+być całą liczbą świec) i są wielokrotnością interwału bazowego. Drobniejsze
+widoki (np. 15m) wymagają `BASE_INTERVAL=15m` – kosztem 4× większej
+historii do pobrania za pierwszym razem.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+
+from app.services import kline_store
+
+BASE_INTERVAL = os.getenv("BASE_INTERVAL", "1h")
+# Interwał raportu z harmonogramu i /report bez parametru (historia CSV jest w 1h)
+REPORT_INTERVAL = "1h"
+RESAMPLE_CACHE_SIZE = int(os.getenv("RESAMPLE_CACHE_SIZE", "512"))
+
+# Interwały Binance dzielące dobę (bez importu python-binance)
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "2h": 7_200_000,
+    "4h": 14_400_000,
+    "6h": 21_600_000,
+    "8h": 28_800_000,
+    "12h": 43_200_000,
+    "1d": 86_400_000,
+}
+
+_cache: "OrderedDict[Tuple[str, str], Tuple[int, np.ndarray]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def interval_ms(interval: str) -> int:
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"Nieobsługiwany interwał '{interval}' (dostępne: {', '.join(supported_intervals())})")
+
+
+def supported_intervals() -> list[str]:
+    """Interwały, które da się wyprowadzić z serii bazowej."""
+    base = INTERVAL_MS[BASE_INTERVAL]
+    return [name for name, ms in INTERVAL_MS.items() if ms % base == 0]
+
+
+def check_interval(interval: str) -> str:
+    """Zwraca interwał albo rzuca ValueError, jeśli nie wynika z serii bazowej."""
+    step = interval_ms(interval)
+    if step % INTERVAL_MS[BASE_INTERVAL]:
+        raise ValueError(
+            f"Interwał '{interval}' jest drobniejszy niż bazowy '{BASE_INTERVAL}' albo nie jest jego "
+            f"wielokrotnością (dostępne: {', '.join(supported_intervals())}; zmień BASE_INTERVAL)"
+        )
+    return interval
+
+
+def resample(base: np.ndarray, interval: str, drop_partial_head: bool = True) -> np.ndarray:
+    """Agreguje świece KLINE_DTYPE do grubszego interwału (kubełki od epoki UTC)."""
+    step = interval_ms(interval)
+    if not len(base):
+        return np.empty(0, dtype=kline_store.KLINE_DTYPE)
+
+    buckets = base["open_time"] - base["open_time"] % step
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    ends = np.concatenate([starts[1:], [len(base)]])
+
+    out = np.empty(len(starts), dtype=kline_store.KLINE_DTYPE)
+    out["open_time"] = buckets[starts]
+    out["open"] = base["open"][starts]
+    out["high"] = np.maximum.reduceat(base["high"], starts)
+    out["low"] = np.minimum.reduceat(base["low"], starts)
+    out["close"] = base["close"][ends - 1]
+    out["volume"] = np.add.reduceat(base["volume"], starts)
+
+    if drop_partial_head and base["open_time"][0] != buckets[0]:
+        out = out[1:]
+    return out
+
+
+def _resample_cached(pair: str, interval: str, base: np.ndarray) -> np.ndarray:
+    key = (pair, interval)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+
+    if cached is not None and len(base):
+        first_open, out = cached
+        if first_open == int(base["open_time"][0]) and len(out):
+            # Baza urosła na końcu: przeliczamy od ostatniego (być może niepełnego) kubełka
+            tail_from = int(np.searchsorted(base["open_time"], out["open_time"][-1]))
+            tail = resample(base[tail_from:], interval, drop_partial_head=False)
+            result = np.concatenate([out[:-1], tail])
+        else:
+            result = resample(base, interval)
+    else:
+        result = resample(base, interval)
+
+    if len(base):
+        with _cache_lock:
+            _cache[key] = (int(base["open_time"][0]), result)
+            _cache.move_to_end(key)
+            while len(_cache) > RESAMPLE_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return result
+
+
+def view(pair: str, interval: str, base: np.ndarray) -> np.ndarray:
+    """Świece `interval` z podanej serii bazowej (ta sama tablica, gdy interwał = bazowy)."""
+    if check_interval(interval) == BASE_INTERVAL:
+        return base
+    return _resample_cached(pair, interval, base)
+
+
+def load_klines(pair: str, interval: str) -> np.ndarray:
+    """Jak `kline_store.load_klines`, ale dowolny obsługiwany interwał z serii bazowej."""
+    return view(pair, interval, kline_store.load_klines(pair, BASE_INTERVAL))
@@ -0,0 +1,277 @@
+"""Raport dla całego uniwersum par USDT.
+
+Pobieranie 30 dni świec dla każdego z ~400 symboli przy każdym raporcie
+nie mieści się w limitach wagi Binance. Dlatego raport uniwersum składamy
+z dwóch warstw:
+
+- **tanie pola** (cena, zmiana 24h, wolumen) – jedno zapytanie
+  `GET /api/v3/ticker/24hr` bez symbolu (waga 80) dla wszystkich par,
+- **głębokie metryki** (3D%, 7D%, ATR) – ze świec, odświeżane porcjami.
+  W każdym przebiegu bierzemy `UNIVERSE_DEEP_PER_RUN` symboli o najwyższym
+  priorytecie: najpierw te bez metryk, potem najstarsze, z wagą za duży
+  ruch 24h i wolumen. Świece idą przez `analytics.fetch_historical_data`,
+  więc po pierwszym razie to jedno małe zapytanie na symbol.
+
+Listę par (status TRADING, quote USDT) bierzemy z `exchangeInfo` i
+odświeżamy co `UNIVERSE_TTL_SECONDS`. Stan (lista par + metryki głębokie)
+leży w `data/universe.json`, więc restart nie zaczyna od zera. Przy
+kilku workerach odświeża go lider harmonogramu, a pozostałe wczytują
+plik ponownie, gdy zmieni się jego mtime.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from app.services import report_engine
+from app.services.binance_client import gateway
+
+STATE_PATH = Path("data/universe.json")
+
+UNIVERSE_TTL_SECONDS = float(os.getenv("UNIVERSE_TTL_SECONDS", str(6 * 3600)))
+UNIVERSE_DEEP_PER_RUN = int(os.getenv("UNIVERSE_DEEP_PER_RUN", "100"))
+UNIVERSE_REFRESH_MINUTES = float(os.getenv("UNIVERSE_REFRESH_MINUTES", "15"))
+TICKER_TTL_SECONDS = float(os.getenv("UNIVERSE_TICKER_TTL_SECONDS", "60"))
+
+QUOTE_ASSET = "USDT"
+
+# Wagi zapytań REST (dokumentacja Binance Spot API)
+WEIGHT_EXCHANGE_INFO = 20
+WEIGHT_TICKER_ALL = 80
+WEIGHT_KLINES = 2
+
+DEEP_COLUMNS = ["3D%", "7D%", "ATR(3D)%", "ATR(7D)%"]
+
+
+class Universe:
+    """Lista par, ostatni ticker 24h i metryki głębokie – wspólne dla API i harmonogramu."""
+
+    def __init__(self, path: Path = STATE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.symbols: List[str] = []
+        self.symbols_at = 0.0
+        self.deep: Dict[str, Dict] = {}
+        self.tickers: Dict[str, Dict] = {}
+        self.tickers_at = 0.0
+        self.weight_used = 0
+        self._mtime_ns: Optional[int] = None
+        self._load()
+
+    # ------------------------------------------------------------
+    # Stan na dysku
+    # ------------------------------------------------------------
+    def _state_mtime(self) -> Optional[int]:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self) -> None:
+        mtime = self._state_mtime()
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self.symbols = state.get("symbols", [])
+            self.symbols_at = state.get("symbols_at", 0.0)
+            self.deep = state.get("deep", {})
+            self._mtime_ns = mtime
+
+    def reload_if_changed(self) -> None:
+        """Wczytuje stan zapisany przez inny proces (np. lidera harmonogramu)."""
+        mtime = self._state_mtime()
+        if mtime is not None and mtime != self._mtime_ns:
+            self._load()
+
+    def save(self) -> None:
+        with self._lock:
+            state = {"symbols": self.symbols, "symbols_at": self.symbols_at, "deep": self.deep}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(state, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._mtime_ns = self._state_mtime()
+
+    # ------------------------------------------------------------
+    # Tanie dane: lista par i ticker 24h
+    # ------------------------------------------------------------
+    def refresh_symbols(self, force: bool = False) -> List[str]:
+        """Aktualna lista par USDT (z cache, jeśli młodsza niż TTL)."""
+        if not force and self.symbols and time.time() - self.symbols_at < UNIVERSE_TTL_SECONDS:
+            return self.symbols
+
+        info = gateway.get_exchange_info()
+        symbols = sorted(
+            s["baseAsset"]
+            for s in info["symbols"]
+            if s.get("quoteAsset") == QUOTE_ASSET
+            and s.get("status") == "TRADING"
+            and s.get("isSpotTradingAllowed", True)
+        )
+        with self._lock:
+            self.weight_used += WEIGHT_EXCHANGE_INFO
+            self.symbols = symbols
+            self.symbols_at = time.time()
+            # Metryki par wycofanych z obrotu nie są już potrzebne
+            listed = set(symbols)
+            self.deep = {s: v for s, v in self.deep.items() if s in listed}
+        print(f"🌐 Uniwersum: {len(symbols)} par {QUOTE_ASSET}.")
+        return symbols
+
+    def refresh_tickers(self, force: bool = False) -> Dict[str, Dict]:
+        """Ticker 24h wszystkich par jednym zapytaniem."""
+        if not force and self.tickers and time.time() - self.tickers_at < TICKER_TTL_SECONDS:
+            return self.tickers
+
+        symbols = set(self.refresh_symbols())
+        tickers = {}
+        for t in gateway.get_ticker():
+            pair = t["symbol"]
+            if not pair.endswith(QUOTE_ASSET):
+                continue
+            sym = pair[: -len(QUOTE_ASSET)]
+            if sym in symbols:
+                tickers[sym] = {
+                    "close": float(t["lastPrice"]),
+                    "change_24h": float(t["priceChangePercent"]),
+                    "quote_volume": float(t.get("quoteVolume", 0.0)),
+                }
+        with self._lock:
+            self.weight_used += WEIGHT_TICKER_ALL
+            self.tickers = tickers
+            self.tickers_at = time.time()
+        return tickers
+
+    # ------------------------------------------------------------
+    # Głębokie metryki: porcjami, wg priorytetu
+    # ------------------------------------------------------------
+    def priority(self, sym: str, now: float) -> float:
+        """
+        Im wyższy, tym wcześniej odświeżamy. Brak metryk = nieskończoność;
+        poza tym wiek w godzinach × (1 + |24h%| / 10) × log10(wolumen).
+        """
+        entry = self.deep.get(sym)
+        if entry is None:
+            return math.inf
+        age_h = (now - entry["updated_at"]) / 3600
+        ticker = self.tickers.get(sym, {})
+        move = 1 + abs(ticker.get("change_24h", 0.0)) / 10
+        volume = math.log10(ticker.get("quote_volume", 0.0) + 10)
+        return age_h * move * volume
+
+    def due_symbols(self, limit: int = UNIVERSE_DEEP_PER_RUN) -> List[str]:
+        now = time.time()
+        symbols = self.refresh_symbols()
+        return sorted(symbols, key=lambda s: self.priority(s, now), reverse=True)[:limit]
+
+    def refresh_deep(self, symbols: List[str], max_workers: Optional[int] = None) -> Dict[str, str]:
+        """Liczy 3D/7D/ATR dla podanych symboli; zwraca błędy per symbol."""
+        from app.services.analytics import fetch_historical_data
+
+        frames, errors = fetch_historical_data(symbols, days=30, max_workers=max_workers)
+        rows, calc_errors = report_engine.compute_report_rows(frames)
+        errors = {**{s: str(e) for s, e in errors.items()}, **calc_errors}
+        now = time.time()
+        with self._lock:
+            self.weight_used += WEIGHT_KLINES * len(symbols)
+            for row in rows:
+                self.deep[row["Symbol"]] = {
+                    **{col: row[col] for col in DEEP_COLUMNS},
+                    "updated_at": now,
+                }
+            # Nieudana próba też się liczy – świeża para z krótką historią
+            # nie może blokować kolejki w każdym przebiegu
+            for sym, e in errors.items():
+                self.deep[sym] = {"updated_at": now, "error": e}
+        return errors
+
+    def refresh(self, deep_limit: int = UNIVERSE_DEEP_PER_RUN) -> Dict:
+        """Jeden przebieg harmonogramu: ticker + kolejna porcja metryk głębokich."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return {"skipped": True}
+        try:
+            self.reload_if_changed()
+            started = time.perf_counter()
+            weight_before = self.weight_used
+            self.refresh_tickers(force=True)
+            due = self.due_symbols(deep_limit)
+            errors = self.refresh_deep(due) if due else {}
+            self.save()
+            result = {
+                "symbols": len(self.symbols),
+                "deep_refreshed": len(due) - len(errors),
+                "deep_errors": len(errors),
+                "deep_coverage": self.deep_coverage(),
+                "weight": self.weight_used - weight_before,
+                "seconds": round(time.perf_counter() - started, 2),
+            }
+            print(
+                f"🌐 Uniwersum odświeżone: {result['deep_refreshed']} symboli głęboko, "
+                f"pokrycie {result['deep_coverage']}/{result['symbols']}, waga ≈{result['weight']}"
+            )
+            return result
+        finally:
+            self._refresh_lock.release()
+
+    # ------------------------------------------------------------
+    # Raport
+    # ------------------------------------------------------------
+    def report_df(self) -> pd.DataFrame:
+        """
+        Raport w kolumnach jak generate_report + `QuoteVolume` i `DeepAge(h)`.
+        Symbole bez metryk głębokich mają tam NaN.
+        """
+        self.reload_if_changed()
+        tickers = self.refresh_tickers()
+        now = time.time()
+        rows = []
+        with self._lock:
+            for sym, t in tickers.items():
+                deep = self.deep.get(sym)
+                rows.append({
+                    "Symbol": sym,
+                    "Close": t["close"],
+                    "24h%": t["change_24h"],
+                    **{col: (deep.get(col, math.nan) if deep else math.nan) for col in DEEP_COLUMNS},
+                    "QuoteVolume": t["quote_volume"],
+                    "DeepAge(h)": round((now - deep["updated_at"]) / 3600, 2) if deep else math.nan,
+                })
+        columns = ["Symbol", "Close", "24h%", *DEEP_COLUMNS, "QuoteVolume", "DeepAge(h)"]
+        df = pd.DataFrame(rows, columns=columns)
+        return df.sort_values(by="24h%", ascending=False, ignore_index=True)
+
+    def deep_coverage(self) -> int:
+        return sum(1 for entry in self.deep.values() if "error" not in entry)
+
+    def status(self) -> Dict:
+        self.reload_if_changed()
+        with self._lock:
+            return {
+                "symbols": len(self.symbols),
+                "symbols_age_s": round(time.time() - self.symbols_at, 1) if self.symbols_at else None,
+                "deep_coverage": self.deep_coverage(),
+                "tickers_age_s": round(time.time() - self.tickers_at, 1) if self.tickers_at else None,
+                "weight_used": self.weight_used,
+            }
+
+
+_universe: Optional[Universe] = None
+_universe_lock = threading.Lock()
+
+
+def get_universe() -> Universe:
+    """Wspólna instancja (tworzona przy pierwszym użyciu)."""
+    global _universe
+    with _universe_lock:
+        if _universe is None:
+            _universe = Universe()
+        return _universe
@@ -0,0 +1,111 @@
+"""Benchmark backtestu reguł sygnałów (`app.services.backtest`).
+
+Zapisuje do magazynu świec syntetyczną historię (losowy spacer, różne
+daty startu notowań), sprawdza, że cechy backtestu w wybranych punktach
+(na 1h i na interwałach wyprowadzonych z bazy) są równe wierszom
+`report_engine` liczonym na tych samych świecach,
+a potem mierzy przegląd siatki progów: jeden proces vs pula procesów.
+
+Uruchomienie z katalogu `backend/`:
+
+    python -m benchmarks.bench_backtest --symbols 300 --days 730 --grid 10x10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def write_history(kline_store, symbols, days, seed=11):
+    step = 3_600_000
+    count = days * 24
+    first_open = 1_600_000_000_000 - 1_600_000_000_000 % step
+    rng = np.random.default_rng(seed)
+    for j, sym in enumerate(symbols):
+        # część symboli „wchodzi na giełdę” później – NaN na początku siatki
+        start = 0 if j % 5 else int(rng.integers(0, count // 2))
+        n = count - start
+        closes = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.012, n)))
+        opens = np.concatenate([[closes[0]], closes[:-1]])
+        spread = np.abs(rng.normal(0, 0.006, n)) * closes
+        arr = np.empty(n, dtype=kline_store.KLINE_DTYPE)
+        arr["open_time"] = first_open + (start + np.arange(n)) * step
+        arr["open"] = opens
+        arr["high"] = np.maximum(opens, closes) + spread
+        arr["low"] = np.minimum(opens, closes) - spread
+        arr["close"] = closes
+        arr["volume"] = 1.0
+        kline_store.save_klines(f"{sym}USDT", "1h", arr)
+
+
+def check_parity(backtest, kline_store, report_engine, symbols, points, interval="1h"):
+    open_times, names, arrays = backtest.load_grid(symbols, interval)
+    features = backtest.compute_features(arrays["high"], arrays["low"], arrays["close"], interval)
+    step = backtest.timeframes.interval_ms(interval)
+    checked = 0
+    for t in points:
+        frames = {}
+        for sym in names:
+            arr = backtest.timeframes.load_klines(f"{sym}USDT", interval)
+            frames[sym] = kline_store.klines_to_df(arr[arr["open_time"] <= open_times[t]])
+        rows, _ = report_engine.compute_report_rows(frames, step)
+        for row in rows:
+            j = names.index(row["Symbol"])
+            for field, col in backtest.signals.REPORT_FIELDS.items():
+                assert abs(features[field][t, j] - row[col]) < 0.0101, (interval, row["Symbol"], t, col)
+            checked += 1
+    return checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--grid", default="10x10", help="liczba progów 24h x liczba progów ATR(7D)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_backtest_"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services import backtest, kline_store, report_engine
+
+    symbols = [f"S{i:03d}" for i in range(args.symbols)]
+    started = time.perf_counter()
+    write_history(kline_store, symbols, args.days)
+    print(f"historia: {args.symbols} symboli × {args.days * 24} świec ({time.perf_counter() - started:.1f}s)")
+
+    for interval, per_day in (("1h", 24), ("4h", 6), ("1d", 1)):
+        points = [400 // (24 // per_day), args.days * per_day - 1]
+        checked = check_parity(backtest, kline_store, report_engine, symbols[:20], points, interval)
+        print(f"✅ {interval}: cechy backtestu == report_engine ({checked} wierszy, tolerancja zaokrąglenia 0.01)")
+
+    n24, natr = (int(x) for x in args.grid.split("x"))
+    grid = {
+        "change_24h_threshold": list(np.linspace(3, 15, n24).round(2)),
+        "atr_7d_threshold": list(np.linspace(2, 10, natr).round(2)),
+    }
+
+    started = time.perf_counter()
+    serial = backtest.sweep(symbols, grid, max_workers=1)
+    serial_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    parallel = backtest.sweep(symbols, grid, max_workers=args.workers)
+    parallel_time = time.perf_counter() - started
+    assert serial.equals(parallel), "wyniki puli różnią się od jednego procesu"
+
+    profiles = len(serial) - 1
+    print(f"profili: {profiles}, punktów (świeca × symbol): {serial.loc[0, 'signals']}")
+    print(f"1 proces:          {serial_time:7.2f}s")
+    print(f"{args.workers:2d} procesów:       {parallel_time:7.2f}s")
+    best = serial.iloc[1:].sort_values("fwd_24_momentum", ascending=False).head(3)
+    print(best[["change_24h_threshold", "atr_7d_threshold", "signals", "fwd_24_mean", "fwd_24_momentum"]]
+          .round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
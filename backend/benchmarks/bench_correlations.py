@@ -0,0 +1,155 @@
+"""Benchmark /correlations: macierz korelacji i beta dla S symboli.
+
+Zapisuje syntetyczne świece 1h (30 dni, część symboli z krótszą historią
+i lukami) dla S symboli i porównuje:
+- naiwnie parami w pandas (`s_i.corr(s_j)` dla każdej pary) – czas
+  szacowany z próbki par, bo pełny przebieg przy 500 symbolach to minuty,
+- `DataFrame.corr()` (pętla w Cythonie, bez bety),
+- silnik `correlations` od zera (z wczytaniem świec z dysku),
+- przyrostowo: jedna nowa świeca dla wszystkich symboli,
+- odpowiedź z cache (ta sama wersja danych).
+
+Na koniec sprawdza, że macierz silnika zgadza się z `DataFrame.corr`.
+Uruchomienie z katalogu `backend/`:
+
+    python -m benchmarks.bench_correlations --symbols 50 300 500
+"""
+
+import argparse
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+HOUR_MS = 3_600_000
+CANDLES = 30 * 24
+NAIVE_SAMPLE_PAIRS = 2000
+
+
+def write_klines(kline_store, symbols: int, rng) -> dict:
+    """Świece z czynnikiem rynkowym; co dziesiąty symbol notowany krócej."""
+    start = 1_700_000_000_000 // HOUR_MS * HOUR_MS
+    market = rng.normal(0, 0.01, CANDLES)
+    data = {}
+    for i in range(symbols):
+        name = "BTC" if i == 0 else f"S{i:03d}"
+        offset = int(rng.integers(0, CANDLES // 2)) if i % 10 == 9 else 0
+        returns = rng.normal(0, 0.01, CANDLES - offset) + rng.uniform(0, 2) * market[offset:]
+        arr = np.empty(CANDLES - offset, dtype=kline_store.KLINE_DTYPE)
+        arr["open_time"] = start + HOUR_MS * np.arange(offset, CANDLES)
+        arr["close"] = 100 * np.exp(np.cumsum(returns))
+        arr["open"] = arr["high"] = arr["low"] = arr["close"]
+        arr["volume"] = 1.0
+        if i % 7 == 6:
+            arr = np.delete(arr, np.arange(len(arr) // 2, len(arr) // 2 + 12))
+        kline_store.save_klines(f"{name}USDT", "1h", arr)
+        data[name] = arr
+    return data
+
+
+def append_candle(kline_store, data: dict) -> None:
+    for name, arr in data.items():
+        new = arr[-1:].copy()
+        new["open_time"] += HOUR_MS
+        new["close"] *= 1.001
+        data[name] = np.concatenate([arr, new])
+        kline_store.save_klines(f"{name}USDT", "1h", data[name])
+
+
+def returns_frame(data: dict, window: int) -> pd.DataFrame:
+    end = max(int(a["open_time"][-1]) for a in data.values())
+    grid = end - HOUR_MS * np.arange(window, -1, -1)
+    closes = pd.DataFrame({
+        name: pd.Series(arr["close"], index=arr["open_time"]).reindex(grid).to_numpy()
+        for name, arr in sorted(data.items())
+    })
+    return np.log(closes).diff().iloc[1:]
+
+
+def naive_seconds(frame: pd.DataFrame, min_periods: int, rng) -> float:
+    """Szacowany czas pętli po wszystkich parach (z próbki NAIVE_SAMPLE_PAIRS)."""
+    columns = list(frame.columns)
+    pairs = list(itertools.combinations(range(len(columns)), 2))
+    sample = [pairs[i] for i in rng.choice(len(pairs), min(len(pairs), NAIVE_SAMPLE_PAIRS), replace=False)]
+    started = time.perf_counter()
+    for i, j in sample:
+        frame[columns[i]].corr(frame[columns[j]], min_periods=min_periods)
+    return (time.perf_counter() - started) / len(sample) * len(pairs)
+
+
+def median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, nargs="+", default=[50, 300, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services import correlations, kline_store
+
+    correlations.CORRELATIONS_CHECK_SECONDS = 0
+    rng = np.random.default_rng(0)
+    window_label, window = "30d", CANDLES - 1
+    rows = []
+    for symbols in args.symbols:
+        os.chdir(tempfile.mkdtemp(prefix=f"bench_correlations_{symbols}_"))
+        data = write_klines(kline_store, symbols, rng)
+        min_periods = window // 2
+        frame = returns_frame(data, window)
+
+        def full():
+            engine = correlations.CorrelationEngine("1h", {window_label: window})
+            with engine.lock:
+                engine.refresh()
+                return engine.result()
+
+        results = {
+            "naiwnie parami (szac.)": naive_seconds(frame, min_periods, rng) * 1000,
+            "DataFrame.corr": median_ms(lambda: frame.corr(min_periods=min_periods), args.repeat),
+            "silnik: od zera": median_ms(full, args.repeat),
+        }
+
+        engine = correlations.get_engine("1h", {window_label: window})
+        correlations.correlations_payload(windows=window_label)
+        incremental = []
+        for _ in range(args.repeat):
+            append_candle(kline_store, data)
+            started = time.perf_counter()
+            with engine.lock:
+                engine.refresh()
+            incremental.append(time.perf_counter() - started)
+        results["silnik: nowa świeca"] = statistics.median(incremental) * 1000
+        correlations.correlations_payload(windows=window_label)
+        results["odpowiedź z cache"] = median_ms(lambda: correlations.correlations_payload(windows=window_label), args.repeat)
+
+        # Po przyrostowych aktualizacjach wynik nadal zgadza się z pandas
+        with engine.lock:
+            got = engine.moments[window_label].correlation(min_periods)
+        expected = returns_frame(data, window).corr(min_periods=min_periods).to_numpy()
+        np.testing.assert_allclose(got, expected, atol=1e-9)
+        assert np.array_equal(np.isnan(got), np.isnan(expected))
+        rows.append((symbols, engine.updates, results))
+
+    print()
+    print(f"{'symbole':>8}  {'metoda':<24} {'czas':>12}")
+    for symbols, updates, results in rows:
+        for label, ms in results.items():
+            print(f"{symbols:>8}  {label:<24} {ms:>10.2f}ms")
+    print(f"\n✅ Macierze zgodne z DataFrame.corr (okno {window_label}, po {rows[-1][1]} aktualizacjach przyrostowych).")
+
+
+if __name__ == "__main__":
+    main()
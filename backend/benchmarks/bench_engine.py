@@ -0,0 +1,83 @@
+"""Benchmark obliczeń raportu: pętla per symbol vs silnik wektorowy.
+
+Dane to syntetyczne świece z `FakeBinance` (bez serwera HTTP). Skrypt
+sprawdza też, że oba warianty dają identyczne wiersze. Uruchomienie
+z katalogu `backend/`:
+
+    python -m benchmarks.bench_engine --symbols 400
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_binance import FakeBinance, point_binance_client_at
+
+
+def per_symbol_rows(frames, atr):
+    """Pierwotna pętla z generate_report – punkt odniesienia."""
+    rows = []
+    for sym, df in frames.items():
+        close = df['close'].iloc[-1]
+        pct_24h = (df['close'].iloc[-1] - df['close'].iloc[-25]) / df['close'].iloc[-25] * 100
+        pct_3d = (df['close'].iloc[-1] - df['close'].iloc[-73]) / df['close'].iloc[-73] * 100
+        pct_7d = (df['close'].iloc[-1] - df['close'].iloc[-169]) / df['close'].iloc[-169] * 100
+        atr_3d = atr(df.tail(72))
+        atr_7d = atr(df.tail(168))
+        rows.append({
+            "Symbol": sym,
+            "Close": float(f"{close:.2f}"),
+            "24h%": float(f"{pct_24h:.2f}"),
+            "3D%": float(f"{pct_3d:.2f}"),
+            "7D%": float(f"{pct_7d:.2f}"),
+            "ATR(3D)%": float(f"{atr_3d / close * 100:.2f}"),
+            "ATR(7D)%": float(f"{atr_7d / close * 100:.2f}"),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # analytics tworzy klienta Binance przy imporcie – kierujemy go lokalnie.
+    fake = FakeBinance(latency=0, history_days=30)
+    point_binance_client_at(fake.start())
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_engine_"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services import kline_store, report_engine
+    from app.services.analytics import atr
+
+    frames = {
+        f"S{i:03d}": kline_store.klines_to_df(kline_store.klines_to_array(fake.klines(f"S{i:03d}USDT", "1h")))
+        for i in range(args.symbols)
+    }
+
+    def best(fn):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+
+    loop_time, loop_rows = best(lambda: per_symbol_rows(frames, atr))
+    engine_time, (engine_rows, errors) = best(lambda: report_engine.compute_report_rows(frames))
+
+    fake.stop()
+    assert not errors, errors
+    assert engine_rows == loop_rows, "silnik wektorowy daje inne wiersze niż pętla"
+
+    print(f"symbole: {args.symbols}")
+    print(f"pętla per symbol:  {loop_time * 1000:9.1f} ms")
+    print(f"silnik wektorowy:  {engine_time * 1000:9.1f} ms")
+    print(f"przyspieszenie:    {loop_time / engine_time:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark etapu pobierania świec w `generate_report`.
+
+Porównuje pobieranie sekwencyjne (1 wątek) z równoległym na lokalnym
+zastępniku Binance ze sztucznym opóźnieniem – oba przy pustym magazynie
+świec – oraz kolejne uruchomienie, które tylko dociąga nowe świece.
+Uruchomienie z katalogu `backend/`:
+
+    python -m benchmarks.bench_fetch --symbols 16 --latency 0.2
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_binance import FakeBinance, point_binance_client_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    fake = FakeBinance(latency=args.latency)
+    point_binance_client_at(fake.start())
+
+    # Backend zapisuje do względnego katalogu data/ – izolujemy go.
+    os.chdir(tempfile.mkdtemp(prefix="bench_fetch_"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services import analytics
+
+    symbols = [f"S{i:03d}" for i in range(args.symbols)]
+
+    def run(workers, cold):
+        if cold:
+            shutil.rmtree("data/klines", ignore_errors=True)
+        requests_before = fake.requests
+        started = time.perf_counter()
+        df = analytics.generate_report(symbols, max_workers=workers)
+        elapsed = time.perf_counter() - started
+        assert len(df) == len(symbols), "nie wszystkie symbole zwróciły wiersz"
+        return elapsed, fake.requests - requests_before
+
+    serial = run(1, cold=True)
+    parallel = run(args.workers, cold=True)
+    topup = run(args.workers, cold=False)
+    fake.stop()
+
+    print()
+    print(f"symbole: {args.symbols}, opóźnienie: {args.latency:.3f}s/zapytanie")
+    print(f"sekwencyjnie (1 wątek):      {serial[0]:8.3f}s  zapytań: {serial[1]}")
+    print(f"równolegle ({args.workers} wątków):     {parallel[0]:8.3f}s  zapytań: {parallel[1]}")
+    print(f"dociągnięcie z magazynu:     {topup[0]:8.3f}s  zapytań: {topup[1]}")
+    print(f"przyspieszenie równoległe:   {serial[0] / parallel[0]:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark wspólnej bramki Binance (`app.services.binance_client.gateway`).
+
+Lokalny Binance ma limit wagi w krótkim oknie (domyślnie 400 / 5 s, czyli
+skala minutowego limitu giełdy). Porównujemy:
+1. seria zapytań o świece bezpośrednio przez `Client` – liczba odpowiedzi 429,
+2. ta sama seria przez bramkę z budżetem wagi – bez 429,
+3. zapytania z API w kolejce i zadanie harmonogramu dorzucone później –
+   harmonogram powinien skończyć wcześniej mimo późniejszego startu.
+
+Uruchomienie z katalogu `backend/`:
+
+    python -m benchmarks.bench_gateway --calls 400
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from binance.exceptions import BinanceAPIException
+
+from benchmarks.fake_binance import FakeBinance, point_binance_client_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--limit", type=int, default=400)
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    fake = FakeBinance(latency=0.01, history_days=2, weight_limit=args.limit, weight_window=args.window)
+    point_binance_client_at(fake.start())
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services import binance_client
+
+    def fresh_gateway():
+        budget = binance_client.WeightBudget(limit=args.limit, safety=0.9, window_seconds=args.window)
+        return binance_client.BinanceGateway(budget)
+
+    def klines(call):
+        try:
+            call(symbol="S001USDT", interval="1h", limit=10)
+            return True
+        except BinanceAPIException:
+            return False
+
+    # 1. Bez budżetu: gołe wywołania klienta
+    raw = fresh_gateway().client
+    time.sleep(args.window)
+    fake.rejected = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        ok = sum(pool.map(lambda _: klines(raw.get_klines), range(args.calls)))
+    print(f"bez budżetu:  {time.perf_counter() - started:6.2f}s, udanych {ok}/{args.calls}, 429: {fake.rejected}")
+
+    # 2. Przez bramkę
+    time.sleep(args.window)
+    gateway = fresh_gateway()
+    fake.rejected = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        ok = sum(pool.map(lambda _: klines(gateway.get_klines), range(args.calls)))
+    print(f"bramka:       {time.perf_counter() - started:6.2f}s, udanych {ok}/{args.calls}, 429: {fake.rejected}")
+
+    # 3. Priorytety: API zapełnia kolejkę, harmonogram przychodzi później
+    time.sleep(args.window)
+    gateway = fresh_gateway()
+    done = {"api": [], "scheduler": []}
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def job(kind, priority):
+        with binance_client.request_priority(priority):
+            gateway.get_klines(symbol="S001USDT", interval="1h", limit=10)
+        with lock:
+            done[kind].append(time.perf_counter() - started)
+
+    # Osobny wątek na wołającego – jak równoległe żądania HTTP i zadanie harmonogramu
+    threads = [threading.Thread(target=job, args=("api", binance_client.PRIORITY_API)) for _ in range(args.calls)]
+    for t in threads:
+        t.start()
+    time.sleep(0.2)
+    late = [
+        threading.Thread(target=job, args=("scheduler", binance_client.PRIORITY_SCHEDULER))
+        for _ in range(args.calls // 8)
+    ]
+    for t in late:
+        t.start()
+    for t in threads + late:
+        t.join()
+    print(f"priorytety:   API koniec {max(done['api']):5.2f}s, harmonogram (start 0.2s) koniec "
+          f"{max(done['scheduler']):5.2f}s, 429: {fake.rejected}")
+    fake.stop()
+
+
+if __name__ == "__main__":
+    main()
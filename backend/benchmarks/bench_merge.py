@@ -0,0 +1,84 @@
+"""Benchmark historii raportów: przebudowa z CSV vs dopisanie.
+
+Tworzy N syntetycznych plików `report_*.csv` i mierzy, ile kosztuje
+dołożenie kolejnego raportu przez pełny import wszystkich plików
+(`report_history.rebuild`) oraz przyrostowo (`append_report`). Na koniec
+sprawdza, że obie drogi dają tę samą historię. Uruchomienie z `backend/`:
+
+    python -m benchmarks.bench_merge --sizes 1000 10000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+SYMBOLS = ["BTC", "ETH", "SOL", "BNB", "TAO", "DASH", "HEMI", "PYTH"]
+COLUMNS = ["Close", "24h%", "3D%", "7D%", "ATR(3D)%", "ATR(7D)%"]
+
+
+def make_report(index: int) -> pd.DataFrame:
+    ts = (datetime(2024, 1, 1) + timedelta(hours=index)).strftime("%Y-%m-%d-%H-%M-%S")
+    rng = np.random.default_rng(index)
+    df = pd.DataFrame(rng.normal(0, 5, (len(SYMBOLS), len(COLUMNS))).round(2), columns=COLUMNS)
+    df.insert(0, "Symbol", SYMBOLS)
+    df["report_date"] = ts
+    return df
+
+
+def write_report(index: int) -> str:
+    df = make_report(index)
+    path = os.path.join("data", "reports", f"report_{df['report_date'].iloc[0]}.csv")
+    df.to_csv(path, index=False)
+    return path
+
+
+def run(size: int, report_history) -> tuple[float, float]:
+    os.chdir(tempfile.mkdtemp(prefix=f"bench_merge_{size}_"))
+    os.makedirs("data/reports")
+    for i in range(size):
+        write_report(i)
+    report_history.rebuild()
+
+    new_report = make_report(size)
+    started = time.perf_counter()
+    report_history.append_report(new_report)
+    append_time = time.perf_counter() - started
+    appended = report_history.snapshot().to_frame()
+
+    # Przebudowa od zera: wszystkie pliki CSV łącznie z nowym raportem
+    new_report.to_csv(os.path.join("data", "reports", f"report_{new_report['report_date'].iloc[0]}.csv"), index=False)
+    shutil.rmtree(report_history.HISTORY_DIR)
+    started = time.perf_counter()
+    report_history.rebuild()
+    rebuild_time = time.perf_counter() - started
+    rebuilt = report_history.snapshot().to_frame()
+
+    pd.testing.assert_frame_equal(appended, rebuilt)
+    return rebuild_time, append_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services import report_history
+
+    results = [(size, *run(size, report_history)) for size in args.sizes]
+
+    print()
+    print(f"{'plików':>8} {'przebudowa':>12} {'dopisanie':>12}")
+    for size, rebuild_time, append_time in results:
+        print(f"{size:>8} {rebuild_time * 1000:>10.1f}ms {append_time * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark narzutu metryk (`app.services.metrics`).
+
+Mierzy:
+1. koszt jednego `Histogram.observe` i bloku `with stage(...)`,
+2. narzut `MetricsMiddleware` na zapytanie – ta sama aplikacja FastAPI
+   z middleware i bez, wołana bezpośrednio przez ASGI (bez sieci, więc
+   różnica to tylko middleware),
+3. czas `render()` dla `/metrics` przy wielu seriach.
+
+Uruchomienie z katalogu `backend/`:
+
+    python -m benchmarks.bench_metrics --calls 200000 --requests 5000 --rounds 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+
+def per_call_ns(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+async def drive(app, requests: int) -> float:
+    """Średni czas (µs) zapytania GET / wołanego bezpośrednio przez ASGI."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/", "raw_path": b"/", "query_string": b"", "root_path": "",
+        "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # rozgrzewka
+        await app(dict(scope), receive, send)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from fastapi import FastAPI
+
+    from app.services import metrics
+
+    hist = metrics.Histogram("bench_observe_seconds", "benchmark", ["stage"])
+    observe = per_call_ns(lambda: hist.observe(0.01, stage="x"), args.calls)
+
+    def staged():
+        with metrics.stage("bench"):
+            pass
+
+    stage_ns = per_call_ns(staged, args.calls)
+    print(f"Histogram.observe:     {observe:8.0f} ns")
+    print(f"with stage(...):       {stage_ns:8.0f} ns")
+
+    def make_app(with_metrics: bool):
+        app = FastAPI()
+
+        @app.get("/")
+        def root():
+            return {"status": "OK"}
+
+        if with_metrics:
+            app.add_middleware(metrics.MetricsMiddleware)
+        return app
+
+    # Na zmianę po kilka rund, minimum z rund – szum maszyny jest większy niż narzut
+    apps = {False: make_app(False), True: make_app(True)}
+    runs = {False: [], True: []}
+    for _ in range(args.rounds):
+        for with_metrics, app in apps.items():
+            runs[with_metrics].append(asyncio.run(drive(app, args.requests)))
+    plain, measured = min(runs[False]), min(runs[True])
+    print(f"GET / bez metryk:      {plain:8.1f} µs")
+    print(f"GET / z metrykami:     {measured:8.1f} µs  (narzut {measured - plain:+.1f} µs, "
+          f"{(measured - plain) / plain * 100:+.1f}%)")
+
+    # /metrics przy ~20 trasach × 3 statusach i 12 etapach
+    for i in range(20):
+        for status in (200, 304, 500):
+            metrics.HTTP_SECONDS.observe(0.01, method="GET", route=f"/route{i}", status=status)
+    for i in range(12):
+        metrics.STAGE_SECONDS.observe(0.5, stage=f"stage{i}")
+    started = time.perf_counter()
+    text = metrics.render()
+    print(f"render() /metrics:     {(time.perf_counter() - started) * 1000:8.2f} ms "
+          f"({len(text.splitlines())} linii, {len(text) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark prognozy AI (`app.services.ai_predict`) na lokalnym zastępniku GROQ.
+
+Porównuje:
+- długość promptu: dawny `df.to_string()` vs `compact_report`,
+- pierwsze wywołanie vs to samo zapytanie z cache (bez ruchu do API),
+- czas do pierwszego fragmentu w trybie strumieniowym vs pełna odpowiedź.
+
+Uruchomienie z katalogu `backend/`:
+
+    python -m benchmarks.bench_predict --symbols 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_groq import FakeGroq
+
+
+def synthetic_report(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "Symbol": [f"S{i:03d}" for i in range(n)],
+        "Close": np.round(rng.uniform(0.1, 50_000, n), 2),
+        "24h%": np.round(rng.normal(0, 4, n), 2),
+        "3D%": np.round(rng.normal(0, 8, n), 2),
+        "7D%": np.round(rng.normal(0, 12, n), 2),
+        "ATR(3D)%": np.round(rng.uniform(0.5, 4, n), 2),
+        "ATR(7D)%": np.round(rng.uniform(0.5, 4, n), 2),
+    })
+    df["generated_at"] = "2025-01-01T06:00:00"
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=8)
+    parser.add_argument("--first-token", type=float, default=0.3)
+    args = parser.parse_args()
+
+    fake = FakeGroq(first_token=args.first_token)
+    os.environ["GROQ_BASE_URL"] = fake.start()
+    os.environ["GROQ_API_KEY"] = "bench"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services import ai_predict
+
+    df = synthetic_report(args.symbols)
+    full_chars = len(df.to_string())
+    compact_chars = len(ai_predict.compact_report(df))
+
+    started = time.perf_counter()
+    first = ai_predict.predict_market(df)
+    cold = time.perf_counter() - started
+
+    started = time.perf_counter()
+    again = ai_predict.predict_market(df.copy())
+    warm = time.perf_counter() - started
+    assert again == first and fake.requests == 1, "drugie wywołanie powinno przyjść z cache"
+
+    other = df.copy()
+    other.loc[0, "24h%"] += 1
+    started = time.perf_counter()
+    stream = ai_predict.stream_prediction(other)
+    next(stream)
+    first_chunk = time.perf_counter() - started
+    for _ in stream:
+        pass
+    stream_total = time.perf_counter() - started
+    assert ai_predict.predict_market(other) and fake.requests == 2, "strumień powinien trafić do cache"
+    fake.stop()
+
+    print(f"symbole: {args.symbols}")
+    print(f"prompt (raport):  df.to_string() {full_chars:6d} zn.  compact {compact_chars:6d} zn.  "
+          f"({compact_chars / full_chars:.0%})")
+    print(f"pierwsze wywołanie: {cold * 1000:8.1f} ms")
+    print(f"z cache:            {warm * 1000:8.3f} ms")
+    print(f"streaming: pierwszy fragment {first_chunk * 1000:6.1f} ms, całość {stream_total * 1000:6.1f} ms")
+    print(f"zapytań do API: {fake.requests}")
+
+
+if __name__ == "__main__":
+    main()
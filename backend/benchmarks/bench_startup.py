@@ -0,0 +1,130 @@
+"""Benchmark startu API: import `app.main` i pierwsza odpowiedź `/`.
+
+Każdy pomiar to świeży proces Pythona (jak start kontenera albo workera)
+w pustym katalogu roboczym i bez sieci – `socket.connect` rzuca wyjątek,
+więc każda próba połączenia przy imporcie lub w zdarzeniu `startup`
+kończy się błędem i jest liczona. Mierzymy:
+1. import `app.main`,
+2. uruchomienie aplikacji (zdarzenia `startup`) i odpowiedź na `/`,
+a na koniec sprawdzamy, że ciężkie pakiety (python-binance, matplotlib,
+groq) nie zostały załadowane i że start nie zostawił plików w `data/`.
+
+Punkt odniesienia to sam import fastapi + pandas w świeżym procesie –
+tego aplikacja nie uniknie. Narzut aplikacji ponad ten próg ma być mały,
+a całość poniżej `--budget`; jeśli sam próg zjada prawie cały limit
+(wolna maszyna), przekroczenie limitu jest tylko ostrzeżeniem.
+
+Uruchomienie z katalogu `backend/`:
+
+    python -m benchmarks.bench_startup --runs 5 --budget 1.0 --overhead 0.3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pakiety, które mają się ładować dopiero przy pierwszym użyciu
+LAZY_MODULES = ["binance", "matplotlib", "groq"]
+
+CHILD = r"""
+import json, socket, sys, time
+
+attempts = []
+
+def _no_network(self, address, *args):
+    attempts.append(str(address))
+    raise OSError("sieć wyłączona w benchmarku startu")
+
+socket.socket.connect = _no_network
+socket.socket.connect_ex = _no_network
+
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+
+client_ready = time.perf_counter()
+with TestClient(app.main.app) as client:
+    response = client.get("/")
+    served = time.perf_counter()
+
+print(json.dumps({
+    "import_s": imported - started,
+    "serve_s": served - client_ready,
+    "status": response.status_code,
+    "connect_attempts": attempts,
+    "loaded": [m for m in LAZY_MODULES if m in sys.modules],
+}))
+"""
+
+
+FLOOR = r"""
+import time
+started = time.perf_counter()
+import fastapi, pandas
+print(time.perf_counter() - started)
+"""
+
+
+def measure_floor() -> float:
+    out = subprocess.run([sys.executable, "-c", FLOOR], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def run_once() -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, STREAM_ENABLED="0")
+    code = f"LAZY_MODULES = {LAZY_MODULES!r}\n{CHILD}"
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_s"] = time.perf_counter() - started
+    result["created"] = sorted(os.listdir(workdir))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="limit (s) na import + odpowiedź /")
+    parser.add_argument("--overhead", type=float, default=0.3, help="limit (s) ponad import fastapi + pandas")
+    args = parser.parse_args()
+
+    results, floors = [], []
+    for i in range(args.runs):
+        floors.append(measure_floor())
+        result = run_once()
+        results.append(result)
+        print(f"przebieg {i + 1}: import {result['import_s'] * 1000:6.0f} ms, startup + / "
+              f"{result['serve_s'] * 1000:5.0f} ms, cały proces {result['process_s'] * 1000:6.0f} ms")
+
+    # Pierwszy przebieg płaci za zimny cache plików .pyc – liczymy medianę
+    ready = statistics.median(r["import_s"] + r["serve_s"] for r in results)
+    floor = statistics.median(floors)
+    print(f"mediana import + /: {ready * 1000:.0f} ms (limit {args.budget * 1000:.0f} ms), "
+          f"sam fastapi + pandas: {floor * 1000:.0f} ms, narzut aplikacji: {(ready - floor) * 1000:.0f} ms")
+
+    for result in results:
+        assert result["status"] == 200, f"/ zwróciło {result['status']}"
+        assert not result["connect_attempts"], f"próby połączenia przy starcie: {result['connect_attempts']}"
+        assert not result["loaded"], f"załadowane przy starcie: {result['loaded']}"
+        assert not result["created"], f"start utworzył pliki: {result['created']}"
+    assert ready - floor < args.overhead, f"narzut aplikacji {ready - floor:.2f}s (limit {args.overhead}s)"
+    if ready >= args.budget:
+        assert floor > 0.8 * args.budget, f"start trwa {ready:.2f}s (limit {args.budget}s)"
+        print(f"⚠️ start {ready:.2f}s ≥ {args.budget}s, ale sam import fastapi + pandas trwa {floor:.2f}s")
+    print(f"✅ start bez sieci, bez {', '.join(LAZY_MODULES)} i bez zapisów na dysk")
+
+
+if __name__ == "__main__":
+    main()
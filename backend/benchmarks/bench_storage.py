@@ -0,0 +1,88 @@
+"""Benchmark odczytu całej historii raportów: CSV vs magazyn kolumnowy.
+
+Buduje historię N raportów × S symboli, eksportuje ją do CSV i porównuje:
+- `pd.read_csv` całego pliku (tak czytaliśmy `all_reports.csv`),
+- `report_history.snapshot()` – same memmapy kolumn (zero kopii),
+- `snapshot().to_frame()` – pełny DataFrame z typowanymi kolumnami.
+
+Dla każdej drogi podaje czas (mediana) i szczyt alokacji (tracemalloc).
+Uruchomienie z katalogu `backend/`:
+
+    python -m benchmarks.bench_storage --reports 1000 10000 --symbols 8 50
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["Close", "24h%", "3D%", "7D%", "ATR(3D)%", "ATR(7D)%"]
+
+
+def build_history(report_history, reports: int, symbols: int) -> None:
+    names = [f"S{i:03d}" for i in range(symbols)]
+    rng = np.random.default_rng(0)
+    dates = [datetime(2024, 1, 1) + timedelta(hours=12 * i) for i in range(reports)]
+    df = pd.DataFrame(rng.normal(0, 5, (reports * symbols, len(COLUMNS))).round(2), columns=COLUMNS)
+    df.insert(0, "Symbol", names * reports)
+    df.insert(1, "report_date", pd.to_datetime(np.repeat(dates, symbols)))
+    report_history.table.write(df, {"reports": reports, "last_report_date": dates[-1].strftime("%Y-%m-%d-%H-%M-%S")})
+
+
+def measure(fn, repeat: int) -> tuple[float, float]:
+    """(mediana czasu w ms, szczyt alokacji w MB)."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return statistics.median(times) * 1000, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reports", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[8, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services import report_history
+
+    rows = []
+    for symbols in args.symbols:
+        for reports in args.reports:
+            os.chdir(tempfile.mkdtemp(prefix=f"bench_storage_{reports}_{symbols}_"))
+            build_history(report_history, reports, symbols)
+            csv_path = report_history.export_csv("data/all_reports.csv")
+            size_csv = os.path.getsize(csv_path) / 1e6
+            size_bin = sum(e.stat().st_size for e in os.scandir(report_history.HISTORY_DIR)) / 1e6
+
+            results = {
+                "CSV (pd.read_csv)": measure(lambda: pd.read_csv(csv_path), args.repeat),
+                "kolumnowo: snapshot": measure(report_history.snapshot, args.repeat),
+                "kolumnowo: to_frame": measure(lambda: report_history.snapshot().to_frame(), args.repeat),
+            }
+            rows.append((reports, symbols, size_csv, size_bin, results))
+
+    print()
+    print(f"{'raporty':>8} {'symbole':>8} {'CSV MB':>7} {'bin MB':>7}  {'odczyt':<22} {'czas':>10} {'pamięć':>10}")
+    for reports, symbols, size_csv, size_bin, results in rows:
+        for label, (ms, mb) in results.items():
+            print(f"{reports:>8} {symbols:>8} {size_csv:>7.1f} {size_bin:>7.1f}  {label:<22} {ms:>8.2f}ms {mb:>8.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark i sprawdzenie offline strumienia świec (`app.services.stream`).
+
+1. Nagrywa syntetyczny strumień kline (z `FakeBinance`) do pliku JSONL –
+   dla każdej świecy wiadomość „otwarta” i „zamknięta”.
+2. Odtwarza nagranie przez `KlineStream.replay` i porównuje końcowe
+   wiersze ze stanu wskaźników z `report_engine` liczonym na tych samych
+   świecach. To samo dla strumienia 4h (świece zagregowane z 1h) – tu
+   wzorcem jest `analytics.generate_report(..., interval="4h")`.
+3. Serwuje to samo nagranie z lokalnego serwera WebSocket (zamiast
+   Binance) i mierzy przepustowość ścieżki na żywo, łącznie z ponownym
+   połączeniem po zamknięciu strumienia przez serwer.
+
+Uruchomienie z katalogu `backend/`:
+
+    python -m benchmarks.bench_stream --symbols 50 --hours 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import websockets
+
+from benchmarks.fake_binance import FakeBinance, point_binance_client_at
+
+
+def record(series: dict, interval: str, path: str) -> int:
+    """Nagrywa świece (symbol -> lista [t, o, h, l, c, v]) jako wiadomości kline."""
+    count = 0
+    with open(path, "w") as f:
+        for i in range(min(len(rows) for rows in series.values())):
+            for sym, rows in series.items():
+                k = rows[i]
+                for closed in (False, True):
+                    msg = {
+                        "stream": f"{sym.lower()}usdt@kline_{interval}",
+                        "data": {
+                            "e": "kline",
+                            "s": f"{sym}USDT",
+                            "k": {
+                                "t": k[0], "i": interval, "o": k[1], "h": k[2],
+                                "l": k[3], "c": k[4], "v": k[5], "x": closed,
+                            },
+                        },
+                    }
+                    f.write(json.dumps(msg, separators=(",", ":")) + "\n")
+                    count += 1
+    return count
+
+
+async def serve_recording(path: str):
+    lines = open(path).read().splitlines()
+
+    async def handler(ws):
+        for line in lines:
+            await ws.send(line)
+        await ws.close()
+
+    return await websockets.serve(handler, "127.0.0.1", 0)
+
+
+async def live_run(stream_module, symbols, path, expected):
+    server = await serve_recording(path)
+    port = server.sockets[0].getsockname()[1]
+    stream_module.BINANCE_WS_URL = f"ws://127.0.0.1:{port}"
+    stream_module.RECONNECT_MIN_DELAY = 0.1
+
+    stream = stream_module.KlineStream(symbols, backfill=False, on_signal=lambda *a: None)
+    started = time.perf_counter()
+    stream.start()
+    # Czekamy, aż przyjdzie całe nagranie i strumień połączy się ponownie
+    while stream.closed_candles < expected:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    while not stream.connected:
+        await asyncio.sleep(0.01)
+    stream.stop()
+    server.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--hours", type=int, default=300)
+    args = parser.parse_args()
+
+    fake = FakeBinance(latency=0, history_days=max(30, args.hours // 24 + 1))
+    point_binance_client_at(fake.start())
+    os.chdir(tempfile.mkdtemp(prefix="bench_stream_"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services import analytics, kline_store, report_engine, stream as stream_module, timeframes
+
+    symbols = [f"S{i:03d}" for i in range(args.symbols)]
+    path = "recording.jsonl"
+    hourly = {sym: fake.klines(f"{sym}USDT", "1h")[-args.hours:] for sym in symbols}
+    messages = record(hourly, "1h", path)
+
+    signals_seen = []
+    stream = stream_module.KlineStream(
+        symbols, backfill=False, on_signal=lambda sym, reasons, row: signals_seen.append(sym)
+    )
+    started = time.perf_counter()
+    stream.replay(path)
+    replay_time = time.perf_counter() - started
+
+    frames = {
+        sym: kline_store.klines_to_df(kline_store.load_klines(f"{sym}USDT", "1h"))
+        for sym in symbols
+    }
+    expected_rows, _ = report_engine.compute_report_rows(frames)
+    assert stream.rows() == expected_rows, "stan strumienia różni się od report_engine"
+
+    # Strumień 4h: te same świece zagregowane do 4h, wzorzec z generate_report
+    four_hourly = {
+        sym: timeframes.resample(kline_store.klines_to_array(rows), "4h").tolist()
+        for sym, rows in hourly.items()
+    }
+    record(four_hourly, "4h", "recording_4h.jsonl")
+    stream_4h = stream_module.KlineStream(symbols, interval="4h", backfill=False, on_signal=lambda *a: None)
+    stream_4h.replay("recording_4h.jsonl")
+    report_4h = analytics.generate_report(symbols, interval="4h")
+    expected_4h = sorted(report_4h.to_dict(orient="records"), key=lambda r: r["Symbol"])
+    assert sorted(stream_4h.rows(), key=lambda r: r["Symbol"]) == expected_4h, \
+        "stan strumienia 4h różni się od generate_report"
+
+    for sym in symbols:
+        os.remove(kline_store.KLINES_DIR / f"{sym}USDT_1h.npy")
+    live_time = asyncio.run(live_run(stream_module, symbols, path, args.symbols * args.hours))
+    fake.stop()
+
+    print(f"symbole: {args.symbols}, świec na symbol: {args.hours}, wiadomości: {messages}")
+    print(f"odtwarzanie:   {replay_time:7.2f}s  ({messages / replay_time:9.0f} wiad./s)")
+    print(f"WebSocket:     {live_time:7.2f}s  ({messages / live_time:9.0f} wiad./s)")
+    print(f"sygnałów zgłoszonych w odtwarzaniu: {len(signals_seen)}")
+    print("✅ wiersze ze stanu strumienia == report_engine (1h) i generate_report (4h)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""Zbiorczy benchmark potoku: świece → raport → historia → sygnały → wykres → API.
+
+Wszystko offline: świece serwuje lokalny `FakeBinance` – z nagrań z
+`benchmarks/fixtures` (patrz `benchmarks.fixtures`), a gdy ich brak,
+z generatora syntetycznego. Każdy pomiar działa we własnym katalogu
+roboczym (backend zapisuje do względnego `data/`). Etapy:
+
+- parsowanie świec (`klines_to_array` + `klines_to_df`) i
+  `get_historical_data` – pusty magazyn i dociągnięcie,
+- `atr` (per symbol) i `batched_atr` (wszystkie symbole naraz),
+- `generate_report`,
+- `merge_all_reports` (import N plików CSV) i `append_report`,
+- odczyt całej historii: CSV (`pd.read_csv`) vs magazyn kolumnowy,
+- `get_latest_report_df` – z dysku i z pamięci,
+- `detect_signals_from_df`,
+- `history_index` – pełne wczytanie historii i zapytania `/history`,
+- `generate_chart` – renderowanie i trafienie w cache,
+- test obciążeniowy endpointów FastAPI (uvicorn na localhost).
+
+Wyniki trafiają do JSON-a (`benchmarks/results/` domyślnie); `--compare`
+porównuje je z wcześniejszym plikiem i wskazuje regresje. Uruchomienie
+z katalogu `backend/`:
+
+    python -m benchmarks.bench_suite --symbols 8 50 --days 30 90 --reports 100 1000
+    python -m benchmarks.bench_suite --compare benchmarks/results/bench_<poprzedni>.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_binance import FakeBinance, point_binance_client_at
+from benchmarks.fixtures import FIXTURES_DIR, load_fixtures
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+REPORT_COLUMNS = ["Close", "24h%", "3D%", "7D%", "ATR(3D)%", "ATR(7D)%"]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Wycisza `print` z backendu (logi per symbol zagłuszyłyby wyniki)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def workspace(name: str) -> str:
+    path = tempfile.mkdtemp(prefix=f"bench_suite_{name}_")
+    os.chdir(path)
+    return path
+
+
+class Recorder:
+    """Zbiera pomiary etapów w jednym formacie (ms, próbki + mediana)."""
+
+    def __init__(self, repeat: int):
+        self.repeat = repeat
+        self.results: list[dict] = []
+
+    def time(self, stage: str, params: dict, fn, setup=None, repeat: int | None = None):
+        samples = []
+        for _ in range(repeat or self.repeat):
+            if setup:
+                setup()
+            with quiet():
+                started = time.perf_counter()
+                fn()
+                samples.append((time.perf_counter() - started) * 1000)
+        self.add(stage, params, samples)
+
+    def add(self, stage: str, params: dict, samples_ms: list[float], **extra):
+        entry = {
+            "stage": stage,
+            "params": params,
+            "samples_ms": [round(s, 3) for s in samples_ms],
+            "median_ms": round(statistics.median(samples_ms), 3),
+            "min_ms": round(min(samples_ms), 3),
+            **extra,
+        }
+        self.results.append(entry)
+        shown = ", ".join(f"{k}={v}" for k, v in params.items())
+        print(f"  {stage:<36} {shown:<28} mediana {entry['median_ms']:10.2f} ms")
+
+
+# ============================================================
+# Etapy: świece i raport
+# ============================================================
+def bench_klines(rec: Recorder, fake: FakeBinance, analytics, kline_store, report_engine, symbols, days):
+    pairs = [f"{sym}USDT" for sym in symbols]
+    params = {"symbols": len(symbols), "days": days}
+    workspace(f"klines_{len(symbols)}_{days}")
+
+    since_ms = int(time.time() * 1000) - days * 86_400_000
+    raw = [[row for row in fake.klines(pair, "1h") if row[0] >= since_ms] for pair in pairs]
+    rec.time("parse_klines", params, lambda: [kline_store.klines_to_df(kline_store.klines_to_array(rows)) for rows in raw])
+
+    def cold():
+        shutil.rmtree("data/klines", ignore_errors=True)
+
+    def fetch():
+        frames, errors = analytics.fetch_historical_data(symbols, days=days)
+        assert not errors, f"błędy pobierania: {errors}"
+        return frames
+
+    rec.time("get_historical_data (pusty magazyn)", params, fetch, setup=cold)
+    rec.time("get_historical_data (dociągnięcie)", params, fetch)
+
+    with quiet():
+        frames = fetch()
+    rec.time("atr (per symbol)", params, lambda: [analytics.atr(df) for df in frames.values()])
+    _, arrays, _ = report_engine.align_tails(frames, length=days * 24)
+    rec.time("batched_atr", params, lambda: report_engine.batched_atr(
+        arrays["high"], arrays["low"], arrays["close"], window=days * 24))
+
+
+def bench_report(rec: Recorder, analytics, symbols):
+    workspace(f"report_{len(symbols)}")
+    params = {"symbols": len(symbols)}
+    with quiet():
+        analytics.generate_report(symbols)  # magazyn świec na ciepło
+    rec.time("generate_report", params, lambda: analytics.generate_report(symbols))
+
+
+# ============================================================
+# Etapy: historia raportów, sygnały, wykres
+# ============================================================
+def make_report(index: int, symbols: list[str]) -> pd.DataFrame:
+    ts = (datetime(2024, 1, 1) + timedelta(hours=index)).strftime("%Y-%m-%d-%H-%M-%S")
+    rng = np.random.default_rng(index)
+    df = pd.DataFrame(rng.normal(0, 5, (len(symbols), len(REPORT_COLUMNS))).round(2), columns=REPORT_COLUMNS)
+    df.insert(0, "Symbol", symbols)
+    df["report_date"] = ts
+    return df
+
+
+def write_report(index: int, symbols: list[str]) -> str:
+    """Raport w starym formacie CSV (do importu przez merge_all_reports)."""
+    df = make_report(index, symbols)
+    path = os.path.join("data", "reports", f"report_{df['report_date'].iloc[0]}.csv")
+    df.to_csv(path, index=False)
+    return path
+
+
+def bench_history(rec: Recorder, analytics, report_history, charts, symbols, reports):
+    workspace(f"history_{len(symbols)}_{reports}")
+    params = {"symbols": len(symbols), "reports": reports}
+    os.makedirs("data/reports")
+    for i in range(reports):
+        write_report(i, symbols)
+
+    rec.time("merge_all_reports (import CSV)", params, analytics.merge_all_reports,
+             setup=lambda: shutil.rmtree(report_history.HISTORY_DIR, ignore_errors=True))
+    appended = iter(range(reports, reports + rec.repeat))
+    rec.time("append_report", params, lambda: report_history.append_report(make_report(next(appended), symbols)))
+
+    csv_path = report_history.export_csv(os.path.join("data", "history_export.csv"))
+    rec.time("historia: odczyt CSV (pd.read_csv)", params, lambda: pd.read_csv(csv_path))
+    rec.time("historia: odczyt kolumnowy (to_frame)", params, lambda: report_history.snapshot().to_frame())
+
+    def drop_cache():
+        analytics._latest_cache = analytics._LatestReportCache()
+
+    rec.time("get_latest_report_df (z dysku)", params, analytics.get_latest_report_df, setup=drop_cache)
+    rec.time("get_latest_report_df (z pamięci)", params, analytics.get_latest_report_df)
+
+    df = analytics.get_latest_report_df()
+    rec.time("detect_signals_from_df", params, lambda: analytics.detect_signals_from_df(df))
+
+    from app.services.history_index import HistoryIndex
+
+    index = HistoryIndex()
+    rec.time("history_index (pełne wczytanie)", params, index.refresh, setup=index._reset)
+    rec.time("history_index.query (symbol, pełny zakres)", params,
+             lambda: index.query([symbols[0]], ["Close", "24h%"]))
+    rec.time("history_index.query (4 symbole, lttb 200)", params,
+             lambda: index.query(symbols[:4], ["Close"], points=200))
+
+    top3 = df.sort_values(by="24h%", ascending=False)["Symbol"].head(3).tolist()
+    rec.time("generate_chart (render)", params, lambda: charts.generate_chart(top3, column="24h%"),
+             setup=lambda: shutil.rmtree("data/charts", ignore_errors=True))
+    rec.time("generate_chart (cache)", params, lambda: charts.generate_chart(top3, column="24h%"))
+    return top3
+
+
+# ============================================================
+# Test obciążeniowy API
+# ============================================================
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(app):
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def load_test(rec: Recorder, app, top3, requests_per_endpoint: int, concurrency: int):
+    import requests
+
+    profiles = [{"id": f"p{i}", "params": {"change_24h_threshold": 2.0 + i, "atr_7d_threshold": 3.0 + i}}
+                for i in range(10)]
+    endpoints = [
+        ("GET", "/", None),
+        ("GET", "/reports/latest", None),
+        ("GET", "/signals", None),
+        ("POST", "/signals/evaluate", {"profiles": profiles}),
+        ("GET", f"/chart?symbols={','.join(top3)}&column=24h%25", None),
+        ("GET", f"/history?symbols={','.join(top3)}&columns=Close,24h%25&points=200", None),
+        ("GET", "/report", None),
+    ]
+    params = {"requests": requests_per_endpoint, "concurrency": concurrency}
+
+    with quiet(), serve(app) as base:
+        local = threading.local()
+
+        def session():
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            return local.session
+
+        for method, path, body in endpoints:
+            session().request(method, base + path, json=body)  # rozgrzewka (cache, pula wykresów)
+            latencies, errors = [], 0
+            lock = threading.Lock()
+            remaining = iter(range(requests_per_endpoint))
+
+            def worker():
+                nonlocal errors
+                while next(remaining, None) is not None:
+                    started = time.perf_counter()
+                    resp = session().request(method, base + path, json=body)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        errors += resp.status_code >= 400
+
+            started = time.perf_counter()
+            workers = [threading.Thread(target=worker) for _ in range(concurrency)]
+            for t in workers:
+                t.start()
+            for t in workers:
+                t.join()
+            wall = time.perf_counter() - started
+
+            p95, p99 = np.percentile(latencies, [95, 99])
+            with contextlib.redirect_stdout(sys.__stdout__):
+                rec.add(f"http {method} {path.split('?')[0]}", params, latencies,
+                        errors=errors, rps=round(len(latencies) / wall, 1),
+                        p95_ms=round(float(p95), 3), p99_ms=round(float(p99), 3))
+
+
+# ============================================================
+# Zapis i porównanie wyników
+# ============================================================
+def git_revision() -> dict:
+    def git(*cmd):
+        return subprocess.run(["git", *cmd], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD") or "unknown",
+                "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except OSError:
+        return {"commit": "unknown", "dirty": None}
+
+
+def _key(entry: dict) -> tuple:
+    return entry["stage"], json.dumps(entry["params"], sort_keys=True)
+
+
+def compare(old_path: Path, new: dict, threshold: float, min_delta_ms: float) -> list[dict]:
+    """Wypisuje zmiany median względem starego pliku; zwraca listę regresji."""
+    old = json.loads(Path(old_path).read_text())
+    previous = {_key(e): e for e in old["results"]}
+    print(f"\nPorównanie z {old_path} (commit {old['meta'].get('commit')}):")
+    regressions = []
+    for entry in new["results"]:
+        before = previous.get(_key(entry))
+        if before is None:
+            continue
+        delta = entry["median_ms"] - before["median_ms"]
+        ratio = delta / before["median_ms"] if before["median_ms"] else 0.0
+        flag = ""
+        if ratio > threshold and delta > min_delta_ms:
+            flag = "  ⚠️ regresja"
+            regressions.append({**entry, "previous_median_ms": before["median_ms"]})
+        elif -ratio > threshold and -delta > min_delta_ms:
+            flag = "  ✅ szybciej"
+        shown = ", ".join(f"{k}={v}" for k, v in entry["params"].items())
+        print(f"  {entry['stage']:<36} {shown:<28} {before['median_ms']:10.2f} → "
+              f"{entry['median_ms']:10.2f} ms ({ratio * 100:+6.1f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, nargs="+", default=[8, 50])
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 90])
+    parser.add_argument("--reports", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="opóźnienie lokalnego Binance (s)")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+    parser.add_argument("--requests", type=int, default=200, help="zapytań na endpoint w teście obciążeniowym")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--out", type=Path, help="plik wyników (domyślnie benchmarks/results/bench_<commit>_<czas>.json)")
+    parser.add_argument("--compare", type=Path, help="wcześniejszy plik wyników do porównania")
+    parser.add_argument("--threshold", type=float, default=0.2, help="względny wzrost mediany uznawany za regresję")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignoruj zmiany poniżej tylu ms")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    fake = FakeBinance(latency=args.latency, history_days=max(args.days) + 1, fixtures=fixtures)
+    point_binance_client_at(fake.start())
+    os.environ["DISCORD_WEBHOOK"] = ""  # /report w teście obciążeniowym nie wysyła nic na Discorda
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    from app.services import analytics, charts, kline_store, report_engine, report_history
+
+    source = f"fixtures ({', '.join(sorted(fixtures))})" if fixtures else "syntetyczne"
+    print(f"Świece: {source}, opóźnienie Binance {args.latency * 1000:.0f} ms, powtórzeń {args.repeat}")
+    rec = Recorder(args.repeat)
+    started = time.perf_counter()
+
+    for count in args.symbols:
+        symbols = [f"S{i:03d}" for i in range(count)]
+        for days in args.days:
+            bench_klines(rec, fake, analytics, kline_store, report_engine, symbols, days)
+        bench_report(rec, analytics, symbols)
+
+    top3 = None
+    for count in args.symbols:
+        for reports in args.reports:
+            top3 = bench_history(rec, analytics, report_history, charts, [f"S{i:03d}" for i in range(count)], reports)
+
+    if not args.skip_load:
+        # Katalog roboczy z ostatniego etapu historii: raporty, historia i magazyn świec
+        from app.main import app
+
+        load_test(rec, app, top3, args.requests, args.concurrency)
+
+    charts.shutdown_chart_pool()
+    fake.stop()
+    os.chdir(BACKEND_DIR)
+
+    revision = git_revision()
+    output = {
+        "meta": {
+            **revision,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "klines": source,
+            "duration_s": round(time.perf_counter() - started, 1),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        },
+        "results": rec.results,
+    }
+    out = args.out or RESULTS_DIR / f"bench_{revision['commit']}_{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(output, indent=1, ensure_ascii=False))
+    print(f"\n💾 Wyniki: {out} ({output['meta']['duration_s']}s)")
+
+    if args.compare:
+        regressions = compare(args.compare, output, args.threshold, args.min_delta_ms)
+        print(f"Regresji: {len(regressions)}")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark raportu uniwersum (`app.services.universe`) na lokalnym Binance.
+
+Porównuje dla N par USDT:
+1. pełny `generate_report` dla wszystkich par (każda para = świece z 30 dni),
+2. tryb uniwersum: exchangeInfo + jeden ticker 24h + metryki głębokie
+   porcjami po `--per-run` symboli, aż do pełnego pokrycia, a potem
+   przebieg „w stanie ustalonym”.
+
+Dla każdego wariantu: czas, liczba zapytań HTTP i szacowana waga
+(limit Binance to 6000 na minutę).
+
+Uruchomienie z katalogu `backend/`:
+
+    python -m benchmarks.bench_universe --symbols 400 --per-run 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_binance import FakeBinance, point_binance_client_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=400)
+    parser.add_argument("--per-run", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    fake = FakeBinance(latency=args.latency, history_days=31, universe=args.symbols)
+    point_binance_client_at(fake.start())
+    os.chdir(tempfile.mkdtemp(prefix="bench_universe_"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import contextlib
+    import io
+
+    from app.services import analytics, universe
+
+    symbols = [pair[:-4] for pair in fake.universe]
+
+    before, started = fake.requests, time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        full = analytics.generate_report(symbols)
+    full_time, full_requests = time.perf_counter() - started, fake.requests - before
+    print(f"generate_report ({len(full)} par): {full_time:6.2f}s, zapytań {full_requests}, "
+          f"waga ≈{full_requests * universe.WEIGHT_KLINES}")
+
+    # Tryb uniwersum na pustym magazynie świec
+    os.chdir(tempfile.mkdtemp(prefix="bench_universe_"))
+    uni = universe.Universe()
+    runs = 0
+    while True:
+        before, started = fake.requests, time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = uni.refresh(deep_limit=args.per_run)
+        runs += 1
+        print(f"przebieg {runs}: {time.perf_counter() - started:6.2f}s, zapytań {fake.requests - before:4d}, "
+              f"waga ≈{result['weight']:5d}, pokrycie {result['deep_coverage']}/{result['symbols']}")
+        if result["deep_coverage"] >= result["symbols"]:
+            break
+
+    before, started = fake.requests, time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = uni.refresh(deep_limit=args.per_run)
+    print(f"stan ustalony: {time.perf_counter() - started:6.2f}s, zapytań {fake.requests - before:4d}, "
+          f"waga ≈{result['weight']:5d}")
+
+    before, started = fake.requests, time.perf_counter()
+    report = uni.report_df()
+    print(f"raport uniwersum ({len(report)} wierszy, ticker z cache): "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms, zapytań {fake.requests - before}")
+
+    deep = report.set_index("Symbol")
+    merged = full.set_index("Symbol").join(deep, rsuffix="_u")
+    assert (merged["ATR(7D)%"] - merged["ATR(7D)%_u"]).abs().max() < 1e-9, "metryki głębokie różne od raportu"
+    print("✅ metryki głębokie == generate_report")
+    fake.stop()
+
+
+if __name__ == "__main__":
+    main()
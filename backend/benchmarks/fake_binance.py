@@ -0,0 +1,232 @@
+"""Lokalny zastępnik REST API Binance na potrzeby benchmarków.
+
+Serwer HTTP w osobnym wątku udaje te endpointy, z których korzysta
+backend (`ping`, `time`, `klines`, `exchangeInfo`, `ticker/24hr`). Świece są syntetyczne, ale
+deterministyczne dla danego symbolu, więc kolejne uruchomienia dają
+porównywalne wyniki. Sztuczne opóźnienie (`latency`) odwzorowuje czas
+odpowiedzi prawdziwej giełdy – bez niego benchmark mierzyłby tylko CPU.
+Każda odpowiedź niesie nagłówek `X-MBX-USED-WEIGHT-1M`, a opcjonalny
+`weight_limit` odrzuca zapytania ponad limit kodem 429, jak giełda.
+Z `fixtures` (patrz `benchmarks.fixtures`) świece powstają z nagranych
+ruchów cen zamiast z szumu gaussowskiego.
+"""
+
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1d": 86_400_000,
+}
+
+
+class FakeBinance:
+    """Uruchamia lokalny serwer z danymi świec dla dowolnych symboli."""
+
+    # Waga zapytań jak w Binance Spot API
+    WEIGHTS = {"klines": 2, "exchangeInfo": 20, "24hr": 80, "ping": 1, "time": 1}
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        history_days: int = 60,
+        universe: int = 0,
+        weight_limit: int | None = None,
+        weight_window: float = 60.0,
+        fixtures: dict[str, list] | None = None,
+    ):
+        self.latency = latency
+        self.history_days = history_days
+        # Limit wagi w oknie (domyślnie minuta); po przekroczeniu 429 + Retry-After
+        self.weight_limit = weight_limit
+        self.weight_window = weight_window
+        self.used_weight = 0
+        self.rejected = 0
+        self._window = int(time.time() // weight_window)
+        # Pary zwracane przez exchangeInfo / ticker 24h: S000USDT, S001USDT, ...
+        self.universe = [f"S{i:03d}USDT" for i in range(universe)]
+        # Nagrane świece (para -> surowe wiersze) w kolejności nazw par
+        self.fixtures = [rows for _, rows in sorted((fixtures or {}).items()) if len(rows) > 1]
+        self.requests = 0
+        self._series: dict[tuple[str, str], list[list]] = {}
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    # ------------------------------------------------------------
+    # Dane
+    # ------------------------------------------------------------
+    def klines(self, symbol: str, interval: str) -> list[list]:
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self._series:
+                self._series[key] = self._generate(symbol, interval)
+            return self._series[key]
+
+    def _generate(self, symbol: str, interval: str) -> list[list]:
+        step = INTERVAL_MS[interval]
+        now = int(time.time() * 1000)
+        last_open = now - now % step
+        count = self.history_days * 86_400_000 // step
+        first_open = last_open - (count - 1) * step
+
+        seed = zlib.crc32(symbol.encode())
+        if self.fixtures:
+            opens, highs, lows, closes, volumes = self._replay(self.fixtures[seed % len(self.fixtures)], count, seed)
+        else:
+            rng = np.random.default_rng(seed)
+            closes = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+            opens = np.concatenate([[closes[0]], closes[:-1]])
+            spread = np.abs(rng.normal(0, 0.005, count)) * closes
+            highs = np.maximum(opens, closes) + spread
+            lows = np.minimum(opens, closes) - spread
+            volumes = rng.uniform(10, 1000, count)
+
+        rows = []
+        for i in range(count):
+            open_time = first_open + i * step
+            rows.append([
+                open_time, f"{opens[i]:.8f}", f"{highs[i]:.8f}", f"{lows[i]:.8f}",
+                f"{closes[i]:.8f}", f"{volumes[i]:.8f}", open_time + step - 1,
+                "0", 0, "0", "0", "0",
+            ])
+        return rows
+
+    @staticmethod
+    def _replay(rows: list, count: int, seed: int):
+        """Świece z nagrania: względne ruchy i kształt świec, zapętlone od losowego miejsca."""
+        o, h, l, c, v = np.array([r[1:6] for r in rows], dtype=float).T
+        steps = len(rows) - 1
+        idx = (seed + np.arange(count)) % steps + 1
+        closes = c[0] * np.cumprod(c[idx] / c[idx - 1])
+        return (
+            closes * (o[idx] / c[idx]),
+            closes * (h[idx] / c[idx]),
+            closes * (l[idx] / c[idx]),
+            closes,
+            v[idx],
+        )
+
+    # ------------------------------------------------------------
+    # Serwer
+    # ------------------------------------------------------------
+    def start(self) -> str:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                name = url.path.rsplit("/", 1)[-1]
+                route = getattr(fake, "_route_" + name, None)
+                if route is None:
+                    self._send(404, {"code": -1, "msg": f"unknown path {url.path}"})
+                    return
+                weight = 2 if name == "24hr" and "symbol" in query else fake.WEIGHTS.get(name, 1)
+                used, retry_after = fake._charge(weight)
+                if retry_after is not None:
+                    self._send(429, {"code": -1003, "msg": "Too much request weight used"},
+                               used, {"Retry-After": str(retry_after)})
+                    return
+                self._send(200, route(query), used)
+
+            def _send(self, status, body, used=0, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("X-MBX-USED-WEIGHT-1M", str(used))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _charge(self, weight: int):
+        """Nalicza wagę w bieżącym oknie. Zwraca (zużyta waga, Retry-After albo None)."""
+        with self._lock:
+            # Okna zegarowe, jak w Binance (pełne minuty przy domyślnym oknie)
+            window = int(time.time() // self.weight_window)
+            if window != self._window:
+                self._window = window
+                self.used_weight = 0
+            if self.weight_limit is not None and self.used_weight + weight > self.weight_limit:
+                self.rejected += 1
+                remaining = self.weight_window - time.time() % self.weight_window
+                return self.used_weight, max(1, int(remaining + 0.999))
+            self.used_weight += weight
+            return self.used_weight, None
+
+    def _route_ping(self, query):
+        return {}
+
+    def _route_time(self, query):
+        return {"serverTime": int(time.time() * 1000)}
+
+    def _route_klines(self, query):
+        rows = self.klines(query["symbol"], query.get("interval", "1h"))
+        start = int(query.get("startTime", 0))
+        end = int(query.get("endTime", 2**62))
+        limit = int(query.get("limit", 500))
+        out = [r for r in rows if start <= r[0] <= end]
+        return out[:limit]
+
+    def _route_exchangeInfo(self, query):
+        symbols = [
+            {"symbol": pair, "baseAsset": pair[:-4], "quoteAsset": "USDT",
+             "status": "TRADING", "isSpotTradingAllowed": True}
+            for pair in self.universe
+        ]
+        # Para wycofana z obrotu – nie powinna trafić do uniwersum
+        symbols.append({"symbol": "DEADUSDT", "baseAsset": "DEAD", "quoteAsset": "USDT",
+                        "status": "BREAK", "isSpotTradingAllowed": True})
+        return {"timezone": "UTC", "serverTime": int(time.time() * 1000), "symbols": symbols}
+
+    def _route_24hr(self, query):
+        out = []
+        for pair in self.universe:
+            rows = self.klines(pair, "1h")
+            last, ref = float(rows[-1][4]), float(rows[-25][4])
+            out.append({
+                "symbol": pair,
+                "lastPrice": f"{last:.8f}",
+                "priceChangePercent": f"{(last - ref) / ref * 100:.3f}",
+                "quoteVolume": f"{sum(float(r[5]) for r in rows[-24:]) * last:.2f}",
+            })
+        return out
+
+
+def point_binance_client_at(base_url: str):
+    """Przekierowuje klienta python-binance na lokalny serwer.
+
+    Trzeba to wywołać przed pierwszym zapytaniem – klient bramki
+    (`binance_client.gateway`) czyta adres przy utworzeniu.
+    """
+    from binance.base_client import BaseClient
+
+    BaseClient.API_URL = f"{base_url}/api"
@@ -0,0 +1,103 @@
+"""Lokalny zastępnik API GROQ (chat completions) na potrzeby benchmarków.
+
+Obsługuje `POST /openai/v1/chat/completions` w trybie zwykłym i
+strumieniowym (SSE, jak API zgodne z OpenAI). Odpowiedź jest stała,
+a opóźnienie składa się z czasu „na pierwszy token” i czasu na każdy
+kolejny fragment – tak, żeby dało się porównać cache i streaming.
+Serwer zapisuje długość promptu każdego zapytania (`prompt_chars`).
+
+Klient GROQ kierujemy tu przez `GROQ_BASE_URL`.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "Rynek w trendzie bocznym z umiarkowaną zmiennością. "
+    "Najsilniej rosną TAO i PYTH, ETH słabnie. "
+    "Do grid bota nadają się pary o ATR 1,5–2% bez wyraźnego trendu."
+)
+
+
+class FakeGroq:
+    """Serwer HTTP w wątku udający endpoint chat completions."""
+
+    def __init__(self, first_token: float = 0.3, per_chunk: float = 0.02, chunk_words: int = 3):
+        self.first_token = first_token
+        self.per_chunk = per_chunk
+        self.chunk_words = chunk_words
+        self.requests = 0
+        self.prompt_chars: list[int] = []
+        self._server: ThreadingHTTPServer | None = None
+
+    def _chunks(self) -> list[str]:
+        words = REPLY.split(" ")
+        return [
+            " ".join(words[i:i + self.chunk_words]) + (" " if i + self.chunk_words < len(words) else "")
+            for i in range(0, len(words), self.chunk_words)
+        ]
+
+    def start(self) -> str:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                fake.requests += 1
+                fake.prompt_chars.append(sum(len(m["content"]) for m in body["messages"]))
+                time.sleep(fake.first_token)
+                if body.get("stream"):
+                    self._stream(body)
+                else:
+                    time.sleep(fake.per_chunk * len(fake._chunks()))
+                    self._json(body)
+
+            def _json(self, body):
+                payload = json.dumps({
+                    "id": "fake", "object": "chat.completion", "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{
+                        "index": 0, "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": REPLY},
+                    }],
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for i, text in enumerate(fake._chunks()):
+                    if i:
+                        time.sleep(fake.per_chunk)
+                    chunk = {
+                        "id": "fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": body["model"],
+                        "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
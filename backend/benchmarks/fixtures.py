@@ -0,0 +1,69 @@
+"""Nagrane świece Binance jako dane do benchmarków.
+
+Nagranie to surowe wiersze z `GET /api/v3/klines` (dokładnie to, co
+zwraca python-binance), zapisane jako `<PARA>_<interwał>.json.gz`.
+`FakeBinance(fixtures=...)` odtwarza z nich ruchy cen i kształt świec
+dla dowolnych symboli i długości historii, więc wyniki benchmarków
+opierają się na prawdziwej zmienności rynku, a nie na szumie gaussowskim.
+
+Nagranie z katalogu `backend/` (wymaga dostępu do Binance):
+
+    python -m benchmarks.fixtures --pairs BTCUSDT ETHUSDT SOLUSDT --days 90
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def fixture_path(directory: Path, pair: str, interval: str) -> Path:
+    return Path(directory) / f"{pair}_{interval}.json.gz"
+
+
+def save_fixture(directory: Path, pair: str, interval: str, rows: list) -> Path:
+    path = fixture_path(directory, pair, interval)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "wt") as f:
+        json.dump(rows, f, separators=(",", ":"))
+    return path
+
+
+def load_fixtures(directory: Path = FIXTURES_DIR, interval: str = "1h") -> dict[str, list]:
+    """Nagrania dla interwału: para -> surowe wiersze świec (pusty słownik, gdy brak)."""
+    out = {}
+    for path in sorted(Path(directory).glob(f"*_{interval}.json.gz")):
+        with gzip.open(path, "rt") as f:
+            out[path.name.split("_", 1)[0]] = json.load(f)
+    return out
+
+
+def record(pairs: list[str], interval: str, days: int, directory: Path) -> None:
+    """Pobiera świece przez wspólną bramkę Binance i zapisuje je jako nagrania."""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services import analytics
+
+    start_ms = int(time.time() * 1000) - days * 86_400_000
+    for pair in pairs:
+        rows = analytics._fetch_klines(pair, interval, start_ms)
+        path = save_fixture(directory, pair, interval, rows)
+        print(f"💾 {pair}: {len(rows)} świec -> {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", nargs="+", default=["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT"])
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--dir", type=Path, default=FIXTURES_DIR)
+    args = parser.parse_args()
+    record(args.pairs, args.interval, args.days, args.dir)
+
+
+if __name__ == "__main__":
+    main()
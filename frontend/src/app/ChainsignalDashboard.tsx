@@ -1,7 +1,12 @@
 "use client";
 import { Zap } from "lucide-react";
-import { useState } from "react";
-import type { LatestReport, Signal } from "@/lib/api";
+import { useEffect, useState } from "react";
+import {
+  applySignalsDiff,
+  subscribeToUpdates,
+  type LatestReport,
+  type Signal,
+} from "@/lib/api";
 
 type Lang = "en" | "pl";
 
@@ -118,9 +123,25 @@ export default function ChainsignalDashboard({
   const [lang, setLang] = useState<Lang>("en");
   const t = translations[lang];
 
-  const generatedAt = formatGeneratedAt(initialReport?.generated_at, lang);
-  const rows = initialReport?.symbols ?? [];
-  const signals = initialSignals ?? [];
+  const [report, setReport] = useState<LatestReport | null>(initialReport);
+  const [signals, setSignals] = useState<Signal[]>(initialSignals ?? []);
+
+  // Aktualizacje na żywo z backendu zamiast odpytywania co 60s
+  useEffect(() => {
+    return subscribeToUpdates({
+      onSnapshot: (r, s) => {
+        // Pusty snapshot (backend jeszcze bez raportu) nie nadpisuje danych z SSR
+        if (!r) return;
+        setReport(r);
+        setSignals(s);
+      },
+      onReport: setReport,
+      onSignals: (diff) => setSignals((current) => applySignalsDiff(current, diff)),
+    });
+  }, []);
+
+  const generatedAt = formatGeneratedAt(report?.generated_at, lang);
+  const rows = report?.symbols ?? [];
 
   return (
     <div className="min-h-screen bg-slate-950 text-slate-100">
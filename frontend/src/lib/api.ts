@@ -53,3 +53,112 @@ export async function getSignals(): Promise<Signal[]> {
   const data = await fetchJson<{ count: number; signals: Signal[] }>("/signals");
   return data.signals;
 }
+
+// --- Historia (/history): serie do rysowania wykresów po stronie klienta ---
+
+export type HistoryPoint = [reportDate: string, value: number];
+
+export type HistoryResponse = {
+  columns: string[];
+  series: Record<string, Record<string, { total: number; points: HistoryPoint[] }>>;
+};
+
+export type HistoryQuery = {
+  symbols: string[];
+  columns?: string[];
+  start?: string;
+  end?: string;
+  points?: number;
+  method?: "lttb" | "minmax";
+};
+
+export async function getHistory(query: HistoryQuery): Promise<HistoryResponse> {
+  const params = new URLSearchParams({ symbols: query.symbols.join(",") });
+  if (query.columns) params.set("columns", query.columns.join(","));
+  if (query.start) params.set("start", query.start);
+  if (query.end) params.set("end", query.end);
+  if (query.points) params.set("points", String(query.points));
+  if (query.method) params.set("method", query.method);
+  return fetchJson<HistoryResponse>(`/history?${params}`);
+}
+
+// --- Korelacje (/correlations): macierz korelacji zwrotów i beta do BTC ---
+
+export type CorrelationWindow = {
+  returns: number;
+  min_periods: number;
+  correlation: (number | null)[][];
+  beta: (number | null)[] | null;
+};
+
+export type CorrelationsResponse = {
+  interval: string;
+  as_of: string;
+  benchmark: string | null;
+  symbols: string[];
+  windows: Record<string, CorrelationWindow>;
+};
+
+export type CorrelationsQuery = {
+  symbols?: string[];
+  interval?: string;
+  windows?: string[];
+  minPeriods?: number;
+};
+
+export async function getCorrelations(query: CorrelationsQuery = {}): Promise<CorrelationsResponse> {
+  const params = new URLSearchParams();
+  if (query.symbols) params.set("symbols", query.symbols.join(","));
+  if (query.interval) params.set("interval", query.interval);
+  if (query.windows) params.set("windows", query.windows.join(","));
+  if (query.minPeriods) params.set("min_periods", String(query.minPeriods));
+  return fetchJson<CorrelationsResponse>(`/correlations?${params}`);
+}
+
+// --- Push z backendu (SSE: /stream/events) ---
+
+export type SignalsDiff = {
+  version: number;
+  added: Signal[];
+  changed: Signal[];
+  removed: string[];
+};
+
+type Snapshot = {
+  version: number;
+  report: LatestReport | null;
+  signals: Signal[];
+};
+
+export type UpdateHandlers = {
+  onSnapshot: (report: LatestReport | null, signals: Signal[]) => void;
+  onReport: (report: LatestReport) => void;
+  onSignals: (diff: SignalsDiff) => void;
+};
+
+// Jedno połączenie na kartę: najpierw pełny snapshot, potem tylko zmiany.
+// EventSource sam wznawia połączenie – po wznowieniu znów przychodzi snapshot.
+export function subscribeToUpdates(handlers: UpdateHandlers): () => void {
+  const source = new EventSource(`${API_BASE_URL}/stream/events`);
+
+  source.addEventListener("snapshot", (e) => {
+    const data = JSON.parse((e as MessageEvent).data) as Snapshot;
+    handlers.onSnapshot(data.report, data.signals);
+  });
+  source.addEventListener("report", (e) => {
+    const data = JSON.parse((e as MessageEvent).data) as { report: LatestReport };
+    handlers.onReport(data.report);
+  });
+  source.addEventListener("signals", (e) => {
+    handlers.onSignals(JSON.parse((e as MessageEvent).data) as SignalsDiff);
+  });
+
+  return () => source.close();
+}
+
+export function applySignalsDiff(current: Signal[], diff: SignalsDiff): Signal[] {
+  const bySymbol = new Map(current.map((s) => [s.symbol, s]));
+  for (const symbol of diff.removed) bySymbol.delete(symbol);
+  for (const s of [...diff.added, ...diff.changed]) bySymbol.set(s.symbol, s);
+  return Array.from(bySymbol.values());
+}